@@ -4,11 +4,78 @@ import random
 
 import pyasge
 
+# All the speeds below are in pixels (or degrees) per step at this many steps per second
+# Movement is scaled by 'delta_time * REFERENCE_RATE', so it looks the same at any simulation rate
+REFERENCE_RATE = 60
+
+# Every class below uses __slots__, so objects only have room for their own state and can't grow new attributes
+# Tuning values are class attributes shared by every instance, a Tuning object holds one game's own copy of them
+
+
+class Tuning:
+    # Every tuning value (plain number class attribute) of a class and its bases, copied so they can be changed
+    # for one game (e.g. by a balance sweep) without touching the class or any other game
+
+    def __init__(self, cls):
+        for base in reversed(cls.__mro__):
+            for name, value in vars(base).items():
+                if not name.startswith("_") and isinstance(value, (int, float)):
+                    setattr(self, name, value)
+
+
+class Vec2:
+    # A small 2D vector, used for movement directions
+    __slots__ = ("x", "y")
+
+    def __init__(self, x=0.0, y=0.0):
+        self.x = x
+        self.y = y
+
+    def Set(self, x, y):
+        self.x = x
+        self.y = y
+
+    def __iter__(self):
+        yield self.x
+        yield self.y
+
+    def __repr__(self):
+        return "Vec2(" + str(self.x) + ", " + str(self.y) + ")"
+
+
 class GameObject:
+    __slots__ = ("sprite", "move_direction", "hull", "prev_x", "prev_y", "sim_x", "sim_y")
 
     def __init__(self):
         self.sprite = pyasge.Sprite()
-        self.move_direction = [0.0, 0.0]
+        self.move_direction = Vec2()
+
+        # Convex collision hull of the sprite's texture, see collision_mask.py
+        self.hull = None
+
+        # Positions used for interpolating between simulation steps when rendering
+        self.prev_x = 0.0
+        self.prev_y = 0.0
+        self.sim_x = 0.0
+        self.sim_y = 0.0
+
+    def SavePosition(self):
+        self.prev_x = self.sprite.x
+        self.prev_y = self.sprite.y
+
+    def Interpolate(self, alpha, game_res):
+        # Temporarily moves the sprite between its previous and current position
+        # Big jumps (screen wrapping, respawning) aren't interpolated, to avoid the sprite sliding across the screen
+        self.sim_x = self.sprite.x
+        self.sim_y = self.sprite.y
+        if abs(self.sim_x - self.prev_x) < game_res[0] / 2 and abs(self.sim_y - self.prev_y) < game_res[1] / 2:
+            self.sprite.x = self.prev_x + (self.sim_x - self.prev_x) * alpha
+            self.sprite.y = self.prev_y + (self.sim_y - self.prev_y) * alpha
+
+    def RestorePosition(self):
+        self.sprite.x = self.sim_x
+        self.sprite.y = self.sim_y
+
 
 class AsteroidState(enum.Enum):
     LARGE = 0,
@@ -16,99 +83,79 @@ class AsteroidState(enum.Enum):
     SMALL = 2
 
 class Asteroid(GameObject):
-    def __init__(self):
-        super().__init__()
-        self.move_speed = 5
-        self.min_scale = 1.7
-        self.max_scale = 2.1
-        self.max_spin_speed = 0.05
+    __slots__ = ("is_destroyed", "spinning_sprite", "spin", "current_state", "current_score")
+
+    move_speed = 5
+    min_scale = 1.7
+    max_scale = 2.1
+    max_spin_speed = 0.05
 
-        self.large_state_score = 20
-        self.medium_state_score = 50
-        self.small_state_score = 100
+    large_state_score = 20
+    medium_state_score = 50
+    small_state_score = 100
 
+    def __init__(self):
+        super().__init__()
         self.is_destroyed = False
         self.spinning_sprite = pyasge.Sprite()
         self.spin = 0
         self.current_state = AsteroidState.LARGE
         self.current_score = self.large_state_score
 
-    def Move(self):
-        self.sprite.x += self.move_direction[0] * self.move_speed
-        self.sprite.y += self.move_direction[1] * self.move_speed
-
-        # Visual sprite used primarily for spinning effect
-        self.spinning_sprite.x = self.sprite.x
-        self.spinning_sprite.y = self.sprite.y
-        pass
-
-    def Spin(self):
-        self.spinning_sprite.rotation += self.spin
-
-    def ResetState(self, orig_asteroid):
-        match orig_asteroid.current_state:
-            case AsteroidState.LARGE:
-                self.current_state = AsteroidState.MEDIUM
-                self.current_score = self.medium_state_score
-                pass
-            case AsteroidState.MEDIUM:
-                self.current_state = AsteroidState.SMALL
-                self.current_score = self.small_state_score
-                pass
-            case AsteroidState.SMALL:
-                self.is_destroyed = True
-                pass
 
-        pass
+class Ship(GameObject):
+    __slots__ = ("collisionSprite", "hor_input", "ver_input", "current_health", "current_speed", "current_angle",
+                 "current_timer", "current_flash_timer", "tuning")
 
+    health = 5
+    max_speed = 6.5
+    acceleration = 0.1
+    turn_speed = 5.25
+    hurt_knockback = 4
+    invincibility_timer = 2
+    invincibility_flash = 0.05
 
-class Ship(GameObject):
     def __init__(self):
         super().__init__()
-        self.health = 5
-        self.max_speed = 6.5
-        self.acceleration = 0.1
-        self.turn_speed = 5.25
-        self.hurt_knockback = 4
-        self.invincibility_timer = 2
-        self.invincibility_flash = 0.05
-
         self.collisionSprite = pyasge.Sprite()
         self.hor_input = 0
         self.ver_input = 0
-        self.current_health = self.health
+        # Each ship reads its tuning values from its own copy, so one game's can be changed on its own
+        self.tuning = Tuning(type(self))
+        self.current_health = self.tuning.health
         self.current_speed = 0
         self.current_angle = 0
         self.current_timer = 0
         self.current_flash_timer = 0
 
-    def Accel(self):
-        if self.current_speed < self.max_speed:
-            self.current_speed += self.acceleration
+    def Accel(self, delta_time):
+        if self.current_speed < self.tuning.max_speed:
+            self.current_speed += self.tuning.acceleration * delta_time * REFERENCE_RATE
 
         self.ResetMoveDir()
         pass
 
-    def Decel(self):
-        if self.current_speed > -self.max_speed:
-            self.current_speed -= self.acceleration
+    def Decel(self, delta_time):
+        if self.current_speed > -self.tuning.max_speed:
+            self.current_speed -= self.tuning.acceleration * delta_time * REFERENCE_RATE
 
         self.ResetMoveDir()
         pass
 
-    def Turn(self, direction):
+    def Turn(self, direction, delta_time):
         # Direction should either be 1 or -1 (right or left)
-        self.current_angle += self.turn_speed * direction if direction != 0 else 0
+        if direction != 0:
+            self.current_angle += self.tuning.turn_speed * direction * delta_time * REFERENCE_RATE
         pass
 
     def ResetMoveDir(self):
-        self.move_direction[0] = math.cos(math.radians(self.current_angle))
-        self.move_direction[1] = math.sin(math.radians(self.current_angle))
+        self.move_direction.Set(math.cos(math.radians(self.current_angle)), math.sin(math.radians(self.current_angle)))
 
-    def Move(self):
+    def Move(self, delta_time):
         # Physical ship movement
-        self.collisionSprite.x += self.move_direction[0] * self.current_speed
-        self.collisionSprite.y += self.move_direction[1] * self.current_speed
+        step = delta_time * REFERENCE_RATE
+        self.collisionSprite.x += self.move_direction.x * self.current_speed * step
+        self.collisionSprite.y += self.move_direction.y * self.current_speed * step
 
         # Visual ship movement
         self.sprite.rotation = math.radians(self.current_angle + 90)
@@ -121,34 +168,27 @@ class Ship(GameObject):
         # Applies damage and knockback to the player whenever they collide with an asteroid
         self.current_health -= 1
         self.current_angle = math.degrees(math.atan2(asteroid.sprite.y - self.sprite.y, asteroid.sprite.x - self.sprite.x))
-        self.current_speed = -self.hurt_knockback
-        self.current_timer = self.invincibility_timer
+        self.current_speed = -self.tuning.hurt_knockback
+        self.current_timer = self.tuning.invincibility_timer
 
     def InvincibilityFlash(self):
         # Keeps track of the player's flashing animation when they get hurt
         if self.current_flash_timer <= 0:
             self.sprite.opacity = 0 if self.sprite.opacity == 255 else 255
-            self.current_flash_timer = self.invincibility_flash
+            self.current_flash_timer = self.tuning.invincibility_flash
 
 
 class Projectile(GameObject):
+    __slots__ = ("is_shot", "current_life_span")
+
+    move_speed = 12.0
+    life_span = 0.8
+
     def __init__(self):
         super().__init__()
-        self.move_speed = 12.0
-        self.life_span = 0.8
-
         self.is_shot = False
         self.current_life_span = 0
 
-    def Move(self, delta_time):
-        self.sprite.x += self.move_direction[0] * self.move_speed
-        self.sprite.y += self.move_direction[1] * self.move_speed
-
-        # Only allow the projectile to stay on screen for so long before getting destroyed
-        self.current_life_span += delta_time
-        if self.current_life_span >= self.life_span:
-            self.Collision()
-
     def Collision(self):
         self.is_shot = False
         self.sprite.opacity = 0
@@ -157,19 +197,21 @@ class Projectile(GameObject):
         pass
 
 class Alien(GameObject):
-    def __init__(self):
-        super().__init__()
-        self.move_speed = 4.5
-        self.turn_angle = 45.0
-        self.spawn_margin = 100.0
+    __slots__ = ("is_active", "is_timer_active", "escape_attempted", "spawn_timer", "projectile_timer")
+
+    move_speed = 4.5
+    turn_angle = 45.0
+    spawn_margin = 100.0
 
-        self.death_score = 200
+    death_score = 200
 
-        self.spawn_timer_min = 3
-        self.spawn_timer_max = 11
-        self.projectile_timer_time = 0.75
-        self.player_distance_check = 400
+    spawn_timer_min = 3
+    spawn_timer_max = 11
+    projectile_timer_time = 0.75
+    player_distance_check = 400
 
+    def __init__(self):
+        super().__init__()
         self.is_active = False
         self.is_timer_active = False
         self.escape_attempted = False
@@ -178,49 +220,17 @@ class Alien(GameObject):
 
         pass
 
-    def Move(self):
-        self.sprite.x += self.move_direction[0] * self.move_speed
-        self.sprite.y += self.move_direction[1] * self.move_speed
-
-        pass
-
-    def ChangeDirection(self, player):
-        new_angle = round(math.degrees(math.atan2(
-            self.sprite.y - player.sprite.y,
-            player.sprite.x - self.sprite.x)))
-
-        if -180 <= new_angle <= -90:
-            new_angle = -135
-        elif -90 <= new_angle <= 0:
-            new_angle = -45
-        elif 0 <= new_angle <= 90:
-            new_angle = 45
-        elif 90 <= new_angle <= 180:
-            new_angle = 135
-
-        self.move_direction[0] = math.cos(math.radians(new_angle))
-        self.move_direction[1] = math.sin(math.radians(new_angle))
-
-        self.escape_attempted = True
-
-        pass
-
-    def ResetTimer(self):
-        self.spawn_timer = random.uniform(self.spawn_timer_min, self.spawn_timer_max)
+    def ResetTimer(self, rng=random):
+        self.spawn_timer = rng.uniform(self.spawn_timer_min, self.spawn_timer_max)
         self.is_timer_active = True
 
         pass
 
 class AlienProjectile(Projectile):
-    def __init__(self):
-        super().__init__()
-        self.life_span = 0.65
+    __slots__ = ()
 
-        pass
+    life_span = 0.65
 
 
 class HealthIcon(GameObject):
-    def __init__(self):
-        super().__init__()
-
-        pass
\ No newline at end of file
+    __slots__ = ()
\ No newline at end of file
@@ -0,0 +1,49 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from texture_cache import normalisePath
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def readFile(path: str) -> int:
+    # Reads a whole file so it's in the OS's file cache when the renderer opens it, returns its size
+    with open(os.path.join(ROOT_DIR, normalisePath(path)), "rb") as file:
+        return len(file.read())
+
+
+class AssetLoader:
+    """ Reads and decodes startup assets on a pool of background threads
+
+    Textures and fonts have to be created on the main thread, which owns
+    the renderer, but reading their files and CPU work like decoding PNGs
+    for collision hulls doesn't. Submitting that work here first lets it
+    run while the main thread gets on with the rest of startup, and wait()
+    blocks until all of it is done.
+    """
+
+    def __init__(self, workers: int = None) -> None:
+        self.executor = ThreadPoolExecutor(max_workers=workers or min(8, os.cpu_count() or 1),
+                                           thread_name_prefix="assets")
+        self.pending = []
+
+    def submit(self, function, *args) -> None:
+        self.pending.append(self.executor.submit(function, *args))
+
+    def prefetch(self, paths: list) -> None:
+        # Missing files are left for the main thread to report, the same as without prefetching
+        for path in paths:
+            self.submit(readFile, path)
+
+    def wait(self) -> None:
+        for future in self.pending:
+            try:
+                future.result()
+            except OSError:
+                pass
+
+        self.pending = []
+
+    def shutdown(self) -> None:
+        self.wait()
+        self.executor.shutdown()
@@ -0,0 +1,491 @@
+import random
+
+import numpy as np
+
+import GameObject
+from collision_mask import bodiesTouch, sweptBoxes
+from world_bounds import GhostSprites
+
+# Asteroid states stored as small integers in the 'state' array, in the order they break down
+STATE_LARGE = 0
+STATE_MEDIUM = 1
+STATE_SMALL = 2
+
+STATES = [GameObject.AsteroidState.LARGE, GameObject.AsteroidState.MEDIUM, GameObject.AsteroidState.SMALL]
+
+
+class AsteroidField:
+    """ Every asteroid in the game, stored as a structure of arrays
+
+    Positions, directions, scales, spins and states live in contiguous
+    NumPy arrays, one row per asteroid, so moving, spinning and wrapping
+    the whole field only takes a handful of vectorised operations instead
+    of a Python loop over every asteroid. Each row also has a
+    GameObject.Asteroid whose sprites are only synced from the arrays
+    when that asteroid needs to be drawn or handed to other game code.
+
+    The field is a fixed-capacity pool: destroyed rows go on a free list
+    and are handed straight back out by acquire(), and compact() packs the
+    live rows to the front once too many dead ones build up in between.
+    """
+
+    def __init__(self, texture_files: list, textures, capacity: int = 32, rng=random, masks=None) -> None:
+        self.capacity = 0
+        self.count = 0
+        self.live_count = 0
+        self.free = []
+        self.rows = []
+
+        # Random source for split(), the game passes in its seeded generator
+        self.rng = rng
+
+        # Every asteroid texture is measured once, rows only store an index into these lists
+        self.textures = textures
+        self.texture_files = texture_files
+        self.texture_objects = []
+        self.texture_sizes = []
+        for texture_file in texture_files:
+            self.texture_objects.append(textures.get(texture_file))
+            self.texture_sizes.append(textures.size(texture_file))
+
+        # Collision hulls for each texture, for the narrowphase in touching()
+        self.texture_hulls = None
+        if masks is not None:
+            hulls = [masks.get(texture_file) for texture_file in texture_files]
+            self.texture_hulls = np.stack([hull.points for hull in hulls])
+            self.texture_inner = np.array([hull.inner for hull in hulls])
+            self.texture_outer = np.array([hull.outer for hull in hulls])
+
+        # Shared tuning values come from the original asteroid class
+        template = GameObject.Asteroid
+        self.move_speed = template.move_speed
+        self.min_scale = template.min_scale
+        self.max_scale = template.max_scale
+        self.max_spin_speed = template.max_spin_speed
+        self.state_scores = np.array([template.large_state_score,
+                                      template.medium_state_score,
+                                      template.small_state_score], dtype=np.int64)
+
+        self.x = np.zeros(0)
+        self.y = np.zeros(0)
+        self.prev_x = np.zeros(0)
+        self.prev_y = np.zeros(0)
+        self.dir_x = np.zeros(0)
+        self.dir_y = np.zeros(0)
+        self.speed = np.zeros(0)
+        self.width = np.zeros(0)
+        self.height = np.zeros(0)
+        self.scale = np.zeros(0)
+
+        # Scaled sizes, kept up to date by setTexture and setScale instead of multiplying out every query
+        self.extent_x = np.zeros(0)
+        self.extent_y = np.zeros(0)
+        self.rotation = np.zeros(0)
+        self.spin = np.zeros(0)
+        self.state = np.zeros(0, dtype=np.int8)
+        self.alive = np.zeros(0, dtype=bool)
+        self.texture = np.zeros(0, dtype=np.int8)
+
+        # Which texture each row's sprites currently have loaded, so they are only reloaded when it changes
+        # This belongs to the row object rather than the asteroid, so it moves with the rows when compacting
+        self.synced_texture = np.zeros(0, dtype=np.int8)
+
+        # Where each row's sprite was last put, and whether that's out of date, for drawing with 'lod'
+        self.sprite_x = np.zeros(0)
+        self.sprite_y = np.zeros(0)
+        self.sprite_stale = np.zeros(0, dtype=bool)
+
+        # What overhang() last returned, None once anything has moved, grown, or been added or removed since
+        self.reach = None
+
+        # Level of detail for huge fields (an asteroid_lod.AsteroidLOD), None draws every asteroid in full
+        self.lod = None
+
+        # Spare sprites for the asteroids that straddle an edge of the screen, one set per texture
+        self.ghost_sprites = [GhostSprites(textures, texture_file) for texture_file in texture_files]
+
+        self.reserve(max(capacity, 1))
+
+    def __len__(self) -> int:
+        return self.live_count
+
+    def reserve(self, capacity: int) -> None:
+        # Grows every array to the new capacity, keeping the rows already in use
+        # The pool never shrinks, and never grows while asteroids are being spawned
+        if capacity <= self.capacity:
+            return
+
+        for name in ("x", "y", "prev_x", "prev_y", "dir_x", "dir_y", "speed", "width", "height", "scale",
+                     "extent_x", "extent_y", "rotation", "spin", "state", "alive", "texture", "synced_texture",
+                     "sprite_x", "sprite_y", "sprite_stale"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+        self.synced_texture[self.count:] = -1
+        self.sprite_stale[self.count:] = True
+        self.capacity = capacity
+
+    # -----------
+    # -- Adding and removing asteroids --
+    # -----------
+
+    def acquire(self) -> int:
+        # Returns the index of a new, live, large asteroid, or -1 if the pool is full
+        # The caller fills in the rest of the row
+        if self.free:
+            index = self.free.pop()
+        elif self.count < self.capacity:
+            index = self.count
+            self.count += 1
+            if index == len(self.rows):
+                self.rows.append(GameObject.Asteroid())
+        else:
+            return -1
+
+        self.speed[index] = self.move_speed
+        self.state[index] = STATE_LARGE
+        self.alive[index] = True
+        self.sprite_stale[index] = True
+        self.rows[index].is_destroyed = False
+        self.live_count += 1
+        self.reach = None
+
+        return index
+
+    def release(self, index: int) -> None:
+        if not self.alive[index]:
+            return
+
+        self.alive[index] = False
+        self.rows[index].is_destroyed = True
+        self.live_count -= 1
+        self.free.append(index)
+        self.reach = None
+
+    def clear(self) -> None:
+        # release() for every row in use at once
+        for row in self.rows[:self.count]:
+            row.is_destroyed = True
+
+        self.alive[:self.count] = False
+        self.count = 0
+        self.live_count = 0
+        self.free.clear()
+        self.reach = None
+
+    def allDestroyed(self) -> bool:
+        return self.live_count == 0
+
+    def compact(self) -> None:
+        # Moves every live row to the front of the arrays, so the vectorised updates stop touching dead ones
+        # Any indices held from before this call are no longer valid
+        n = self.count
+        order = np.concatenate((np.flatnonzero(self.alive[:n]), np.flatnonzero(~self.alive[:n])))
+
+        for name in ("x", "y", "prev_x", "prev_y", "dir_x", "dir_y", "speed", "width", "height", "scale",
+                     "extent_x", "extent_y", "rotation", "spin", "state", "alive", "texture", "synced_texture",
+                     "sprite_x", "sprite_y", "sprite_stale"):
+            array = getattr(self, name)
+            array[:n] = array[order]
+
+        self.rows[:n] = [self.rows[i] for i in order.tolist()]
+        self.count = self.live_count
+        self.free.clear()
+
+    def maybeCompact(self, min_rows: int = 64) -> bool:
+        # Only worth compacting once at least half of the rows in use are dead
+        if self.count >= min_rows and self.live_count * 2 < self.count:
+            self.compact()
+            return True
+
+        return False
+
+    def setPosition(self, index: int, x: float, y: float) -> None:
+        # Places an asteroid without interpolating from wherever its row was before
+        self.x[index] = self.prev_x[index] = x
+        self.y[index] = self.prev_y[index] = y
+        self.reach = None
+
+    def setTexture(self, index: int, texture_index: int) -> None:
+        self.texture[index] = texture_index
+        self.width[index], self.height[index] = self.texture_sizes[texture_index]
+        self.extent_x[index] = self.width[index] * self.scale[index]
+        self.extent_y[index] = self.height[index] * self.scale[index]
+        self.reach = None
+
+    def setScale(self, index: int, scale: float) -> None:
+        self.scale[index] = scale
+        self.extent_x[index] = self.width[index] * scale
+        self.extent_y[index] = self.height[index] * scale
+        self.reach = None
+
+    def split(self, index: int, chunks: int, rescale: float) -> int:
+        # Fast path for breaking an asteroid, the pieces start where the original was and skip spawn placement
+        # Returns how many pieces were spawned
+        if self.state[index] == STATE_SMALL:
+            return 0
+
+        rng = self.rng
+        spawned = 0
+        for i in range(chunks):
+            new_index = self.acquire()
+            if new_index < 0:
+                break
+
+            self.setTexture(new_index, rng.randint(0, len(self.texture_files) - 1))
+            self.setPosition(new_index, self.x[index], self.y[index])
+
+            # Randomised rotation, direction and size like in 'MyASGEGame.initAsteroid'
+            self.rotation[new_index] = rng.uniform(0.0, 1.0)
+            self.spin[new_index] = rng.uniform(-self.max_spin_speed, self.max_spin_speed)
+            self.dir_x[new_index] = rng.uniform(1, -1)
+            self.dir_y[new_index] = rng.uniform(1, -1)
+            self.setScale(new_index, (self.scale[index] * rescale) * rng.uniform(self.min_scale, self.max_scale))
+
+            # The new asteroid is one size down from the original
+            self.state[new_index] = self.state[index] + 1
+            spawned += 1
+
+        return spawned
+
+    def liveIndices(self) -> np.ndarray:
+        return np.flatnonzero(self.alive[:self.count])
+
+    def score(self, index: int) -> int:
+        return int(self.state_scores[self.state[index]])
+
+    # -----------
+    # -- Vectorised updates --
+    # -----------
+
+    def advance(self, delta_time: float) -> None:
+        # Moves every live asteroid along its direction
+        # The positions before moving are kept for interpolating between steps when rendering
+        n = self.count
+        step = delta_time * GameObject.REFERENCE_RATE
+        alive = self.alive[:n]
+        self.prev_x[:n] = self.x[:n]
+        self.prev_y[:n] = self.y[:n]
+        self.x[:n] += np.where(alive, self.dir_x[:n] * self.speed[:n] * step, 0.0)
+        self.y[:n] += np.where(alive, self.dir_y[:n] * self.speed[:n] * step, 0.0)
+        self.reach = None
+
+    def spinAll(self, delta_time: float) -> None:
+        # Turns every live asteroid by its spin, except SMALL ones if 'lod' says so
+        n = self.count
+        step = delta_time * GameObject.REFERENCE_RATE
+        spinning = self.alive[:n]
+        if self.lod is not None and not self.lod.spin_small:
+            spinning = spinning & (self.state[:n] != STATE_SMALL)
+        self.rotation[:n] += np.where(spinning, self.spin[:n] * step, 0.0)
+
+    def wrap(self, bounds) -> None:
+        # Wraps every row around the world bounds at once
+        n = self.count
+        bounds.wrap(self.x[:n], self.y[:n])
+        self.reach = None
+
+    def overhang(self, bounds) -> tuple:
+        # How far the live asteroids stick out past the right and bottom edges, the 'reach' for WorldBounds.ghosts
+        # Worked out once and reused until the field changes, the player and the projectiles both ask every step
+        if self.reach is None:
+            live = self.liveIndices()
+            self.reach = bounds.overhang(self.x[live], self.y[live], self.extent_x[live], self.extent_y[live])
+
+        return self.reach
+
+    def overlapping(self, sprite, margin: float, candidates: np.ndarray = None, offset_x: float = 0.0,
+                    offset_y: float = 0.0) -> np.ndarray:
+        # Vectorised 'isInside' between one sprite and live asteroids, returns the indices that collide
+        # If broadphase candidates are given, only those rows are tested
+        # The offsets test a ghost copy of the sprite instead, see WorldBounds.spriteOffsets
+        if candidates is None:
+            candidates = np.arange(self.count)
+
+        x = self.x[candidates]
+        y = self.y[candidates]
+        extent_x = self.extent_x[candidates]
+        extent_y = self.extent_y[candidates]
+        sprite_x = sprite.x + offset_x
+        sprite_y = sprite.y + offset_y
+
+        collision_x = (sprite_x + (sprite.width * sprite.scale) - margin >= x + margin) \
+            & (x + extent_x - margin >= sprite_x + margin)
+        collision_y = (sprite_y + (sprite.height * sprite.scale) - margin >= y + margin) \
+            & (y + extent_y - margin >= sprite_y + margin)
+
+        return candidates[collision_x & collision_y & self.alive[candidates]]
+
+    def sweptPairs(self, x, y, dx, dy, width, height, margin: float, candidates: np.ndarray):
+        # overlapping() for many boxes moving by (dx, dy) this step, e.g. for the pairs from SpatialHash.queryPairs
+        # The boxes line up with 'candidates', returns which of the pairs collide and when, see sweptBoxes
+        hits, when = sweptBoxes(x, y, dx, dy, width, height, self.x[candidates], self.y[candidates],
+                                self.extent_x[candidates], self.extent_y[candidates], margin)
+        return hits & self.alive[candidates], when
+
+    def touchingMask(self, indices: np.ndarray, body) -> np.ndarray:
+        # Which of the asteroids at 'indices' have a rotated hull that touches 'body', see touching()
+        if len(indices) == 0 or self.texture_hulls is None or body is None:
+            return np.ones(len(indices), dtype=bool)
+
+        texture = self.texture[indices]
+        asteroids = (self.texture_hulls[texture], self.x[indices], self.y[indices], self.width[indices],
+                     self.height[indices], self.scale[indices], self.rotation[indices], self.texture_inner[texture],
+                     self.texture_outer[texture])
+        return bodiesTouch(body, asteroids)
+
+    def touching(self, indices: np.ndarray, body) -> np.ndarray:
+        # Narrowphase for the results of overlapping(), keeps the asteroids whose rotated hull touches 'body'
+        # 'body' comes from collision_mask.spriteBody, without one the bounding box test is all there is
+        return indices[self.touchingMask(indices, body)]
+
+    def buildBroadphase(self, spatial_hash) -> None:
+        # Files every live asteroid into the broadphase grid for this tick
+        live = self.liveIndices()
+        spatial_hash.rebuild(self.x[live], self.y[live], self.extent_x[live], self.extent_y[live], live)
+
+    # -----------
+    # -- Sprite syncing --
+    # -----------
+
+    def loadRowTexture(self, index: int) -> None:
+        asteroid = self.rows[index]
+        texture_file = self.texture_files[self.texture[index]]
+        self.textures.attach(asteroid.sprite, texture_file)
+        self.textures.attach(asteroid.spinning_sprite, texture_file)
+        asteroid.sprite.z_order = -10
+        self.synced_texture[index] = self.texture[index]
+
+    def syncTexture(self, index: int) -> GameObject.Asteroid:
+        if self.synced_texture[index] != self.texture[index]:
+            self.loadRowTexture(index)
+
+        return self.rows[index]
+
+    def syncRow(self, index: int) -> GameObject.Asteroid:
+        # Copies one row of the arrays into its asteroid object, so it can be used by non-vectorised code
+        asteroid = self.syncTexture(index)
+        asteroid.sprite.x = asteroid.spinning_sprite.x = float(self.x[index])
+        asteroid.sprite.y = asteroid.spinning_sprite.y = float(self.y[index])
+        asteroid.sprite.scale = asteroid.spinning_sprite.scale = float(self.scale[index])
+        asteroid.spinning_sprite.rotation = float(self.rotation[index])
+        asteroid.move_direction.Set(float(self.dir_x[index]), float(self.dir_y[index]))
+        asteroid.spin = float(self.spin[index])
+        asteroid.current_state = STATES[self.state[index]]
+        asteroid.current_score = self.score(index)
+        asteroid.is_destroyed = not self.alive[index]
+
+        return asteroid
+
+    def visibleIndices(self, bounds) -> np.ndarray:
+        # Live asteroids that overlap the screen, padded by half their size to account for rotation
+        # Everything wraps, so this only leaves out rows that haven't been wrapped since they were placed
+        n = self.count
+        extent_x = self.extent_x[:n]
+        extent_y = self.extent_y[:n]
+        pad_x = extent_x * 0.5
+        pad_y = extent_y * 0.5
+
+        on_screen = (self.x[:n] + extent_x + pad_x >= 0) & (self.x[:n] - pad_x <= bounds.width) \
+            & (self.y[:n] + extent_y + pad_y >= 0) & (self.y[:n] - pad_y <= bounds.height)
+
+        return np.flatnonzero(on_screen & self.alive[:n])
+
+    def syncVisible(self, bounds, alpha: float = 1.0) -> list:
+        # Only the rows that are actually going to be drawn get their sprites updated
+        # 'alpha' interpolates between the last two simulated positions, except for asteroids that just wrapped
+        # Asteroids straddling an edge are drawn again on the other side with ghost sprites
+        # With 'lod' set, far asteroids are synced less often and dense clusters of them become impostors
+        # Returns one (texture, sprites) batch per texture, ready for the render queue
+        visible = self.visibleIndices(bounds)
+        for index in visible[self.synced_texture[visible] != self.texture[visible]].tolist():
+            self.loadRowTexture(index)
+
+        visible = visible[np.argsort(self.texture[visible], kind="stable")]
+        x, y = bounds.interpolate(self.x[visible], self.y[visible], self.prev_x[visible], self.prev_y[visible], alpha)
+
+        sync = None
+        impostors = {}
+        if self.lod is not None:
+            draw, sync, cells = self.lod.plan(visible, x, y, self.extent_x[visible], self.extent_y[visible], bounds)
+            impostors = dict(self.lod.impostorSprites(cells))
+
+            # Rows that were hidden or have wrapped since are synced straight away,
+            # the others are drawn where they were last synced
+            self.sprite_stale[visible[~draw]] = True
+            visible = visible[draw]
+            x = x[draw]
+            y = y[draw]
+            sync = sync[draw] | self.sprite_stale[visible] | (np.abs(x - self.sprite_x[visible]) > bounds.width / 2) \
+                | (np.abs(y - self.sprite_y[visible]) > bounds.height / 2)
+            x = np.where(sync, x, self.sprite_x[visible])
+            y = np.where(sync, y, self.sprite_y[visible])
+            self.sprite_x[visible] = x
+            self.sprite_y[visible] = y
+            self.sprite_stale[visible] = False
+
+        textures = self.texture[visible]
+        scales = self.scale[visible]
+        rotations = self.rotation[visible]
+
+        # Ghosts are sorted the same way as the rows they copy, so each texture's ghosts are one slice
+        ghosts, offsets_x, offsets_y = bounds.ghosts(x, y, self.extent_x[visible], self.extent_y[visible])
+        order = np.argsort(ghosts, kind="stable")
+        ghosts = ghosts[order]
+        ghost_xs = (x[ghosts] + offsets_x[order]).tolist()
+        ghost_ys = (y[ghosts] + offsets_y[order]).tolist()
+        ghost_scales = scales[ghosts].tolist()
+        ghost_rotations = rotations[ghosts].tolist()
+
+        xs = x.tolist()
+        ys = y.tolist()
+        scales = scales.tolist()
+        rotations = rotations.tolist()
+        indices = visible.tolist()
+        rows = self.rows
+
+        if sync is None:
+            drawn = []
+            for i, index in enumerate(indices):
+                sprite = rows[index].spinning_sprite
+                sprite.x = xs[i]
+                sprite.y = ys[i]
+                sprite.scale = scales[i]
+                sprite.rotation = rotations[i]
+                drawn.append(sprite)
+        else:
+            for i in np.flatnonzero(sync).tolist():
+                sprite = rows[indices[i]].spinning_sprite
+                sprite.x = xs[i]
+                sprite.y = ys[i]
+                sprite.scale = scales[i]
+                sprite.rotation = rotations[i]
+            drawn = [rows[index].spinning_sprite for index in indices]
+
+        batches = []
+        boundaries = np.flatnonzero(np.diff(textures)) + 1
+        starts = [0] + boundaries.tolist()
+        ends = boundaries.tolist() + [len(visible)]
+        ghost_starts = np.searchsorted(ghosts, starts).tolist()
+        ghost_ends = np.searchsorted(ghosts, ends).tolist()
+        for start, end, ghost_start, ghost_end in zip(starts, ends, ghost_starts, ghost_ends):
+            if end == start:
+                continue
+
+            texture = int(textures[start])
+            sprites = drawn[start:end]
+            if ghost_end > ghost_start:
+                sprites += self.ghost_sprites[texture].place(ghost_xs[ghost_start:ghost_end],
+                                                             ghost_ys[ghost_start:ghost_end],
+                                                             ghost_scales[ghost_start:ghost_end],
+                                                             ghost_rotations[ghost_start:ghost_end])
+
+            sprites += impostors.pop(texture, [])
+            batches.append((self.texture_objects[texture], sprites))
+
+        for texture, sprites in impostors.items():
+            batches.append((self.texture_objects[texture], sprites))
+
+        return batches
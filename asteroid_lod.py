@@ -0,0 +1,111 @@
+import math
+
+import numpy as np
+
+from world_bounds import GhostSprites
+
+
+class AsteroidLOD:
+    """ Level of detail for drawing asteroid fields of many thousands
+
+    Asteroids are sorted by how far their centre is from a focus point
+    (the player's ship), measured the short way around the wrapped edges.
+    Near asteroids are synced and drawn every frame as usual. Far ones only
+    have their sprites synced every 'far_interval' frames, staggered so an
+    even share of them is refreshed each frame, and are drawn where they
+    were last synced in between. Far ones that sit in a dense cluster, at
+    least 'cluster_size' of them in one cell of a 'cluster_cell' grid,
+    aren't drawn at all: one impostor sprite covers the whole cell instead.
+    SMALL asteroids also stop spinning, see AsteroidField.spinAll.
+
+    Attach it with 'AsteroidField.lod', the field works as before without.
+    """
+
+    def __init__(self, textures, texture_files: list, far_distance: float = 250.0, far_interval: int = 4,
+                 cluster_cell: float = 128.0, cluster_size: int = 8, spin_small: bool = False) -> None:
+        self.far_distance = far_distance
+        self.far_interval = far_interval
+        self.cluster_cell = cluster_cell
+        self.cluster_size = cluster_size
+        self.spin_small = spin_small
+
+        self.texture_sizes = [textures.size(texture_file) for texture_file in texture_files]
+        self.impostor_sprites = [GhostSprites(textures, texture_file) for texture_file in texture_files]
+
+        self.focus_x = 0.0
+        self.focus_y = 0.0
+        self.frame = 0
+
+        # What the last frame came out as, for the frame timing overlay and benchmarks
+        self.drawn = 0
+        self.synced = 0
+        self.clustered = 0
+        self.impostors = 0
+
+    def setFocus(self, sprite) -> None:
+        self.focus_x = sprite.x + sprite.width * sprite.scale / 2
+        self.focus_y = sprite.y + sprite.height * sprite.scale / 2
+
+    def plan(self, indices: np.ndarray, x: np.ndarray, y: np.ndarray, extent_x: np.ndarray, extent_y: np.ndarray,
+             bounds):
+        """ Picks what to do with each of the asteroids about to be drawn
+
+        The arrays line up with 'indices', the asteroids' rows. Returns
+        masks of which to draw and which of those to sync this frame, and
+        the cells to draw impostors in as (cell x, cell y) arrays.
+        """
+        self.frame += 1
+        centre_x = x + extent_x / 2
+        centre_y = y + extent_y / 2
+        distance_x = np.abs(centre_x - self.focus_x)
+        distance_y = np.abs(centre_y - self.focus_y)
+        distance_x = np.minimum(distance_x, bounds.width - distance_x)
+        distance_y = np.minimum(distance_y, bounds.height - distance_y)
+        far = distance_x * distance_x + distance_y * distance_y > self.far_distance * self.far_distance
+
+        # Far asteroids are counted per grid cell, and the crowded cells are swapped for impostors
+        cell_x = np.floor(centre_x / self.cluster_cell).astype(np.int64)
+        cell_y = np.floor(centre_y / self.cluster_cell).astype(np.int64)
+        columns = int(math.ceil(bounds.width / self.cluster_cell)) + 2
+        cells = (cell_y + 1) * columns + cell_x + 1
+        far_rows = np.flatnonzero(far)
+        crowded, inverse, counts = np.unique(cells[far_rows], return_inverse=True, return_counts=True)
+        clustered = np.zeros(len(indices), dtype=bool)
+        clustered[far_rows] = counts[inverse] >= self.cluster_size
+        crowded = crowded[counts >= self.cluster_size]
+
+        draw = ~clustered
+        sync = draw & (~far | ((indices + self.frame) % self.far_interval == 0))
+
+        self.drawn = int(np.count_nonzero(draw))
+        self.synced = int(np.count_nonzero(sync))
+        self.clustered = len(indices) - self.drawn
+        self.impostors = len(crowded)
+        return draw, sync, (crowded % columns - 1, crowded // columns - 1)
+
+    def impostorSprites(self, cells) -> list:
+        # One (texture index, sprites) pair for each texture used by the impostors in 'cells', see plan()
+        # Each cell always gets the same texture and rotation, so impostors don't flicker while they stay
+        cell_x, cell_y = cells
+        if len(cell_x) == 0:
+            return []
+
+        keys = cell_x * 7919 + cell_y * 104729
+        textures = keys % len(self.impostor_sprites)
+        rotations = (keys * 2.399963) % (2 * math.pi)
+        centre_x = (cell_x + 0.5) * self.cluster_cell
+        centre_y = (cell_y + 0.5) * self.cluster_cell
+
+        impostors = []
+        for texture, sprites in enumerate(self.impostor_sprites):
+            chosen = textures == texture
+            if not chosen.any():
+                continue
+
+            width, height = self.texture_sizes[texture]
+            scale = self.cluster_cell * 1.5 / max(width, height)
+            impostors.append((texture, sprites.place((centre_x[chosen] - width * scale / 2).tolist(),
+                                                     (centre_y[chosen] - height * scale / 2).tolist(),
+                                                     scale, rotations[chosen].tolist())))
+
+        return impostors
@@ -0,0 +1,118 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+from pngio import readPNG, writePNG
+from texture_cache import ATLAS_FILES, ATLAS_IMAGE, ATLAS_MANIFEST, ATLAS_VERSION, normalisePath
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Transparent gap around every sprite, filled by stretching its edge pixels so filtering never samples a neighbour
+PADDING = 2
+
+# Largest texture the atlas may grow to on either side
+MAX_SIZE = 4096
+
+
+def nextPowerOfTwo(value: int) -> int:
+    return 1 << max(0, int(value - 1).bit_length())
+
+
+def shelfPack(sizes: list, width: int):
+    """ Packs rectangles into rows ('shelves') across an atlas 'width' wide
+
+    Rectangles go in tallest first, left to right, starting a new shelf
+    whenever the current one is full. Returns the (x, y) of each rectangle
+    in the order given and the height the atlas needs, or None if one of
+    them is wider than the atlas.
+    """
+    order = sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0]))
+    positions = [None] * len(sizes)
+    shelf_x = 0
+    shelf_y = 0
+    shelf_height = 0
+    for i in order:
+        rect_width, rect_height = sizes[i]
+        if rect_width > width:
+            return None
+
+        if shelf_x + rect_width > width:
+            shelf_y += shelf_height
+            shelf_x = 0
+            shelf_height = 0
+
+        positions[i] = (shelf_x, shelf_y)
+        shelf_x += rect_width
+        shelf_height = max(shelf_height, rect_height)
+
+    return positions, shelf_y + shelf_height
+
+
+def packAtlas(sizes: list):
+    # Tries every power-of-two width and keeps the smallest atlas, the squarest one on a tie
+    best = None
+    width = nextPowerOfTwo(max(size[0] for size in sizes))
+    while width <= MAX_SIZE:
+        packed = shelfPack(sizes, width)
+        if packed is not None:
+            positions, height = packed
+            height = nextPowerOfTwo(height)
+            key = (width * height, abs(width - height))
+            if height <= MAX_SIZE and (best is None or key < best[0]):
+                best = (key, positions, width, height)
+        width *= 2
+
+    if best is None:
+        raise ValueError("the sprites don't fit in a " + str(MAX_SIZE) + "x" + str(MAX_SIZE) + " atlas")
+
+    key, positions, width, height = best
+    return positions, width, height
+
+
+def buildAtlas(paths: list, image_path: str, manifest_path: str) -> dict:
+    # Packs the images at 'paths' into one PNG, and writes a manifest of where each one ended up
+    keys = [normalisePath(path) for path in paths]
+    images = [readPNG(os.path.join(ROOT_DIR, key)) for key in keys]
+    sizes = [(image.shape[1] + PADDING * 2, image.shape[0] + PADDING * 2) for image in images]
+    positions, width, height = packAtlas(sizes)
+
+    pixels = np.zeros((height, width, 4), dtype=np.uint8)
+    sprites = {}
+    for key, image, (x, y) in zip(keys, images, positions):
+        padded = np.pad(image, ((PADDING, PADDING), (PADDING, PADDING), (0, 0)), mode="edge")
+        pixels[y:y + padded.shape[0], x:x + padded.shape[1]] = padded
+
+        stat = os.stat(os.path.join(ROOT_DIR, key))
+        sprites[key] = {"rect": [x + PADDING, y + PADDING, image.shape[1], image.shape[0]],
+                        "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    manifest = {"version": ATLAS_VERSION, "image": normalisePath(image_path), "width": width, "height": height,
+                "sprites": sprites}
+
+    image_file = os.path.join(ROOT_DIR, normalisePath(image_path))
+    os.makedirs(os.path.dirname(image_file), exist_ok=True)
+    writePNG(image_file, pixels)
+    with open(os.path.join(ROOT_DIR, normalisePath(manifest_path)), "w") as file:
+        json.dump(manifest, file, indent=1)
+
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack the game's sprites into one texture atlas")
+    parser.add_argument("files", nargs="*", help="images to pack (default: every sprite the game uses)")
+    parser.add_argument("--image", default=ATLAS_IMAGE, help="where to write the atlas image")
+    parser.add_argument("--manifest", default=ATLAS_MANIFEST, help="where to write the JSON manifest")
+    args = parser.parse_args()
+
+    manifest = buildAtlas(args.files or ATLAS_FILES, args.image, args.manifest)
+    used = sum(rect[2] * rect[3] for rect in (sprite["rect"] for sprite in manifest["sprites"].values()))
+    print("Packed " + str(len(manifest["sprites"])) + " sprites into a " + str(manifest["width"]) + "x" +
+          str(manifest["height"]) + " atlas, " + "{:.0%}".format(used / (manifest["width"] * manifest["height"])) +
+          " used")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from headless import HeadlessGame
+import pyasge
+import tutorial_game
+
+
+# -----------
+# -- Scenarios --
+# -----------
+# Each scenario sets up a fresh headless game and returns a function that runs once before every tick,
+# which is where scripted input goes
+
+def keepPlayerAlive(game) -> None:
+    # Keeps the player permanently invincible, so a round never ends part way through a benchmark
+    game.player.current_timer = float("inf")
+
+
+def idleMenu(headless: HeadlessGame):
+    return None
+
+
+def asteroidWave(count: int):
+    def setUp(headless: HeadlessGame):
+        game = headless.game
+        headless.startGame(tutorial_game.GameMode.ENDLESS)
+        keepPlayerAlive(game)
+        game.asteroid_max_count = count
+        game.respawn(False)
+        return None
+
+    return setUp
+
+
+def stressMode(headless: HeadlessGame):
+    # Stress mode as the player would start it, a 10,000 asteroid wave drawn with level of detail
+    game = headless.game
+    headless.startGame(tutorial_game.GameMode.STRESS)
+    keepPlayerAlive(game)
+    return None
+
+
+def projectileSpam(headless: HeadlessGame):
+    # The player spins on the spot and fires on every tick, so the projectile pool is always full
+    game = headless.game
+    headless.startGame(tutorial_game.GameMode.ENDLESS)
+    keepPlayerAlive(game)
+    game.asteroid_max_count = 100
+    game.respawn(False)
+    headless.press(pyasge.KEYS.KEY_LEFT)
+
+    def script(tick: int) -> None:
+        headless.press(pyasge.KEYS.KEY_SPACE)
+        headless.release(pyasge.KEYS.KEY_SPACE)
+
+    return script
+
+
+def rapidFire(headless: HeadlessGame):
+    # Space is held down in rapid-fire mode while the player spins, so a few hundred projectiles are always in the air
+    game = headless.game
+    headless.startGame(tutorial_game.GameMode.ENDLESS)
+    keepPlayerAlive(game)
+    game.setRapidFire(True)
+    game.asteroid_max_count = 100
+    game.respawn(False)
+    headless.press(pyasge.KEYS.KEY_LEFT)
+    headless.press(pyasge.KEYS.KEY_SPACE)
+    return None
+
+
+def splitCascade(headless: HeadlessGame):
+    # Every few ticks, every live asteroid is broken at once, until the whole wave respawns
+    game = headless.game
+    headless.startGame(tutorial_game.GameMode.ENDLESS)
+    keepPlayerAlive(game)
+    game.asteroid_max_count = 500
+    game.respawn(False)
+
+    def script(tick: int) -> None:
+        if tick % 10 == 0:
+            for index in game.asteroids.liveIndices().tolist():
+                game.breakAsteroid(index)
+
+    return script
+
+
+def alienSwarm(count: int):
+    # Many aliens at once, their spawn timers are run down so they are all flying (and shooting) straight away
+    def setUp(headless: HeadlessGame):
+        game = headless.game
+        headless.startGame(tutorial_game.GameMode.ENDLESS)
+        keepPlayerAlive(game)
+        game.alien_count = count
+        game.respawn(True)
+        game.enemies.spawn_timer[:] = -1
+        return None
+
+    return setUp
+
+
+SCENARIOS = {
+    "idle_menu": idleMenu,
+    "asteroids_3": asteroidWave(3),
+    "asteroids_100": asteroidWave(100),
+    "asteroids_1000": asteroidWave(1000),
+    "asteroids_10000": asteroidWave(10000),
+    "stress": stressMode,
+    "projectile_spam": projectileSpam,
+    "rapid_fire": rapidFire,
+    "split_cascade": splitCascade,
+    "aliens_50": alienSwarm(50),
+}
+
+
+# -----------
+# -- Measuring --
+# -----------
+
+def takeSnapshot() -> tracemalloc.Snapshot:
+    # The snapshots themselves are left out, so they don't count towards the next tick's blocks
+    return tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+
+
+def runScenario(name: str, ticks: int, warmup: int, seed: int, render: bool, governor: bool = False) -> dict:
+    headless = HeadlessGame(render=render, seed=seed)
+    headless.game.governor.setEnabled(governor)
+    script = SCENARIOS[name](headless)
+
+    def tick(i: int) -> None:
+        if script is not None:
+            script(i)
+        headless.step()
+
+    for i in range(warmup):
+        tick(i)
+
+    # Timing pass
+    # 'allocated_blocks_per_tick' is how many more blocks the interpreter holds after it than before, per tick,
+    # read here where nothing is being traced
+    tick_times = np.zeros(ticks)
+    block_start = sys.getallocatedblocks()
+    start = time.perf_counter()
+    for i in range(ticks):
+        tick_start = time.perf_counter()
+        tick(warmup + i)
+        tick_times[i] = time.perf_counter() - tick_start
+    total = time.perf_counter() - start
+    block_growth = sys.getallocatedblocks() - block_start
+    # Tracing below slows every tick down, which the governor would react to
+    quality = headless.game.governor.level.name
+
+    # Allocation pass, kept separate because tracing slows everything down
+    # 'peak_alloc_bytes_per_tick' is the peak traced memory above the start of each tick, which counts
+    # temporaries that are freed again before the tick ends
+    # 'alloc_blocks_per_tick' counts the blocks allocated during each tick that are still held at its end,
+    # from the difference between snapshots taken either side of it
+    alloc_ticks = min(ticks, 200)
+    peak_bytes = np.zeros(alloc_ticks)
+    alloc_blocks = np.zeros(alloc_ticks)
+    tracemalloc.start()
+    snapshot = takeSnapshot()
+    for i in range(alloc_ticks):
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        tick(warmup + ticks + i)
+        peak_bytes[i] = tracemalloc.get_traced_memory()[1] - current
+
+        previous, snapshot = snapshot, takeSnapshot()
+        alloc_blocks[i] = sum(stat.count_diff for stat in snapshot.compare_to(previous, "lineno")
+                              if stat.count_diff > 0)
+    tracemalloc.stop()
+
+    game = headless.game
+    return {
+        "ticks": ticks,
+        "ticks_per_second": ticks / total if total > 0 else float("inf"),
+        "tick_ms_mean": float(tick_times.mean() * 1000),
+        "tick_ms_p50": float(np.percentile(tick_times, 50) * 1000),
+        "tick_ms_p99": float(np.percentile(tick_times, 99) * 1000),
+        "tick_ms_max": float(tick_times.max() * 1000),
+        "peak_alloc_bytes_per_tick": float(peak_bytes.mean()),
+        "alloc_blocks_per_tick": float(alloc_blocks.mean()),
+        "allocated_blocks_per_tick": block_growth / ticks,
+        "live_asteroids": int(game.asteroids.live_count),
+        "state": game.current_game_state.name,
+        "quality": quality,
+    }
+
+
+def gitRevision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: dict, baseline: dict) -> None:
+    # Prints the change in throughput and tail latency against an earlier results file
+    print()
+    print("Compared with " + baseline.get("revision", "baseline") + ":")
+    for name, result in results["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if old is None:
+            continue
+
+        speedup = result["ticks_per_second"] / old["ticks_per_second"] if old["ticks_per_second"] else 0
+        p99_change = result["tick_ms_p99"] - old["tick_ms_p99"]
+        print("  {:<18} {:>6.2f}x ticks/s   p99 {:+.3f} ms".format(name, speedup, p99_change))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the game's update loop in scripted scenarios")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="scenario to run, can be given more than once (default: all)")
+    parser.add_argument("--ticks", type=int, default=600, help="measured ticks per scenario")
+    parser.add_argument("--warmup", type=int, default=60, help="unmeasured ticks before measuring")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--render", action="store_true", help="include render() in every tick")
+    parser.add_argument("--governor", action="store_true", help="let the frame governor shed work as it would in game")
+    parser.add_argument("--output", default="benchmark.json", help="where to write the JSON results")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    results = {
+        "revision": gitRevision(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "render": args.render,
+        "governor": args.governor,
+        "scenarios": {},
+    }
+
+    print("{:<18} {:>12} {:>10} {:>10} {:>14} {:>12}".format("scenario", "ticks/s", "p50 ms", "p99 ms",
+                                                            "peak B/tick", "blocks/tick"))
+    for name in args.scenario or SCENARIOS:
+        result = runScenario(name, args.ticks, args.warmup, args.seed, args.render, args.governor)
+        results["scenarios"][name] = result
+        print("{:<18} {:>12.0f} {:>10.3f} {:>10.3f} {:>14.0f} {:>12.1f}".format(
+            name, result["ticks_per_second"], result["tick_ms_p50"], result["tick_ms_p99"],
+            result["peak_alloc_bytes_per_tick"], result["alloc_blocks_per_tick"]))
+
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file))
+
+
+if __name__ == "__main__":
+    main()
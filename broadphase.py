@@ -0,0 +1,127 @@
+import numpy as np
+
+# Cell coordinates are offset so negative cells (objects hanging off the top/left of the screen) still pack into a key
+CELL_OFFSET = 1 << 20
+CELL_STRIDE = 1 << 21
+
+# Up to this many entries, testing every entry against every query box is cheaper than building and searching the grid
+DIRECT_LIMIT = 64
+
+
+def cellKey(cell_x: np.ndarray, cell_y: np.ndarray) -> np.ndarray:
+    return (cell_x + CELL_OFFSET) * CELL_STRIDE + (cell_y + CELL_OFFSET)
+
+
+def expandRanges(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    # Turns [start, start + count) ranges into one flat array of indices, without a Python loop
+    total = int(counts.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    offsets = np.repeat(np.cumsum(counts) - counts, counts)
+    return np.arange(total, dtype=np.int64) - offsets + np.repeat(starts, counts)
+
+
+class SpatialHash:
+    """ Uniform grid broadphase, rebuilt from scratch every tick
+
+    Every entry is filed under the grid cell that holds its top-left
+    corner. The cells are at least as big as the largest entry, so
+    anything overlapping a box can only be filed in the cells covering
+    that box plus one cell up and to the left. Instead of a dictionary of
+    lists, the occupied cells are kept sorted in a NumPy array and looked
+    up with searchsorted, which keeps rebuilding and querying vectorised.
+    With no more than 'direct_limit' entries (e.g. the handful of
+    asteroids in a normal game) the grid isn't built at all, and queries
+    test every entry's box directly instead.
+    """
+
+    def __init__(self, min_cell_size: float = 64.0, direct_limit: int = DIRECT_LIMIT) -> None:
+        self.min_cell_size = min_cell_size
+        self.cell_size = min_cell_size
+        self.direct_limit = direct_limit
+        self.direct = True
+        self.ids = np.zeros(0, dtype=np.int64)
+
+        # Grid: each occupied cell's key, and where its entries start in 'ids' and how many there are
+        self.cells = np.zeros(0, dtype=np.int64)
+        self.starts = np.zeros(0, dtype=np.int64)
+        self.counts = np.zeros(0, dtype=np.int64)
+
+        # Direct: every entry's box
+        self.x = np.zeros(0)
+        self.y = np.zeros(0)
+        self.width = np.zeros(0)
+        self.height = np.zeros(0)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def rebuild(self, x: np.ndarray, y: np.ndarray, width: np.ndarray, height: np.ndarray, ids: np.ndarray) -> None:
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(ids) <= self.direct_limit:
+            self.direct = True
+            self.ids = ids
+            self.x = np.asarray(x, dtype=float)
+            self.y = np.asarray(y, dtype=float)
+            self.width = np.asarray(width, dtype=float)
+            self.height = np.asarray(height, dtype=float)
+            return
+
+        self.direct = False
+        self.cell_size = max(self.min_cell_size, float(np.max(width)), float(np.max(height)))
+
+        keys = cellKey(np.floor(x / self.cell_size).astype(np.int64),
+                       np.floor(y / self.cell_size).astype(np.int64))
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        self.ids = ids[order]
+
+        starts = np.flatnonzero(np.diff(keys)) + 1
+        self.starts = np.concatenate(([0], starts))
+        self.counts = np.diff(np.concatenate((self.starts, [len(keys)])))
+        self.cells = keys[self.starts]
+
+    def queryPairs(self, x: np.ndarray, y: np.ndarray, width: np.ndarray, height: np.ndarray):
+        # Returns (query index, entry id) for every entry whose cell is near one of the query boxes
+        # These are only candidates, the caller still has to run the narrowphase on them
+        if len(self.ids) == 0 or len(x) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        width = np.asarray(width, dtype=float)
+        height = np.asarray(height, dtype=float)
+        if self.direct:
+            # Every entry whose box touches a query box, the same test as 'isInside' without a margin
+            x = x[:, None]
+            y = y[:, None]
+            hits = (x + width[:, None] >= self.x) & (self.x + self.width >= x) \
+                & (y + height[:, None] >= self.y) & (self.y + self.height >= y)
+            queries, entries = np.nonzero(hits)
+            return queries, self.ids[entries]
+
+        cell_size = self.cell_size
+        first_x = np.floor((x - cell_size) / cell_size).astype(np.int64)
+        first_y = np.floor((y - cell_size) / cell_size).astype(np.int64)
+        span_x = np.floor((x + width) / cell_size).astype(np.int64) - first_x + 1
+        span_y = np.floor((y + height) / cell_size).astype(np.int64) - first_y + 1
+
+        # Every cell covered by each query box, as one flat array of (query, cell) pairs
+        covered = span_x * span_y
+        queries = np.repeat(np.arange(len(x), dtype=np.int64), covered)
+        local = expandRanges(np.zeros(len(x), dtype=np.int64), covered)
+        rows = span_y[queries]
+        keys = cellKey(first_x[queries] + local // rows, first_y[queries] + local % rows)
+
+        # One search finds each cell among the occupied ones, empty cells come back with no entries
+        slots = np.minimum(np.searchsorted(self.cells, keys), len(self.cells) - 1)
+        counts = np.where(self.cells[slots] == keys, self.counts[slots], 0)
+        return np.repeat(queries, counts), self.ids[expandRanges(self.starts[slots], counts)]
+
+    def query(self, x: float, y: float, width: float, height: float) -> np.ndarray:
+        # Candidate entry ids near a single box, in ascending order whichever way they were found
+        return np.sort(self.queryPairs(np.array([x]), np.array([y]), np.array([width]), np.array([height]))[1])
+
+    def querySprite(self, sprite) -> np.ndarray:
+        return self.query(sprite.x, sprite.y, sprite.width * sprite.scale, sprite.height * sprite.scale)
@@ -0,0 +1,326 @@
+import json
+import os
+
+import numpy as np
+
+from pngio import readAlpha
+from texture_cache import normalisePath
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_PATH = os.path.join(ROOT_DIR, "cache", "collision_masks.json")
+CACHE_VERSION = 1
+
+# Pixels at least this opaque count as solid, which leaves out the anti-aliased fringe
+ALPHA_THRESHOLD = 64
+
+# Hulls are simplified down to at most this many points, and padded up to it so they can be stacked
+MAX_HULL_POINTS = 16
+
+
+# -----------
+# -- Building hulls --
+# -----------
+
+def cross(a: np.ndarray, b: np.ndarray) -> float:
+    return a[0] * b[1] - a[1] * b[0]
+
+
+def convexHull(points: np.ndarray) -> np.ndarray:
+    # Andrew's monotone chain, returns the hull counter-clockwise without repeating the first point
+    points = np.unique(points, axis=0)
+    if len(points) < 3:
+        return points
+
+    def halfHull(ordered):
+        hull = []
+        for point in ordered:
+            while len(hull) >= 2 and cross(hull[-1] - hull[-2], point - hull[-2]) <= 0:
+                hull.pop()
+            hull.append(point)
+        return hull
+
+    lower = halfHull(points)
+    upper = halfHull(points[::-1])
+    return np.array(lower[:-1] + upper[:-1], dtype=np.float64)
+
+
+def simplifyHull(hull: np.ndarray, max_points: int) -> np.ndarray:
+    # Drops the points that cut off the least area until there are few enough
+    # This can only shrink the hull, by less than a pixel for the round sprites in the game
+    hull = list(hull)
+    while len(hull) > max_points:
+        areas = [abs(cross(hull[i] - hull[i - 1], hull[(i + 1) % len(hull)] - hull[i - 1]))
+                 for i in range(len(hull))]
+        del hull[int(np.argmin(areas))]
+
+    return np.array(hull, dtype=np.float64)
+
+
+def buildHull(alpha: np.ndarray, threshold: int = ALPHA_THRESHOLD, max_points: int = MAX_HULL_POINTS) -> np.ndarray:
+    # Convex hull of the solid pixels, in texture pixels with (0, 0) at the top-left corner
+    solid = alpha >= threshold
+    rows = np.flatnonzero(solid.any(axis=1))
+    if len(rows) == 0:
+        # Nothing solid at all, so fall back to the whole texture
+        height, width = alpha.shape
+        return np.array([[0, 0], [width, 0], [width, height], [0, height]], dtype=np.float64)
+
+    # Only the leftmost and rightmost solid pixel of each row can be on the hull, so use their outer corners
+    left = solid[rows].argmax(axis=1)
+    right = solid.shape[1] - solid[rows][:, ::-1].argmax(axis=1)
+    corners = np.concatenate([
+        np.stack([left, rows], axis=1), np.stack([left, rows + 1], axis=1),
+        np.stack([right, rows], axis=1), np.stack([right, rows + 1], axis=1),
+    ])
+
+    return simplifyHull(convexHull(corners.astype(np.float64)), max_points)
+
+
+def padHull(hull: np.ndarray, points: int = MAX_HULL_POINTS) -> np.ndarray:
+    # Repeating the last point adds zero-length edges, which don't change the result of hullsOverlap
+    padded = np.empty((points, 2))
+    padded[:len(hull)] = hull
+    padded[len(hull):] = hull[-1]
+    return padded
+
+
+# -----------
+# -- Testing hulls --
+# -----------
+
+def placeHulls(hulls: np.ndarray, x, y, width, height, scale, rotation) -> np.ndarray:
+    # Moves texture-space hulls to where their sprites are on screen, all arguments broadcast together
+    # Sprites are scaled from their top-left corner and rotated about the centre of the scaled sprite
+    hulls = np.asarray(hulls, dtype=np.float64)
+    x, y, width, height, scale, rotation = (np.asarray(value, dtype=np.float64)[..., None]
+                                            for value in (x, y, width, height, scale, rotation))
+    half_width = width * scale / 2
+    half_height = height * scale / 2
+    local_x = hulls[..., 0] * scale - half_width
+    local_y = hulls[..., 1] * scale - half_height
+
+    cos = np.cos(rotation)
+    sin = np.sin(rotation)
+    return np.stack([x + half_width + local_x * cos - local_y * sin,
+                     y + half_height + local_x * sin + local_y * cos], axis=-1)
+
+
+def hullsOverlap(hulls_1: np.ndarray, hulls_2: np.ndarray) -> np.ndarray:
+    """ Separating axis test between pairs of placed convex hulls
+
+    Takes two (pairs, points, 2) arrays, and returns for each pair
+    whether the hulls overlap. Two convex shapes only overlap if their
+    projections overlap on the normal of every edge of both shapes.
+    """
+    hulls_1 = np.asarray(hulls_1)
+    hulls_2 = np.asarray(hulls_2)
+    edges = np.concatenate([np.roll(hulls_1, -1, axis=-2) - hulls_1,
+                            np.roll(hulls_2, -1, axis=-2) - hulls_2], axis=-2)
+    axes = np.stack([-edges[..., 1], edges[..., 0]], axis=-1)
+
+    # Plain broadcasting is much faster than matmul for lots of tiny matrices
+    axis_x = axes[..., :, None, 0]
+    axis_y = axes[..., :, None, 1]
+    projected_1 = axis_x * hulls_1[..., None, :, 0] + axis_y * hulls_1[..., None, :, 1]
+    projected_2 = axis_x * hulls_2[..., None, :, 0] + axis_y * hulls_2[..., None, :, 1]
+    separated = (projected_1.max(axis=-1) < projected_2.min(axis=-1)) \
+        | (projected_2.max(axis=-1) < projected_1.min(axis=-1))
+    return ~separated.any(axis=-1)
+
+
+def hullRadii(hull: np.ndarray, width: float, height: float):
+    # Radii of the largest circle around the texture's centre that fits inside the hull (0 if the centre isn't
+    # inside it) and of the smallest that holds all of it, in texture pixels
+    centre = np.array([width / 2, height / 2])
+    outer = float(np.sqrt(((hull - centre) ** 2).sum(axis=1)).max())
+
+    edges = np.roll(hull, -1, axis=0) - hull
+    lengths = np.sqrt((edges ** 2).sum(axis=1))
+    real = lengths > 0
+    offsets = centre - hull[real]
+    distances = (edges[real, 0] * offsets[:, 1] - edges[real, 1] * offsets[:, 0]) / lengths[real]
+    inside = (distances >= 0).all() or (distances <= 0).all()
+    inner = float(np.abs(distances).min()) if inside else 0.0
+    return inner, outer
+
+
+def bodiesTouch(body_1, body_2) -> np.ndarray:
+    """ Narrowphase between pairs of sprites whose bounding boxes overlap
+
+    A body is (hull, x, y, width, height, scale, rotation, inner, outer)
+    where 'inner' and 'outer' come from hullRadii, and every value
+    broadcasts over the pairs. Pairs whose inner circles overlap are
+    touching and pairs whose outer circles don't can't be, so only the
+    pairs in between are placed and given the separating axis test.
+    """
+    hull_1, x_1, y_1, width_1, height_1, scale_1, rotation_1, inner_1, outer_1 = body_1
+    hull_2, x_2, y_2, width_2, height_2, scale_2, rotation_2, inner_2, outer_2 = body_2
+
+    distance = np.hypot(x_1 + width_1 * scale_1 / 2 - x_2 - width_2 * scale_2 / 2,
+                        y_1 + height_1 * scale_1 / 2 - y_2 - height_2 * scale_2 / 2)
+    touching = np.array(distance <= inner_1 * scale_1 + inner_2 * scale_2)
+    unsure = ~touching & (distance <= outer_1 * scale_1 + outer_2 * scale_2)
+    if not unsure.any():
+        return touching
+
+    shape = unsure.shape
+    placed = []
+    for hull, *values in ((hull_1, x_1, y_1, width_1, height_1, scale_1, rotation_1),
+                          (hull_2, x_2, y_2, width_2, height_2, scale_2, rotation_2)):
+        hull = np.asarray(hull)
+        if hull.ndim == 3:
+            hull = hull[unsure]
+        values = [np.broadcast_to(value, shape)[unsure] for value in values]
+        placed.append(placeHulls(hull, *values))
+
+    touching[unsure] = hullsOverlap(*placed)
+    return touching
+
+
+def spriteBody(sprite, hull) -> tuple:
+    # The body bodiesTouch needs for a sprite and its CollisionHull, or None if it doesn't have a hull
+    if hull is None:
+        return None
+
+    return (hull.points, sprite.x, sprite.y, sprite.width, sprite.height, sprite.scale, sprite.rotation,
+            hull.inner, hull.outer)
+
+
+def shiftBody(body, offset_x: float, offset_y: float):
+    # The same body moved by an offset, e.g. a ghost copy from WorldBounds.spriteOffsets
+    if body is None or (offset_x == 0 and offset_y == 0):
+        return body
+
+    hull, x, y, *rest = body
+    return (hull, x + offset_x, y + offset_y, *rest)
+
+
+def spritesTouch(sprite_1, hull_1, sprite_2, hull_2) -> bool:
+    # Narrowphase for two sprites that already passed 'isInside', sprites without a hull only use the AABB test
+    if hull_1 is None or hull_2 is None:
+        return True
+
+    return bool(bodiesTouch(spriteBody(sprite_1, hull_1), spriteBody(sprite_2, hull_2)))
+
+
+# -----------
+# -- Moving boxes --
+# -----------
+
+def sweptBoxes(x, y, dx, dy, width, height, box_x, box_y, box_width, box_height, margin: float):
+    """ Swept version of 'isInside' for boxes that move by (dx, dy) over a step
+
+    Each moving box is shrunk to the point at its top-left corner and each
+    target box grown by the same amount, so the test becomes the point's
+    path against a box (the slab method). Every argument broadcasts over
+    the pairs, and a box that doesn't move gives the same answer as
+    'isInside'. Returns whether each pair meets at any point of the step,
+    and the fraction of the step to compare their hulls at: the moment
+    their centres are closest, kept within the part of the step that the
+    boxes overlap.
+    """
+    enter = np.zeros(np.broadcast(x, y, dx, dy, box_x, box_y).shape)
+    leave = np.ones(enter.shape)
+    for start, delta, low, high in ((x, dx, box_x + 2 * margin - width, box_x + box_width - 2 * margin),
+                                    (y, dy, box_y + 2 * margin - height, box_y + box_height - 2 * margin)):
+        moving = delta != 0
+        step = np.where(moving, delta, 1.0)
+        t_low = (low - start) / step
+        t_high = (high - start) / step
+
+        # A box that isn't moving along this axis is either always or never between the two sides
+        inside = (start >= low) & (start <= high)
+        enter = np.maximum(enter, np.where(moving, np.minimum(t_low, t_high), np.where(inside, 0.0, np.inf)))
+        leave = np.minimum(leave, np.where(moving, np.maximum(t_low, t_high), np.where(inside, 1.0, -np.inf)))
+
+    length = dx * dx + dy * dy
+    closest = ((box_x + box_width / 2 - x - width / 2) * dx + (box_y + box_height / 2 - y - height / 2) * dy) \
+        / np.where(length > 0, length, 1.0)
+
+    hits = enter <= leave
+    return hits, np.clip(closest, enter, np.maximum(enter, leave))
+
+
+class CollisionHull:
+    # The convex hull of one texture's solid pixels, in texture pixels, with its circle radii from hullRadii
+
+    def __init__(self, points: np.ndarray, width: int, height: int) -> None:
+        self.points = padHull(points)
+        self.width = width
+        self.height = height
+        self.inner, self.outer = hullRadii(self.points, width, height)
+
+
+class CollisionMasks:
+    """ Convex collision hulls for textures, built from their alpha channel
+
+    The first time a texture is asked for its PNG is decoded and the hull
+    of its solid pixels is worked out, after which it's kept in memory and
+    in a JSON file on disk, so later runs never decode the image again.
+    Cached hulls are rebuilt when the image's size or modification time
+    changes. Every hull has MAX_HULL_POINTS points so hulls for different
+    textures can be stacked into one array.
+    """
+
+    def __init__(self, cache_path: str = CACHE_PATH) -> None:
+        self.cache_path = cache_path
+        self.hulls = {}
+        self.entries = {}
+        self.dirty = False
+        self.built = 0
+        self.loadCache()
+
+    def loadCache(self) -> None:
+        try:
+            with open(self.cache_path) as file:
+                cache = json.load(file)
+        except (OSError, ValueError):
+            return
+
+        if cache.get("version") == CACHE_VERSION and cache.get("max_points") == MAX_HULL_POINTS \
+                and cache.get("threshold") == ALPHA_THRESHOLD:
+            self.entries = cache.get("textures", {})
+
+    def save(self) -> None:
+        # Written to a temporary file first, so processes sharing the cache never read half a file
+        if not self.dirty:
+            return
+
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        temporary_path = self.cache_path + "." + str(os.getpid()) + ".tmp"
+        with open(temporary_path, "w") as file:
+            json.dump({"version": CACHE_VERSION, "max_points": MAX_HULL_POINTS, "threshold": ALPHA_THRESHOLD,
+                       "textures": self.entries}, file, indent=1)
+        os.replace(temporary_path, self.cache_path)
+        self.dirty = False
+
+    def get(self, path: str) -> CollisionHull:
+        key = normalisePath(path)
+        hull = self.hulls.get(key)
+        if hull is not None:
+            return hull
+
+        file_path = os.path.join(ROOT_DIR, key)
+        stat = os.stat(file_path)
+        entry = self.entries.get(key)
+        if entry is None or entry["size"] != stat.st_size or entry["mtime_ns"] != stat.st_mtime_ns:
+            alpha = readAlpha(file_path)
+            entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "width": alpha.shape[1],
+                     "height": alpha.shape[0], "hull": buildHull(alpha).tolist()}
+            self.entries[key] = entry
+            self.dirty = True
+            self.built += 1
+
+        hull = CollisionHull(np.array(entry["hull"], dtype=np.float64), entry["width"], entry["height"])
+        self.hulls[key] = hull
+        return hull
+
+    def preload(self, paths: list) -> None:
+        for path in paths:
+            self.get(path)
+
+        self.save()
+
+
+# Shared by every game in the process
+MASKS = CollisionMasks()
@@ -0,0 +1,4 @@
+import headless_pyasge
+
+# The game modules import pyasge, so the headless stand-in has to be registered before any test imports them
+headless_pyasge.install()
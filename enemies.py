@@ -0,0 +1,469 @@
+import random
+
+import numpy as np
+
+import GameObject
+from collision_mask import bodiesTouch, sweptBoxes
+from world_bounds import GhostSprites
+
+# The directions steer() can pick, one per quarter of the circle it checks the angle against
+ESCAPE_ANGLES = np.radians([-135.0, -45.0, 45.0, 135.0])
+
+
+class EnemyManager:
+    """ Every alien in the game and a shared pool of alien projectiles
+
+    Like the asteroid field, aliens and their projectiles are stored as
+    NumPy arrays with one row each, so the spawn and fire timers, moving,
+    turning away from the player and aiming at them are all done for
+    every alien at once, and dozens of aliens cost about the same Python
+    time per tick as one. Each row has a GameObject.Alien (or
+    AlienProjectile) whose sprite is only synced from the arrays when it
+    is drawn or handed to other game code, e.g. 'playerHurt'.
+
+    Each alien may have up to 'projectiles_per_alien' projectiles in the
+    air, and the pool is sized so that a free one is always there.
+    """
+
+    def __init__(self, alien_file: str, projectile_file: str, textures, game_res, count: int = 1, rng=random,
+                 masks=None, projectiles_per_alien: int = 1) -> None:
+        self.capacity = 0
+        self.count = 0
+        self.projectile_capacity = 0
+        self.projectiles_per_alien = projectiles_per_alien
+        self.aliens = []
+        self.projectiles = []
+
+        # Random source for spawning, the game passes in its seeded generator
+        self.rng = rng
+
+        self.game_res = game_res
+        self.textures = textures
+        self.alien_file = alien_file
+        self.projectile_file = projectile_file
+        self.alien_texture = textures.get(alien_file)
+        self.projectile_texture = textures.get(projectile_file)
+        self.alien_width, self.alien_height = textures.size(alien_file)
+        self.projectile_width, self.projectile_height = textures.size(projectile_file)
+
+        self.alien_hull = masks.get(alien_file) if masks is not None else None
+        self.projectile_hull = masks.get(projectile_file) if masks is not None else None
+        self.projectile_ghosts = GhostSprites(textures, projectile_file)
+
+        # Tuning values are read from these two copies rather than the classes,
+        # so a balance sweep can give one game its own values
+        self.alien = GameObject.Tuning(GameObject.Alien)
+        self.projectile = GameObject.Tuning(GameObject.AlienProjectile)
+
+        self.x = np.zeros(0)
+        self.y = np.zeros(0)
+        self.prev_x = np.zeros(0)
+        self.prev_y = np.zeros(0)
+        self.dir_x = np.zeros(0)
+        self.dir_y = np.zeros(0)
+        self.spawn_timer = np.zeros(0)
+        self.projectile_timer = np.zeros(0)
+        self.is_active = np.zeros(0, dtype=bool)
+        self.is_timer_active = np.zeros(0, dtype=bool)
+        self.escape_attempted = np.zeros(0, dtype=bool)
+
+        self.projectile_x = np.zeros(0)
+        self.projectile_y = np.zeros(0)
+        self.projectile_prev_x = np.zeros(0)
+        self.projectile_prev_y = np.zeros(0)
+        self.projectile_dir_x = np.zeros(0)
+        self.projectile_dir_y = np.zeros(0)
+        self.projectile_life = np.zeros(0)
+        self.projectile_owner = np.zeros(0, dtype=np.int64)
+        self.is_shot = np.zeros(0, dtype=bool)
+
+        # Projectiles that ran out of life on the last step, they can still hit the player on that step
+        self.expired = np.zeros(0, dtype=bool)
+
+        # How far each projectile moved along its direction on the last step, for projectileHits
+        self.projectile_step = 0.0
+
+        self.setCount(count)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def reserve(self, capacity: int) -> None:
+        # Grows every array (and the row objects) to hold 'capacity' aliens and their projectiles
+        if capacity <= self.capacity:
+            return
+
+        for name in ("x", "y", "prev_x", "prev_y", "dir_x", "dir_y", "spawn_timer", "projectile_timer",
+                     "is_active", "is_timer_active", "escape_attempted"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.capacity] = old
+            setattr(self, name, new)
+
+        projectile_capacity = capacity * self.projectiles_per_alien
+        for name in ("projectile_x", "projectile_y", "projectile_prev_x", "projectile_prev_y", "projectile_dir_x",
+                     "projectile_dir_y", "projectile_life", "projectile_owner", "is_shot", "expired"):
+            old = getattr(self, name)
+            new = np.zeros(projectile_capacity, dtype=old.dtype)
+            new[:self.projectile_capacity] = old
+            setattr(self, name, new)
+
+        while len(self.aliens) < capacity:
+            alien = GameObject.Alien()
+            self.textures.attach(alien.sprite, self.alien_file)
+            alien.sprite.z_order = -10
+            alien.hull = self.alien_hull
+            self.aliens.append(alien)
+
+        while len(self.projectiles) < projectile_capacity:
+            projectile = GameObject.AlienProjectile()
+            self.textures.attach(projectile.sprite, self.projectile_file)
+            projectile.sprite.opacity = 1
+            projectile.hull = self.projectile_hull
+            self.projectiles.append(projectile)
+
+        self.capacity = capacity
+        self.projectile_capacity = projectile_capacity
+
+    def setCount(self, count: int) -> None:
+        # Changes how many aliens are in play, the new ones start their spawn timers and wait off screen
+        added = np.arange(self.count, count)
+        self.reserve(count)
+        self.count = count
+        self.resetTimers(added)
+        self.spawn(added)
+
+    # -----------
+    # -- Spawning --
+    # -----------
+
+    def spawn(self, indices=None) -> None:
+        # Same as MyASGEGame.spawnAlien for each alien, they wait off the left/right side of the screen
+        # Spawning is rare, so this keeps the original per-alien random calls (and their order)
+        if indices is None:
+            indices = np.arange(self.count)
+
+        rng = self.rng
+        game_res = self.game_res
+        for index in np.asarray(indices).tolist():
+            self.is_active[index] = False
+            self.escape_attempted[index] = False
+
+            spawn_side = rng.randint(0, 1)
+            self.x[index] = game_res[0] + self.alien_width if spawn_side == 1 else -self.alien_width
+            self.y[index] = rng.randint(self.alien.spawn_margin,
+                                        game_res[1] - self.alien.spawn_margin - self.alien_height)
+            self.dir_x[index] = -((spawn_side * 2) - 1)
+            self.dir_y[index] = 0
+
+    def resetTimers(self, indices=None) -> None:
+        # Same as Alien.ResetTimer for each alien
+        if indices is None:
+            indices = np.arange(self.count)
+
+        for index in np.asarray(indices).tolist():
+            self.spawn_timer[index] = self.rng.uniform(self.alien.spawn_timer_min, self.alien.spawn_timer_max)
+            self.is_timer_active[index] = True
+
+    def respawn(self, indices) -> None:
+        # An alien that was shot or flew off screen goes back to the side and waits again
+        for index in np.asarray(indices).tolist():
+            self.spawn([index])
+            self.resetTimers([index])
+
+    def clearProjectiles(self) -> None:
+        self.is_shot[:] = False
+        self.expired[:] = False
+        self.projectile_life[:] = 0
+
+    # -----------
+    # -- Batched updates --
+    # -----------
+
+    def savePositions(self) -> None:
+        # Remembers where everything was at the start of a step, to interpolate from when rendering
+        self.prev_x[:] = self.x
+        self.prev_y[:] = self.y
+        self.projectile_prev_x[:] = self.projectile_x
+        self.projectile_prev_y[:] = self.projectile_y
+
+    def updateTimers(self, delta_time: float, target) -> None:
+        # The spawn and fire timers of every alien, aliens whose fire timer ran out shoot at 'target'
+        n = self.count
+        if n == 1:
+            self.updateTimer(delta_time, target)
+            return
+
+        timing = self.is_timer_active[:n]
+        ready = timing & (self.spawn_timer[:n] < 0)
+        self.spawn_timer[:n] -= np.where(timing & ~ready, delta_time, 0.0)
+        self.is_active[:n] |= ready
+
+        active = self.is_active[:n]
+        if not active.any():
+            return
+
+        in_air = np.bincount(self.projectile_owner[self.is_shot], minlength=n)[:n] if self.is_shot.any() else 0
+        reloading = active & (in_air < self.projectiles_per_alien)
+        loaded = reloading & (self.projectile_timer[:n] < 0)
+        self.projectile_timer[:n] -= np.where(reloading & ~loaded, delta_time, 0.0)
+
+        if loaded.any():
+            self.fire(np.flatnonzero(loaded), target)
+
+    def updateTimer(self, delta_time: float, target) -> None:
+        # updateTimers for a game with a single alien, the same steps without the array passes
+        if self.is_timer_active[0]:
+            if self.spawn_timer[0] < 0:
+                self.is_active[0] = True
+            else:
+                self.spawn_timer[0] -= delta_time
+
+        if not self.is_active[0]:
+            return
+
+        if np.count_nonzero(self.is_shot & (self.projectile_owner == 0)) >= self.projectiles_per_alien:
+            return
+
+        if self.projectile_timer[0] < 0:
+            self.fire(np.zeros(1, dtype=np.int64), target)
+        else:
+            self.projectile_timer[0] -= delta_time
+
+    def fire(self, indices: np.ndarray, target) -> None:
+        # Same as MyASGEGame.spawnAlienProjectile for every alien in 'indices', all aimed with one atan2
+        slots = np.flatnonzero(~self.is_shot)[:len(indices)]
+        indices = indices[:len(slots)]
+        self.projectile_timer[indices] = self.alien.projectile_timer_time
+
+        x = self.x[indices]
+        y = self.y[indices]
+        angle = np.arctan2(target.y - y, target.x - x)
+
+        self.projectile_x[slots] = self.projectile_prev_x[slots] = x
+        self.projectile_y[slots] = self.projectile_prev_y[slots] = y
+        self.projectile_dir_x[slots] = np.cos(angle)
+        self.projectile_dir_y[slots] = np.sin(angle)
+        self.projectile_life[slots] = 0
+        self.projectile_owner[slots] = indices
+        self.is_shot[slots] = True
+
+    def advance(self, delta_time: float, bounds) -> None:
+        # Moves every active alien and every projectile in the air, times the projectiles out,
+        # then respawns the aliens that left the screen and wraps the projectiles around the world bounds
+        n = self.count
+        step = delta_time * GameObject.REFERENCE_RATE
+        speed = self.alien.move_speed * step
+        if n == 1:
+            # A single alien is moved without the array passes
+            if self.is_active[0]:
+                self.x[0] += self.dir_x[0] * speed
+                self.y[0] += self.dir_y[0] * speed
+                if self.escaped(self.x[0], self.y[0], bounds):
+                    self.respawn([0])
+        elif self.is_active[:n].any():
+            active = self.is_active[:n]
+            self.x[:n] += np.where(active, self.dir_x[:n] * speed, 0.0)
+            self.y[:n] += np.where(active, self.dir_y[:n] * speed, 0.0)
+
+            escaped = active & self.escaped(self.x[:n], self.y[:n], bounds)
+            if escaped.any():
+                self.respawn(np.flatnonzero(escaped))
+
+        self.projectile_step = self.projectile.move_speed * step
+        shot = self.is_shot
+        if not shot.any():
+            # Nothing in the air, and nothing can have run out of life on this step
+            self.expired[:] = False
+            return
+
+        self.projectile_x += np.where(shot, self.projectile_dir_x * self.projectile_step, 0.0)
+        self.projectile_y += np.where(shot, self.projectile_dir_y * self.projectile_step, 0.0)
+        self.projectile_life += np.where(shot, delta_time, 0.0)
+
+        self.expired = shot & (self.projectile_life >= self.projectile.life_span)
+        self.is_shot &= ~self.expired
+        self.projectile_life[self.expired] = 0
+
+        # Aliens fly off the screen and respawn, only their projectiles wrap
+        bounds.wrap(self.projectile_x, self.projectile_y)
+
+    def escaped(self, x, y, bounds):
+        # Whether aliens at (x, y) have flown far enough off the screen to respawn
+        return (x >= bounds.width + self.alien_width * 2) | (x <= -self.alien_width * 2) \
+            | (y >= bounds.height + self.alien_height * 2) | (y <= -self.alien_height * 2)
+
+    def steer(self, target) -> None:
+        # Every active alien that gets close to 'target' for the first time turns away from it diagonally
+        n = self.count
+        x = self.x[:n]
+        y = self.y[:n]
+        close = self.is_active[:n] & ~self.escape_attempted[:n] \
+            & (np.hypot(x - target.x, y - target.y) <= self.alien.player_distance_check)
+        if not close.any():
+            return
+
+        indices = np.flatnonzero(close)
+        angle = np.round(np.degrees(np.arctan2(y[indices] - target.y, target.x - x[indices])))
+        new_angle = np.select([angle <= -90, angle <= 0, angle <= 90], ESCAPE_ANGLES[:3], ESCAPE_ANGLES[3])
+
+        self.dir_x[indices] = np.cos(new_angle)
+        self.dir_y[indices] = np.sin(new_angle)
+        self.escape_attempted[indices] = True
+
+    # -----------
+    # -- Collisions --
+    # -----------
+
+    @staticmethod
+    def boxesOverlap(x_1, y_1, width_1, height_1, x_2, y_2, width_2, height_2, margin: float) -> np.ndarray:
+        # Broadcasting version of 'isInside', widths and heights are already scaled
+        collision_x = (x_1 + width_1 - margin >= x_2 + margin) & (x_2 + width_2 - margin >= x_1 + margin)
+        collision_y = (y_1 + height_1 - margin >= y_2 + margin) & (y_2 + height_2 - margin >= y_1 + margin)
+        return collision_x & collision_y
+
+    def overlapping(self, sprite, margin: float) -> np.ndarray:
+        # Indices of the aliens whose bounding box overlaps 'sprite'
+        n = self.count
+        hits = self.boxesOverlap(sprite.x, sprite.y, sprite.width * sprite.scale, sprite.height * sprite.scale,
+                                 self.x[:n], self.y[:n], self.alien_width, self.alien_height, margin)
+        return np.flatnonzero(hits)
+
+    def sweptPairs(self, x, y, dx, dy, width: float, height: float, margin: float):
+        # overlapping() for many boxes moving by (dx, dy) this step
+        # Returns (box index, alien index, when) for every pair that collides, see sweptBoxes
+        n = self.count
+        hits, when = sweptBoxes(np.asarray(x)[:, None], np.asarray(y)[:, None], np.asarray(dx)[:, None],
+                                np.asarray(dy)[:, None], width, height, self.x[:n], self.y[:n], self.alien_width,
+                                self.alien_height, margin)
+        boxes, aliens = np.nonzero(hits)
+        return boxes, aliens, when[boxes, aliens]
+
+    def touchingMask(self, indices: np.ndarray, body) -> np.ndarray:
+        # Which of the aliens at 'indices' have a hull that touches 'body', like AsteroidField.touchingMask
+        if len(indices) == 0 or self.alien_hull is None or body is None:
+            return np.ones(len(indices), dtype=bool)
+
+        hull = self.alien_hull
+        aliens = (hull.points, self.x[indices], self.y[indices], self.alien_width, self.alien_height, 1.0, 0.0,
+                  hull.inner, hull.outer)
+        return bodiesTouch(body, aliens)
+
+    def touching(self, indices: np.ndarray, body) -> np.ndarray:
+        # Narrowphase for the results of overlapping(), like AsteroidField.touching
+        return indices[self.touchingMask(indices, body)]
+
+    def projectileHits(self, sprite, body, margin: float, bounds) -> np.ndarray:
+        # Projectiles in the air (or that ran out of life on the last step) that hit 'sprite' along the last step
+        # they moved, so a fast projectile can't pass through it between two steps
+        # 'body' is the sprite's collision_mask body, the hulls are compared where each projectile came closest
+        # Paths near an edge are also tested as ghost copies on the other side, in case 'sprite' straddles it
+        flying = np.flatnonzero(self.is_shot | self.expired)
+        if len(flying) == 0:
+            return flying
+
+        dx = self.projectile_dir_x[flying] * self.projectile_step
+        dy = self.projectile_dir_y[flying] * self.projectile_step
+        start_x = self.projectile_x[flying] - dx
+        start_y = self.projectile_y[flying] - dy
+
+        reach_x, reach_y = bounds.overhang([sprite.x], [sprite.y], sprite.width * sprite.scale,
+                                           sprite.height * sprite.scale)
+        ghosts, offsets_x, offsets_y = bounds.ghosts(np.minimum(start_x, start_x + dx),
+                                                     np.minimum(start_y, start_y + dy),
+                                                     np.abs(dx) + self.projectile_width,
+                                                     np.abs(dy) + self.projectile_height, reach_x, reach_y)
+        if len(ghosts) > 0:
+            flying, dx, dy = (np.concatenate((values, values[ghosts])) for values in (flying, dx, dy))
+            start_x = np.concatenate((start_x, start_x[ghosts] + offsets_x))
+            start_y = np.concatenate((start_y, start_y[ghosts] + offsets_y))
+        hits, when = sweptBoxes(start_x, start_y, dx, dy, self.projectile_width, self.projectile_height, sprite.x,
+                                sprite.y, sprite.width * sprite.scale, sprite.height * sprite.scale, margin)
+        if not hits.any() or self.projectile_hull is None or body is None:
+            return np.unique(flying[hits])
+
+        hull = self.projectile_hull
+        projectiles = (hull.points, start_x[hits] + dx[hits] * when[hits], start_y[hits] + dy[hits] * when[hits],
+                       self.projectile_width, self.projectile_height, 1.0, 0.0, hull.inner, hull.outer)
+        return np.unique(flying[hits][bodiesTouch(body, projectiles)])
+
+    def releaseProjectile(self, index: int) -> None:
+        # Same as Projectile.Collision
+        self.is_shot[index] = False
+        self.expired[index] = False
+        self.projectile_life[index] = 0
+
+    # -----------
+    # -- Sprite syncing --
+    # -----------
+
+    def syncRow(self, index: int) -> GameObject.Alien:
+        # Copies one alien into its row object, so it can be used by non-vectorised code
+        alien = self.aliens[index]
+        alien.sprite.x = float(self.x[index])
+        alien.sprite.y = float(self.y[index])
+        alien.move_direction.Set(float(self.dir_x[index]), float(self.dir_y[index]))
+        alien.is_active = bool(self.is_active[index])
+        alien.is_timer_active = bool(self.is_timer_active[index])
+        alien.escape_attempted = bool(self.escape_attempted[index])
+        alien.spawn_timer = float(self.spawn_timer[index])
+        alien.projectile_timer = float(self.projectile_timer[index])
+
+        return alien
+
+    def syncProjectile(self, index: int) -> GameObject.AlienProjectile:
+        projectile = self.projectiles[index]
+        projectile.sprite.x = float(self.projectile_x[index])
+        projectile.sprite.y = float(self.projectile_y[index])
+        projectile.move_direction.Set(float(self.projectile_dir_x[index]), float(self.projectile_dir_y[index]))
+        projectile.current_life_span = float(self.projectile_life[index])
+        projectile.is_shot = bool(self.is_shot[index])
+
+        return projectile
+
+    @staticmethod
+    def syncSprites(rows: list, indices: np.ndarray, x, y, prev_x, prev_y, bounds, alpha: float) -> list:
+        # Interpolated positions for the given rows, except for ones that just spawned or wrapped
+        x, y = bounds.interpolate(x[indices], y[indices], prev_x[indices], prev_y[indices], alpha)
+        xs = x.tolist()
+        ys = y.tolist()
+
+        sprites = []
+        for i, index in enumerate(indices.tolist()):
+            sprite = rows[index].sprite
+            sprite.x = xs[i]
+            sprite.y = ys[i]
+            sprites.append(sprite)
+
+        return sprites
+
+    def syncVisible(self, bounds, alpha: float = 1.0) -> list:
+        # Only the aliens on screen and the projectiles in the air are synced and drawn,
+        # with ghost sprites for the projectiles straddling an edge
+        # Returns one (texture, sprites) batch for the aliens and one for the projectiles, ready for the render queue
+        n = self.count
+        x = self.x[:n]
+        y = self.y[:n]
+        on_screen = (x + self.alien_width >= 0) & (x <= bounds.width) \
+            & (y + self.alien_height >= 0) & (y <= bounds.height)
+
+        batches = []
+        aliens = self.syncSprites(self.aliens, np.flatnonzero(on_screen), self.x, self.y, self.prev_x, self.prev_y,
+                                  bounds, alpha)
+        if aliens:
+            batches.append((self.alien_texture, aliens))
+
+        projectiles = self.syncSprites(self.projectiles, np.flatnonzero(self.is_shot), self.projectile_x,
+                                       self.projectile_y, self.projectile_prev_x, self.projectile_prev_y,
+                                       bounds, alpha)
+        xs = np.array([sprite.x for sprite in projectiles])
+        ys = np.array([sprite.y for sprite in projectiles])
+        ghosts, offsets_x, offsets_y = bounds.ghosts(xs, ys, self.projectile_width, self.projectile_height)
+        if len(ghosts) > 0:
+            projectiles += self.projectile_ghosts.place((xs[ghosts] + offsets_x).tolist(),
+                                                        (ys[ghosts] + offsets_y).tolist())
+
+        if projectiles:
+            batches.append((self.projectile_texture, projectiles))
+
+        return batches
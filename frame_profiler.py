@@ -0,0 +1,143 @@
+import csv
+import json
+import time
+
+import numpy as np
+
+# The parts of a frame that get timed separately, in the order they happen
+PHASES = ("timers", "player", "asteroids", "projectiles", "alien", "ui", "render")
+
+PHASE_TIMERS = 0
+PHASE_PLAYER = 1
+PHASE_ASTEROIDS = 2
+PHASE_PROJECTILES = 3
+PHASE_ALIEN = 4
+PHASE_UI = 5
+PHASE_RENDER = 6
+
+
+class FrameProfiler:
+    """ Times each phase of a frame into a fixed-size ring buffer
+
+    begin() starts the clock and every mark() adds the time since the
+    previous call onto that phase, so a phase can be marked more than once
+    in the same frame. endFrame() stores the frame's timings (in ms) as one
+    row of the ring buffer. While disabled every call returns straight
+    away, so the instrumentation can stay in the hot path.
+    """
+
+    def __init__(self, capacity: int = 600) -> None:
+        self.enabled = False
+        self.capacity = capacity
+        self.samples = np.zeros((capacity, len(PHASES)))
+        self.frames = 0
+        self.current = [0.0] * len(PHASES)
+        self.last = 0.0
+
+    def setEnabled(self, enabled: bool) -> None:
+        self.enabled = enabled
+        self.current = [0.0] * len(PHASES)
+
+    def begin(self) -> None:
+        if not self.enabled:
+            return
+
+        self.last = time.perf_counter()
+
+    def mark(self, phase: int) -> None:
+        if not self.enabled:
+            return
+
+        now = time.perf_counter()
+        self.current[phase] += (now - self.last) * 1000.0
+        self.last = now
+
+    def endFrame(self) -> None:
+        if not self.enabled:
+            return
+
+        self.samples[self.frames % self.capacity] = self.current
+        self.frames += 1
+        self.current = [0.0] * len(PHASES)
+
+    # -----------
+    # -- Reading the results --
+    # -----------
+
+    def recent(self) -> np.ndarray:
+        # The frames still in the ring buffer, oldest first
+        if self.frames <= self.capacity:
+            return self.samples[:self.frames]
+
+        start = self.frames % self.capacity
+        return np.concatenate((self.samples[start:], self.samples[:start]))
+
+    def averages(self) -> np.ndarray:
+        recent = self.recent()
+        return recent.mean(axis=0) if len(recent) else np.zeros(len(PHASES))
+
+    def worst(self) -> np.ndarray:
+        recent = self.recent()
+        return recent.max(axis=0) if len(recent) else np.zeros(len(PHASES))
+
+    def summary(self) -> str:
+        # Text shown by the in-game overlay
+        averages = self.averages()
+        worst = self.worst()
+        lines = []
+        for i, phase in enumerate(PHASES):
+            lines.append("{:<13} {:6.2f} {:6.2f}".format(phase, averages[i], worst[i]))
+
+        totals = self.recent().sum(axis=1) if self.frames else np.zeros(1)
+        lines.append("{:<13} {:6.2f} {:6.2f}".format("frame", totals.mean(), totals.max()))
+        return "\n".join(lines)
+
+    def dump(self, path: str) -> None:
+        # Writes every frame still in the ring buffer, as CSV or JSON depending on the file extension
+        recent = self.recent()
+        if path.endswith(".json"):
+            with open(path, "w") as file:
+                json.dump({
+                    "phases": list(PHASES),
+                    "frames": recent.tolist(),
+                    "average_ms": dict(zip(PHASES, self.averages().tolist())),
+                    "worst_ms": dict(zip(PHASES, self.worst().tolist())),
+                }, file, indent=2)
+        else:
+            with open(path, "w", newline="") as file:
+                writer = csv.writer(file)
+                writer.writerow(PHASES)
+                writer.writerows(recent.tolist())
+
+
+class StartupTimer:
+    """ Breaks down how long the game took to get to its first frame
+
+    Each mark() records the time since the previous one under a name, the
+    first one counting from when this module was imported. The steps are
+    always recorded since there are only a handful of them, report() turns
+    them into a table.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.start = time.perf_counter()
+        self.last = self.start
+        self.steps = []
+
+    def mark(self, name: str) -> None:
+        now = time.perf_counter()
+        self.steps.append((name, (now - self.last) * 1000.0))
+        self.last = now
+
+    def total(self) -> float:
+        return (self.last - self.start) * 1000.0
+
+    def report(self) -> str:
+        lines = ["{:<24} {:8.1f} ms".format(name, duration) for name, duration in self.steps]
+        lines.append("{:<24} {:8.1f} ms".format("total", self.total()))
+        return "\n".join(lines)
+
+
+# Shared by the whole process, so it starts counting as early as possible
+STARTUP = StartupTimer()
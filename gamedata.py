@@ -15,14 +15,27 @@ class GameData:
         self.game_res = [0, 0]
         self.background = None
         self.fonts = {}
+        self.textures = None
+        self.masks = None
         self.inputs = None
         self.renderer = None
 
         self.max_score = 2000
         self.max_time = 30.0
 
+        # Gameplay steps per second, every speed in the game is tuned for 60
+        self.sim_rate = 60
+
         self.is_game_running = True
         self.was_game_paused = False
         self.score = 0
         self.time = 0
 
+    def loadFont(self, path: str, size: int):
+        # Fonts are cached by (path, size), so each font atlas only gets rasterised once
+        key = (path, size)
+        if key not in self.fonts:
+            self.fonts[key] = self.renderer.loadFont(path, size)
+
+        return self.fonts[key]
+
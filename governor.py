@@ -0,0 +1,109 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class QualityLevel:
+    # One step of the governor: how often the capped systems may run, and what else is cut back at this step
+
+    def __init__(self, name: str, rate_caps: dict = None, max_splits: int = None, decorations: bool = True) -> None:
+        self.name = name
+        # Highest rate for some of the scheduler's systems, see Scheduler.setCap
+        self.rate_caps = rate_caps or {}
+        # Most asteroids that may split in one simulation step, None for no limit
+        self.max_splits = max_splits
+        # Whether purely decorative sprites (the background) are drawn
+        self.decorations = decorations
+
+
+class FrameGovernor:
+    """ Sheds work in steps to keep every frame within its time budget
+
+    beginFrame() and endFrame() time the work done in a frame, leaving out
+    however long the frame limit or vsync waits. Once a full window of
+    frames has been timed at the current level, the governor steps down to
+    the next level if the average frame was close to the budget or too
+    many of them went over it. It only steps back up after a longer run
+    of frames with plenty of headroom, and waits twice as long every time
+    a step up had to be taken back, so it settles instead of flickering
+    between levels. Every change calls 'apply' with the new level and is
+    logged. While disabled every call returns straight away.
+    """
+
+    def __init__(self, levels: list, apply, budget: float, window: int = 30, degrade_at: float = 0.9,
+                 restore_at: float = 0.6, restore_after: int = 180, max_restore_after: int = 1800) -> None:
+        self.enabled = False
+        self.levels = levels
+        self.apply = apply
+        self.budget = budget
+        self.window = window
+        self.degrade_at = degrade_at
+        self.restore_at = restore_at
+        self.restore_after = restore_after
+        self.max_restore_after = max_restore_after
+
+        self.index = 0
+        self.level = levels[0]
+        self.samples = [0.0] * window
+        self.frames = 0
+        self.headroom = 0
+        self.restore_wait = restore_after
+        self.restored_at = None
+        self.total_frames = 0
+        self.start = 0.0
+
+    def setEnabled(self, enabled: bool) -> None:
+        self.enabled = enabled
+        if not enabled and self.index != 0:
+            self.setLevel(0, "governor turned off")
+
+    def beginFrame(self) -> None:
+        if not self.enabled:
+            return
+
+        self.start = time.perf_counter()
+
+    def endFrame(self) -> None:
+        if not self.enabled:
+            return
+
+        self.record(time.perf_counter() - self.start)
+
+    def record(self, frame_time: float) -> None:
+        # Adds one frame's work time in seconds, and changes level if the last window of frames calls for it
+        self.samples[self.frames % self.window] = frame_time
+        self.frames += 1
+        self.total_frames += 1
+        if self.frames < self.window:
+            # The first frames after a change are still catching up from the old level
+            return
+
+        average = sum(self.samples) / self.window
+        missed = sum(1 for sample in self.samples if sample > self.budget)
+        reason = "{:.1f} ms average, {} of {} frames over the {:.1f} ms budget".format(
+            average * 1000.0, missed, self.window, self.budget * 1000.0)
+
+        if average > self.budget * self.degrade_at or missed > self.window // 10:
+            self.headroom = 0
+            if self.index + 1 < len(self.levels):
+                # Stepping straight back down after a step up means it was too soon to go up
+                bounced = self.restored_at is not None and self.total_frames - self.restored_at < self.restore_wait
+                self.restore_wait = min(self.restore_wait * 2, self.max_restore_after) if bounced \
+                    else self.restore_after
+                self.setLevel(self.index + 1, reason)
+        elif average < self.budget * self.restore_at:
+            self.headroom += 1
+            if self.index > 0 and self.headroom >= self.restore_wait:
+                self.restored_at = self.total_frames
+                self.setLevel(self.index - 1, reason)
+        else:
+            self.headroom = 0
+
+    def setLevel(self, index: int, reason: str) -> None:
+        logger.info("quality %s -> %s (%s)", self.level.name, self.levels[index].name, reason)
+        self.index = index
+        self.level = self.levels[index]
+        self.frames = 0
+        self.headroom = 0
+        self.apply(self.level)
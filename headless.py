@@ -0,0 +1,125 @@
+import argparse
+import time
+
+import headless_pyasge
+
+# The stand-in has to be registered before the game modules import pyasge
+headless_pyasge.install()
+
+import pyasge
+from frame_profiler import STARTUP
+from scheduler import parseRate
+import tutorial_game
+
+
+class HeadlessGame:
+    """ Runs MyASGEGame without a window
+
+    The game is created on top of the headless pyasge stand-in and then
+    stepped manually, one update/fixed_update pair per tick, with no frame
+    pacing at all. Each tick is one simulation step unless a different
+    'sim_rate' is given. Key presses can be injected through press() and
+    release(), which go through the same keyHandler the window would call.
+    """
+
+    def __init__(self, width: int = 1600, height: int = 900, tick_rate: int = 60, render: bool = False,
+                 sim_rate: float = None, seed: int = None) -> None:
+        settings = pyasge.GameSettings()
+        settings.window_width = width
+        settings.window_height = height
+        settings.fixed_ts = tick_rate
+        settings.fps_limit = tick_rate
+
+        self.game = tutorial_game.MyASGEGame(settings, seed)
+
+        # By default every tick is exactly one simulation step
+        self.game.setSimRate(sim_rate or tick_rate)
+        self.game_time = pyasge.GameTime(1 / tick_rate, 1 / tick_rate)
+        self.render = render
+        self.tick = 0
+        self.exited = False
+
+    def press(self, key: int) -> None:
+        self.sendKey(key, pyasge.KEYS.KEY_PRESSED)
+
+    def release(self, key: int) -> None:
+        self.sendKey(key, pyasge.KEYS.KEY_RELEASED)
+
+    def sendKey(self, key: int, action: int) -> None:
+        try:
+            self.game.inputs.dispatch(pyasge.EventType.E_KEY, pyasge.KeyEvent(key, action))
+        except SystemExit:
+            self.exited = True
+
+    def startGame(self, game_mode: tutorial_game.GameMode = tutorial_game.GameMode.ENDLESS) -> None:
+        # Skips shooting at the main menu, which is how a player would normally start a round
+        self.game.current_game_mode = game_mode
+        self.game.startGame()
+
+    def step(self, ticks: int = 1) -> None:
+        game = self.game
+        game_time = self.game_time
+
+        for i in range(ticks):
+            if self.exited:
+                break
+
+            try:
+                game.fixed_update(game_time)
+                game.update(game_time)
+                if self.render:
+                    game.render(game_time)
+                else:
+                    game.profiler.endFrame()
+                    game.governor.endFrame()
+            except SystemExit:
+                self.exited = True
+
+            game_time.elapsed += game_time.frame_time
+            self.tick += 1
+
+    def run(self, ticks: int) -> float:
+        # Steps the game for a number of ticks and returns how many ticks per second were achieved
+        start = time.perf_counter()
+        start_tick = self.tick
+        self.step(ticks)
+        elapsed = time.perf_counter() - start
+
+        return (self.tick - start_tick) / elapsed if elapsed > 0 else float("inf")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the game without a window")
+    parser.add_argument("--ticks", type=int, default=10000, help="number of ticks to simulate")
+    parser.add_argument("--mode", choices=["menu", "endless", "timed"], default="endless",
+                        help="start on the main menu or go straight into a game mode")
+    parser.add_argument("--render", action="store_true", help="also call render() every tick")
+    parser.add_argument("--seed", type=int, help="seed for all gameplay randomness")
+    parser.add_argument("--startup-times", action="store_true", help="print how long each part of startup took")
+    parser.add_argument("--system-rate", action="append", type=parseRate, default=[], metavar="SYSTEM=HZ",
+                        help="run a system at a different rate, 0 for every step")
+    args = parser.parse_args()
+
+    STARTUP.enabled = args.startup_times
+    headless = HeadlessGame(render=args.render, seed=args.seed)
+    if args.startup_times and not args.render:
+        # Nothing is drawn without '--render', so there is no first frame to wait for
+        print("Startup time:\n" + STARTUP.report())
+    try:
+        headless.game.scheduler.setRates(dict(args.system_rate))
+    except ValueError as error:
+        parser.error(str(error))
+    if args.mode == "endless":
+        headless.startGame(tutorial_game.GameMode.ENDLESS)
+    elif args.mode == "timed":
+        headless.startGame(tutorial_game.GameMode.TIMED)
+
+    ticks_per_second = headless.run(args.ticks)
+    print("Simulated " + str(headless.tick) + " ticks at " + str(round(ticks_per_second)) + " ticks per second")
+    print("Final score: " + str(headless.game.data.score) + ", state: " + headless.game.current_game_state.name)
+    print("Texture cache: " + str(headless.game.data.textures.stats()))
+    print("System costs (rate, mean ms, worst ms):\n" + headless.game.scheduler.summary())
+
+
+if __name__ == "__main__":
+    main()
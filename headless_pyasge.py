@@ -0,0 +1,324 @@
+""" A window-less stand-in for the parts of pyasge the game uses
+
+Sprites, text and fonts here are plain Python objects that only keep
+track of their positions and sizes, so the gameplay code in
+tutorial_game.py and GameObject.py can be stepped without an OpenGL
+context. Texture sizes are read straight from the PNG headers so that
+collisions and screen wrapping behave the same as they do in the real
+game. Call install() before importing the game to use it.
+"""
+import enum
+import os
+import struct
+import sys
+
+
+# Root directory that "/data/..." style paths are resolved against, the same
+# way ASGE mounts the game folder as its virtual file system root
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Number of times an image file has been opened, used to check for file I/O during gameplay
+file_reads = 0
+
+
+def resolvePath(path: str) -> str:
+    return os.path.join(ROOT_DIR, path.lstrip("/"))
+
+
+def readImageSize(path: str):
+    # Only the PNG header is needed for the width and height, so avoid decoding the whole image
+    global file_reads
+    file_reads += 1
+    try:
+        with open(resolvePath(path), "rb") as file:
+            header = file.read(24)
+    except OSError:
+        return None
+
+    if len(header) < 24 or header[:8] != b"\x89PNG\r\n\x1a\n":
+        return None
+
+    return struct.unpack(">II", header[16:24])
+
+
+# -----------
+# -- Enums and constants --
+# -----------
+
+class EventType(enum.Enum):
+    E_KEY = 0,
+    E_MOUSE_CLICK = 1,
+    E_MOUSE_MOVE = 2,
+    E_MOUSE_SCROLL = 3,
+    E_GAMEPAD_STATUS = 4
+
+
+class WindowMode(enum.Enum):
+    EXCLUSIVE_FULLSCREEN = 0,
+    WINDOWED = 1,
+    BORDERLESS_WINDOW = 2,
+    BORDERLESS_FULLSCREEN = 3
+
+
+class Vsync(enum.Enum):
+    ENABLED = 0,
+    ADAPTIVE = 1,
+    DISABLED = 2
+
+
+class KEYS:
+    # Values match GLFW, which is what ASGE uses underneath
+    KEY_RELEASED = 0
+    KEY_PRESSED = 1
+    KEY_REPEATED = 2
+
+    KEY_SPACE = 32
+    KEY_ESCAPE = 256
+    KEY_ENTER = 257
+    KEY_TAB = 258
+    KEY_BACKSPACE = 259
+    KEY_RIGHT = 262
+    KEY_LEFT = 263
+    KEY_DOWN = 264
+    KEY_UP = 265
+    KEY_F1 = 290
+    KEY_F2 = 291
+    KEY_F3 = 292
+    KEY_F4 = 293
+    KEY_F5 = 294
+
+
+class Colour:
+    def __init__(self, r: float, g: float, b: float):
+        self.r = r
+        self.g = g
+        self.b = b
+
+    def __eq__(self, other):
+        return isinstance(other, Colour) and (self.r, self.g, self.b) == (other.r, other.g, other.b)
+
+    def __hash__(self):
+        return hash((self.r, self.g, self.b))
+
+
+class COLOURS:
+    BLACK = Colour(0.0, 0.0, 0.0)
+    WHITE = Colour(1.0, 1.0, 1.0)
+    RED = Colour(1.0, 0.0, 0.0)
+    GREEN = Colour(0.0, 0.5, 0.0)
+    CADETBLUE = Colour(0.37, 0.62, 0.63)
+    DARKGREY = Colour(0.66, 0.66, 0.66)
+    YELLOW = Colour(1.0, 1.0, 0.0)
+    ORANGE = Colour(1.0, 0.65, 0.0)
+
+
+# -----------
+# -- Game settings, time and input --
+# -----------
+
+class GameSettings:
+    def __init__(self):
+        self.window_width = 1024
+        self.window_height = 768
+        self.fixed_ts = 60
+        self.fps_limit = 60
+        self.window_mode = WindowMode.WINDOWED
+        self.vsync = Vsync.ADAPTIVE
+        self.window_title = "ASGE Game"
+
+
+class GameTime:
+    def __init__(self, fixed_timestep: float = 1 / 60, frame_time: float = 1 / 60):
+        # Both timesteps are in seconds, like in pyasge
+        self.fixed_timestep = fixed_timestep
+        self.frame_time = frame_time
+        self.elapsed = 0.0
+
+
+class KeyEvent:
+    def __init__(self, key: int, action: int, scancode: int = 0, mods: int = 0):
+        self.key = key
+        self.action = action
+        self.scancode = scancode
+        self.mods = mods
+
+
+class ClickEvent:
+    def __init__(self, button: int = 0, action: int = 0, x: float = 0.0, y: float = 0.0, mods: int = 0):
+        self.button = button
+        self.action = action
+        self.x = x
+        self.y = y
+        self.mods = mods
+
+
+class Inputs:
+    def __init__(self):
+        self.callbacks = {}
+        self.next_id = 0
+
+    def addCallback(self, event_type: EventType, callback) -> int:
+        self.next_id += 1
+        self.callbacks[self.next_id] = (event_type, callback)
+        return self.next_id
+
+    def unregisterCallback(self, callback_id: int) -> None:
+        self.callbacks.pop(callback_id, None)
+
+    def dispatch(self, event_type: EventType, event) -> None:
+        for registered_type, callback in list(self.callbacks.values()):
+            if registered_type == event_type:
+                callback(event)
+
+
+# -----------
+# -- Renderable objects --
+# -----------
+
+class Texture:
+    def __init__(self, path: str, width: int, height: int):
+        self.path = path
+        self.width = width
+        self.height = height
+
+
+class Font:
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self.size = size
+        self.line_height = size
+
+    def pxWide(self, string: str, scale: float = 1.0) -> float:
+        # Rough average glyph advance, good enough for laying out and hit-testing menu text
+        return len(string) * self.size * 0.55 * scale
+
+
+class Sprite:
+    def __init__(self):
+        self.x = 0.0
+        self.y = 0.0
+        self.width = 0.0
+        self.height = 0.0
+        self.scale = 1.0
+        self.rotation = 0.0
+        self.opacity = 1.0
+        self.z_order = 0
+        self.colour = COLOURS.WHITE
+        self.texture = None
+        self.src_rect = [0.0, 0.0, 0.0, 0.0]
+
+    def loadTexture(self, path: str) -> bool:
+        size = readImageSize(path)
+        if size is None:
+            return False
+
+        return self.attach(Texture(path, size[0], size[1]))
+
+    def attach(self, texture: Texture) -> bool:
+        if texture is None:
+            return False
+
+        self.texture = texture
+        self.width = texture.width
+        self.height = texture.height
+        self.src_rect = [0.0, 0.0, float(texture.width), float(texture.height)]
+        return True
+
+
+class Text:
+    def __init__(self, font: Font = None, string: str = "", x: float = 0.0, y: float = 0.0,
+                 colour: Colour = COLOURS.WHITE):
+        self.font = font
+        self.string = string
+        self.x = x
+        self.y = y
+        self.colour = colour
+        self.opacity = 1.0
+        self.scale = 1.0
+        self.z_order = 0
+
+    @property
+    def position(self):
+        return [self.x, self.y]
+
+    @position.setter
+    def position(self, value):
+        self.x = value[0]
+        self.y = value[1]
+
+    @property
+    def width(self) -> float:
+        return self.font.pxWide(self.string, self.scale) if self.font else 0.0
+
+    @property
+    def height(self) -> float:
+        return self.font.line_height * self.scale if self.font else 0.0
+
+
+class Renderer:
+    def __init__(self, settings: GameSettings):
+        self.resolution = [settings.window_width, settings.window_height]
+        self.clear_colour = COLOURS.BLACK
+        self.draw_calls = 0
+        self.fonts_loaded = 0
+        self.textures_loaded = 0
+
+    def setClearColour(self, colour: Colour) -> None:
+        self.clear_colour = colour
+
+    def loadFont(self, path: str, size: int) -> Font:
+        self.fonts_loaded += 1
+        return Font(path, size)
+
+    def createCachedTexture(self, path: str):
+        size = readImageSize(path)
+        if size is None:
+            return None
+
+        self.textures_loaded += 1
+        return Texture(path, size[0], size[1])
+
+    def render(self, renderable) -> None:
+        # Nothing gets drawn, only counted
+        self.draw_calls += 1
+
+
+class ASGEGame:
+    def __init__(self, settings: GameSettings):
+        self.settings = settings
+        self.renderer = Renderer(settings)
+        self.inputs = Inputs()
+        self.exit_signalled = False
+
+    def signalExit(self) -> None:
+        self.exit_signalled = True
+
+    def run(self) -> int:
+        # Mimics the ASGE game loop without frame pacing, as fast as the CPU allows
+        game_time = GameTime(1 / self.settings.fixed_ts, 1 / self.settings.fixed_ts)
+        while not self.exit_signalled:
+            self.fixed_update(game_time)
+            self.update(game_time)
+            self.render(game_time)
+            game_time.elapsed += game_time.frame_time
+
+        return 0
+
+    def update(self, game_time: GameTime) -> None:
+        pass
+
+    def fixed_update(self, game_time: GameTime) -> None:
+        pass
+
+    def render(self, game_time: GameTime) -> None:
+        pass
+
+
+def install() -> None:
+    # Registers this module as 'pyasge', so it has to be called before the game modules are imported
+    existing = sys.modules.get("pyasge")
+    if existing is not None and existing is not sys.modules[__name__]:
+        if "tutorial_game" in sys.modules or "GameObject" in sys.modules:
+            raise RuntimeError("the real pyasge has already been imported by the game modules")
+
+    sys.modules["pyasge"] = sys.modules[__name__]
@@ -0,0 +1,187 @@
+import struct
+import zlib
+
+import numpy as np
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Colour types, and how many samples each pixel has in them
+COLOUR_GREY = 0
+COLOUR_RGB = 2
+COLOUR_PALETTE = 3
+COLOUR_GREY_ALPHA = 4
+COLOUR_RGBA = 6
+CHANNELS = {COLOUR_GREY: 1, COLOUR_RGB: 3, COLOUR_PALETTE: 1, COLOUR_GREY_ALPHA: 2, COLOUR_RGBA: 4}
+
+
+def readChunks(data: bytes):
+    # Yields (type, contents) for every chunk in the file
+    if data[:8] != PNG_SIGNATURE:
+        raise ValueError("not a PNG file")
+
+    position = 8
+    while position + 8 <= len(data):
+        length, chunk_type = struct.unpack(">I4s", data[position:position + 8])
+        yield chunk_type, data[position + 8:position + 8 + length]
+        position += length + 12
+
+
+def unfilter(raw: bytes, height: int, stride: int, bytes_per_pixel: int) -> np.ndarray:
+    # Undoes the per-row filters, returns the image as (height, stride) bytes
+    rows = np.zeros((height, stride), dtype=np.uint8)
+    previous = np.zeros(stride, dtype=np.uint8)
+    position = 0
+    for y in range(height):
+        filter_type = raw[position]
+        line = np.frombuffer(raw, dtype=np.uint8, count=stride, offset=position + 1)
+        position += stride + 1
+
+        if filter_type == 0:
+            row = line.copy()
+        elif filter_type == 1:
+            # Sub only depends on the byte one pixel to the left, so each channel is a running sum
+            padded = np.zeros(-(-stride // bytes_per_pixel) * bytes_per_pixel, dtype=np.uint64)
+            padded[:stride] = line
+            row = (np.cumsum(padded.reshape(-1, bytes_per_pixel), axis=0) % 256).astype(np.uint8).ravel()[:stride]
+        elif filter_type == 2:
+            row = line + previous
+        elif filter_type == 3 or filter_type == 4:
+            # Average and Paeth depend on the bytes already decoded in the same row, so they go byte by byte
+            row = line.tolist()
+            above = previous.tolist()
+            for i in range(stride):
+                left = row[i - bytes_per_pixel] if i >= bytes_per_pixel else 0
+                if filter_type == 3:
+                    row[i] = (row[i] + ((left + above[i]) >> 1)) & 0xFF
+                else:
+                    upper_left = above[i - bytes_per_pixel] if i >= bytes_per_pixel else 0
+                    estimate = left + above[i] - upper_left
+                    distance_left = abs(estimate - left)
+                    distance_above = abs(estimate - above[i])
+                    distance_upper_left = abs(estimate - upper_left)
+                    if distance_left <= distance_above and distance_left <= distance_upper_left:
+                        predictor = left
+                    elif distance_above <= distance_upper_left:
+                        predictor = above[i]
+                    else:
+                        predictor = upper_left
+                    row[i] = (row[i] + predictor) & 0xFF
+            row = np.array(row, dtype=np.uint8)
+        else:
+            raise ValueError("unknown PNG filter type " + str(filter_type))
+
+        rows[y] = row
+        previous = row
+
+    return rows
+
+
+def readPNG(path: str) -> np.ndarray:
+    """ Decodes a PNG file into a (height, width, 4) array of 8-bit RGBA
+
+    Every colour type and bit depth is supported, including palettes
+    with a tRNS chunk for transparency, but interlaced images are not.
+    16-bit images are reduced to 8 bits.
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+
+    header = None
+    palette = None
+    transparency = None
+    compressed = bytearray()
+    for chunk_type, contents in readChunks(data):
+        if chunk_type == b"IHDR":
+            header = struct.unpack(">IIBBBBB", contents)
+        elif chunk_type == b"PLTE":
+            palette = np.frombuffer(contents, dtype=np.uint8).reshape(-1, 3)
+        elif chunk_type == b"tRNS":
+            transparency = contents
+        elif chunk_type == b"IDAT":
+            compressed += contents
+        elif chunk_type == b"IEND":
+            break
+
+    if header is None:
+        raise ValueError(path + " has no IHDR chunk")
+
+    width, height, bit_depth, colour_type, compression, filter_method, interlace = header
+    if interlace:
+        raise ValueError(path + " is interlaced, which isn't supported")
+
+    channels = CHANNELS[colour_type]
+    bits_per_pixel = channels * bit_depth
+    stride = (width * bits_per_pixel + 7) // 8
+    rows = unfilter(zlib.decompress(bytes(compressed)), height, stride, max(1, bits_per_pixel // 8))
+
+    # Unpack the rows into one sample per array element
+    if bit_depth < 8:
+        bits = np.unpackbits(rows, axis=1).reshape(height, -1, bit_depth)
+        weights = 1 << np.arange(bit_depth - 1, -1, -1)
+        samples = (bits * weights).sum(axis=2)[:, :width * channels].astype(np.uint16)
+    elif bit_depth == 16:
+        samples = rows.view(">u2").astype(np.uint16)
+    else:
+        samples = rows.astype(np.uint16)
+    samples = samples.reshape(height, width, channels)
+
+    pixels = np.zeros((height, width, 4), dtype=np.uint8)
+    pixels[:, :, 3] = 255
+    if colour_type == COLOUR_PALETTE:
+        indices = samples[:, :, 0]
+        pixels[:, :, :3] = palette[indices]
+        if transparency is not None:
+            alpha = np.full(256, 255, dtype=np.uint8)
+            alpha[:len(transparency)] = np.frombuffer(transparency, dtype=np.uint8)
+            pixels[:, :, 3] = alpha[indices]
+        return pixels
+
+    # Scale every other type to 8 bits per sample
+    maximum = (1 << bit_depth) - 1
+    scaled = (samples.astype(np.uint32) * 255 // maximum).astype(np.uint8)
+    if colour_type == COLOUR_GREY or colour_type == COLOUR_GREY_ALPHA:
+        pixels[:, :, :3] = scaled[:, :, :1]
+    else:
+        pixels[:, :, :3] = scaled[:, :, :3]
+
+    if colour_type == COLOUR_GREY_ALPHA or colour_type == COLOUR_RGBA:
+        pixels[:, :, 3] = scaled[:, :, -1]
+    elif transparency is not None:
+        # A single colour that is fully transparent
+        key = np.array(struct.unpack(">" + "H" * (len(transparency) // 2), transparency), dtype=np.uint16)
+        pixels[:, :, 3] = np.where((samples == key).all(axis=2), 0, 255)
+
+    return pixels
+
+
+def readAlpha(path: str) -> np.ndarray:
+    # Just the alpha channel, as a (height, width) array
+    return readPNG(path)[:, :, 3]
+
+
+def writePNG(path: str, pixels: np.ndarray) -> None:
+    """ Encodes a (height, width, 4) array of 8-bit RGBA as a PNG file
+
+    Every row uses the Up filter, which does well on sprite sheets where
+    most of a row matches the one above it (e.g. transparent padding).
+    """
+    height, width, channels = pixels.shape
+    if channels != 4 or pixels.dtype != np.uint8:
+        raise ValueError("expected a (height, width, 4) uint8 array")
+
+    rows = pixels.reshape(height, width * 4)
+    filtered = np.empty((height, width * 4 + 1), dtype=np.uint8)
+    filtered[:, 0] = 2
+    filtered[0, 1:] = rows[0]
+    filtered[1:, 1:] = rows[1:] - rows[:-1]
+
+    def chunk(chunk_type: bytes, contents: bytes) -> bytes:
+        return struct.pack(">I", len(contents)) + chunk_type + contents + \
+            struct.pack(">I", zlib.crc32(chunk_type + contents) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, COLOUR_RGBA, 0, 0, 0)
+    with open(path, "wb") as file:
+        file.write(PNG_SIGNATURE)
+        file.write(chunk(b"IHDR", header))
+        file.write(chunk(b"IDAT", zlib.compress(filtered.tobytes(), 9)))
+        file.write(chunk(b"IEND", b""))
@@ -0,0 +1,232 @@
+import numpy as np
+
+import GameObject
+from world_bounds import GhostSprites
+
+
+class ProjectilePool:
+    """ The player's projectiles, stored as a structure of arrays
+
+    Positions, directions and lifetimes live in NumPy arrays, one row per
+    projectile, so moving every projectile in the air, running out their
+    life spans and wrapping them around the screen is a handful of
+    vectorised operations however many of them there are. Free rows are
+    kept on a free list, so firing and removing a projectile are O(1)
+    instead of a search through every slot. Each row has a
+    GameObject.Projectile whose sprite is only synced from the arrays when
+    it is drawn or handed to other game code.
+    """
+
+    def __init__(self, texture_file: str, textures, capacity: int = 3, masks=None) -> None:
+        self.capacity = 0
+        self.live_count = 0
+        self.free = []
+        self.rows = []
+
+        self.textures = textures
+        self.texture_file = texture_file
+        self.texture = textures.get(texture_file)
+        self.width, self.height = textures.size(texture_file)
+        self.hull = masks.get(texture_file) if masks is not None else None
+        self.ghost_sprites = GhostSprites(textures, texture_file)
+
+        # Tuning values are read from this copy rather than the class, so a balance sweep can change them per game
+        self.projectile = GameObject.Tuning(GameObject.Projectile)
+
+        self.x = np.zeros(0)
+        self.y = np.zeros(0)
+        self.prev_x = np.zeros(0)
+        self.prev_y = np.zeros(0)
+        self.dir_x = np.zeros(0)
+        self.dir_y = np.zeros(0)
+        self.life = np.zeros(0)
+        self.is_shot = np.zeros(0, dtype=bool)
+
+        self.reserve(max(capacity, 1))
+
+    def __len__(self) -> int:
+        return self.live_count
+
+    def reserve(self, capacity: int) -> None:
+        # Grows the pool, keeping the projectiles already in the air
+        if capacity <= self.capacity:
+            return
+
+        for name in ("x", "y", "prev_x", "prev_y", "dir_x", "dir_y", "life", "is_shot"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.capacity] = old
+            setattr(self, name, new)
+
+        while len(self.rows) < capacity:
+            projectile = GameObject.Projectile()
+            self.textures.attach(projectile.sprite, self.texture_file)
+            projectile.hull = self.hull
+            self.rows.append(projectile)
+
+        # The free list is a stack, so the lowest free rows are handed out first
+        self.free = list(range(capacity - 1, self.capacity - 1, -1)) + self.free
+        self.capacity = capacity
+
+    # -----------
+    # -- Firing and removing projectiles --
+    # -----------
+
+    def fire(self, x: float, y: float, dir_x: float, dir_y: float) -> int:
+        # Returns the index of the new projectile, or -1 if every projectile is already in the air
+        if not self.free:
+            return -1
+
+        index = self.free.pop()
+        self.x[index] = self.prev_x[index] = x
+        self.y[index] = self.prev_y[index] = y
+        self.dir_x[index] = dir_x
+        self.dir_y[index] = dir_y
+        self.life[index] = 0
+        self.is_shot[index] = True
+        self.live_count += 1
+
+        return index
+
+    def release(self, index: int) -> None:
+        # Same as Projectile.Collision
+        if not self.is_shot[index]:
+            return
+
+        self.is_shot[index] = False
+        self.life[index] = 0
+        self.live_count -= 1
+        self.free.append(index)
+
+    def clear(self) -> None:
+        for index in self.liveIndices().tolist():
+            self.release(index)
+
+    def liveIndices(self) -> np.ndarray:
+        return np.flatnonzero(self.is_shot)
+
+    # -----------
+    # -- Vectorised updates --
+    # -----------
+
+    def savePositions(self) -> None:
+        self.prev_x[:] = self.x
+        self.prev_y[:] = self.y
+
+    def advance(self, delta_time: float, bounds) -> None:
+        # Moves every projectile in the air and times it out, then wraps them around the world bounds
+        shot = self.is_shot
+        speed = self.projectile.move_speed * delta_time * GameObject.REFERENCE_RATE
+        self.x += np.where(shot, self.dir_x * speed, 0.0)
+        self.y += np.where(shot, self.dir_y * speed, 0.0)
+        self.life += np.where(shot, delta_time, 0.0)
+
+        expired = np.flatnonzero(shot & (self.life >= self.projectile.life_span))
+        if len(expired) > 0:
+            self.is_shot[expired] = False
+            self.life[expired] = 0
+            self.live_count -= len(expired)
+            self.free.extend(expired.tolist())
+
+        bounds.wrap(self.x, self.y)
+
+    # -----------
+    # -- Collisions --
+    # -----------
+
+    def body(self, x, y) -> tuple:
+        # The collision_mask body of projectiles at (x, y), or None without a hull
+        if self.hull is None:
+            return None
+
+        return self.hull.points, x, y, self.width, self.height, 1.0, 0.0, self.hull.inner, self.hull.outer
+
+    def sweep(self, indices: np.ndarray, delta_time: float):
+        # How far the projectiles at 'indices' are about to move this step
+        step = self.projectile.move_speed * delta_time * GameObject.REFERENCE_RATE
+        return self.dir_x[indices] * step, self.dir_y[indices] * step
+
+    def asteroidHits(self, field, spatial_hash, margin: float, delta_time: float, bounds):
+        # Every (projectile, asteroid) pair that touches anywhere along the path each projectile is about to take,
+        # so small asteroids can't be skipped over at low tick rates or high projectile speeds
+        # Paths near an edge are also tested as ghost copies on the other side, against asteroids straddling it
+        # Pairs come out in projectile order, and for each projectile in the order they would be hit
+        live = self.liveIndices()
+        dx, dy = self.sweep(live, delta_time)
+        x = self.x[live]
+        y = self.y[live]
+        box_x = np.minimum(x, x + dx)
+        box_y = np.minimum(y, y + dy)
+        box_width = np.abs(dx) + self.width
+        box_height = np.abs(dy) + self.height
+
+        ghosts, offsets_x, offsets_y = bounds.ghosts(box_x, box_y, box_width, box_height, *field.overhang(bounds))
+        if len(ghosts) > 0:
+            live, dx, dy, box_width, box_height = (np.concatenate((values, values[ghosts]))
+                                                   for values in (live, dx, dy, box_width, box_height))
+            x, box_x = (np.concatenate((values, values[ghosts] + offsets_x)) for values in (x, box_x))
+            y, box_y = (np.concatenate((values, values[ghosts] + offsets_y)) for values in (y, box_y))
+
+        queries, candidates = spatial_hash.queryPairs(box_x, box_y, box_width, box_height)
+        x, y, dx, dy = x[queries], y[queries], dx[queries], dy[queries]
+        hits, when = field.sweptPairs(x, y, dx, dy, self.width, self.height, margin, candidates)
+        projectiles = live[queries][hits]
+        candidates = candidates[hits]
+        when = when[hits]
+
+        # The hulls are compared where the projectile comes closest to the asteroid
+        touching = field.touchingMask(candidates, self.body(x[hits] + dx[hits] * when, y[hits] + dy[hits] * when))
+        projectiles = projectiles[touching]
+        candidates = candidates[touching]
+
+        # Asteroids hit at the same moment go in index order, whichever order the grid handed them out in
+        order = np.lexsort((candidates, when[touching], projectiles))
+        return projectiles[order], candidates[order]
+
+    def alienHits(self, enemies, margin: float, delta_time: float):
+        # Every (projectile, alien) pair that touches along the path each projectile is about to take
+        live = self.liveIndices()
+        dx, dy = self.sweep(live, delta_time)
+        x = self.x[live]
+        y = self.y[live]
+        queries, aliens, when = enemies.sweptPairs(x, y, dx, dy, self.width, self.height, margin)
+        x, y, dx, dy = x[queries], y[queries], dx[queries], dy[queries]
+
+        touching = enemies.touchingMask(aliens, self.body(x + dx * when, y + dy * when))
+        return live[queries][touching], aliens[touching]
+
+    # -----------
+    # -- Sprite syncing --
+    # -----------
+
+    def syncRow(self, index: int) -> GameObject.Projectile:
+        # Copies one row of the arrays into its projectile object, so it can be used by non-vectorised code
+        projectile = self.rows[index]
+        projectile.sprite.x = float(self.x[index])
+        projectile.sprite.y = float(self.y[index])
+        projectile.move_direction.Set(float(self.dir_x[index]), float(self.dir_y[index]))
+        projectile.current_life_span = float(self.life[index])
+        projectile.is_shot = bool(self.is_shot[index])
+
+        return projectile
+
+    def syncVisible(self, bounds, alpha: float = 1.0) -> list:
+        # Sprites for every projectile in the air, interpolated between their last two positions unless they wrapped
+        # Projectiles straddling an edge get a ghost sprite on the other side as well
+        live = self.liveIndices()
+        x, y = bounds.interpolate(self.x[live], self.y[live], self.prev_x[live], self.prev_y[live], alpha)
+        xs = x.tolist()
+        ys = y.tolist()
+
+        sprites = []
+        for i, index in enumerate(live.tolist()):
+            sprite = self.rows[index].sprite
+            sprite.x = xs[i]
+            sprite.y = ys[i]
+            sprites.append(sprite)
+
+        ghosts, offsets_x, offsets_y = bounds.ghosts(x, y, self.width, self.height)
+        if len(ghosts) > 0:
+            sprites += self.ghost_sprites.place((x[ghosts] + offsets_x).tolist(), (y[ghosts] + offsets_y).tolist())
+
+        return sprites
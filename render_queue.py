@@ -0,0 +1,85 @@
+import pyasge
+
+
+class RenderQueue:
+    """ Culls and sorts everything to be drawn in a frame before submitting it
+
+    Drawables that are fully transparent or entirely off-screen are
+    dropped as they are added. On flush() the rest are sorted by z_order
+    and then by texture (or font), so consecutive draws share the same
+    texture, and handed to the renderer one at a time. The number of
+    draws, texture switches and culled objects from the last flush are
+    kept for the frame timing overlay.
+    """
+
+    def __init__(self, game_res) -> None:
+        self.game_res = game_res
+        self.items = []
+
+        self.draw_calls = 0
+        self.texture_switches = 0
+        self.culled = 0
+
+        self.added = 0
+        self.culled_this_frame = 0
+
+    def isVisible(self, drawable) -> bool:
+        if drawable.opacity <= 0:
+            return False
+
+        # Text is laid out by the font, so it's only checked for opacity
+        if not isinstance(drawable, pyasge.Sprite):
+            return True
+
+        # Sprites can rotate around their centre, so pad the bounds by half their size
+        extent_x = drawable.width * drawable.scale
+        extent_y = drawable.height * drawable.scale
+        return drawable.x + extent_x * 1.5 >= 0 and drawable.x - extent_x * 0.5 <= self.game_res[0] \
+            and drawable.y + extent_y * 1.5 >= 0 and drawable.y - extent_y * 0.5 <= self.game_res[1]
+
+    def add(self, drawable, cull: bool = True) -> None:
+        # Objects that have already been culled (like the asteroid field's visible rows) can skip the check
+        if cull and not self.isVisible(drawable):
+            self.culled_this_frame += 1
+            return
+
+        texture = drawable.texture if isinstance(drawable, pyasge.Sprite) else getattr(drawable, "font", None)
+        self.items.append((drawable.z_order, id(texture), self.added, drawable, False))
+        self.added += 1
+
+    def addBatch(self, texture, drawables: list, z_order: int = 0) -> None:
+        # A pre-culled group of sprites that all share one texture, queued as a single entry
+        if drawables:
+            self.items.append((z_order, id(texture), self.added, drawables, True))
+            self.added += 1
+
+    def flush(self, renderer) -> None:
+        # The insertion counter keeps the sort stable between objects with the same z_order and texture
+        self.items.sort()
+
+        texture_switches = 0
+        draw_calls = 0
+        last_texture = None
+        for z_order, texture, order, drawable, is_batch in self.items:
+            if texture != last_texture:
+                texture_switches += 1
+                last_texture = texture
+
+            if is_batch:
+                for sprite in drawable:
+                    renderer.render(sprite)
+                draw_calls += len(drawable)
+            else:
+                renderer.render(drawable)
+                draw_calls += 1
+
+        self.draw_calls = draw_calls
+        self.texture_switches = texture_switches
+        self.culled = self.culled_this_frame
+
+        self.items.clear()
+        self.added = 0
+        self.culled_this_frame = 0
+
+    def stats(self) -> dict:
+        return {"draw_calls": self.draw_calls, "texture_switches": self.texture_switches, "culled": self.culled}
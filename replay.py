@@ -0,0 +1,169 @@
+import argparse
+import struct
+import time
+import zlib
+
+REPLAY_MAGIC = b"TMAR"
+REPLAY_VERSION = 1
+
+# magic, version, seed, simulation rate, window width, window height, last tick, number of events
+HEADER_FORMAT = "<4sHIdHHII"
+
+# ticks since the previous event, key, action
+EVENT_FORMAT = "<HHB"
+
+# Events more than 65535 ticks apart are bridged with padding events using this key
+PADDING_KEY = 0xFFFF
+
+
+class Replay:
+    """ A recorded session: the RNG seed, the simulation rate and every key event with its tick
+
+    Everything else about a game is decided by those, so feeding the
+    same events back in on the same ticks plays the session out exactly
+    the same way. On disk it is a small fixed header followed by the
+    delta-encoded events, compressed with zlib.
+    """
+
+    def __init__(self, seed: int, sim_rate: float, game_res) -> None:
+        self.seed = seed
+        self.sim_rate = sim_rate
+        self.game_res = list(game_res)
+        self.end_tick = 0
+        self.events = []
+
+    def save(self, path: str) -> None:
+        body = bytearray()
+        last_tick = 0
+        for tick, key, action in self.events:
+            delta = tick - last_tick
+            while delta > 0xFFFF:
+                body += struct.pack(EVENT_FORMAT, 0xFFFF, PADDING_KEY, 0)
+                delta -= 0xFFFF
+            body += struct.pack(EVENT_FORMAT, delta, key, action)
+            last_tick = tick
+
+        header = struct.pack(HEADER_FORMAT, REPLAY_MAGIC, REPLAY_VERSION, self.seed, self.sim_rate,
+                             self.game_res[0], self.game_res[1], self.end_tick, len(self.events))
+        with open(path, "wb") as file:
+            file.write(header)
+            file.write(zlib.compress(bytes(body), 9))
+
+    @staticmethod
+    def load(path: str) -> "Replay":
+        with open(path, "rb") as file:
+            data = file.read()
+
+        header_size = struct.calcsize(HEADER_FORMAT)
+        magic, version, seed, sim_rate, width, height, end_tick, event_count = \
+            struct.unpack(HEADER_FORMAT, data[:header_size])
+        if magic != REPLAY_MAGIC:
+            raise ValueError(path + " is not a replay file")
+        if version != REPLAY_VERSION:
+            raise ValueError(path + " is replay version " + str(version) + ", expected " + str(REPLAY_VERSION))
+
+        replay = Replay(seed, sim_rate, [width, height])
+        replay.end_tick = end_tick
+
+        tick = 0
+        for delta, key, action in struct.iter_unpack(EVENT_FORMAT, zlib.decompress(data[header_size:])):
+            tick += delta
+            if key != PADDING_KEY:
+                replay.events.append((tick, key, action))
+
+        if len(replay.events) != event_count:
+            raise ValueError(path + " is truncated")
+
+        return replay
+
+
+class ReplayRecorder:
+    def __init__(self, seed: int, sim_rate: float, game_res) -> None:
+        self.replay = Replay(seed, sim_rate, game_res)
+
+    def record(self, tick: int, key: int, action: int) -> None:
+        self.replay.events.append((tick, key, action))
+
+    def save(self, path: str, end_tick: int) -> None:
+        self.replay.end_tick = end_tick
+        self.replay.save(path)
+
+
+class ReplayPlayer:
+    def __init__(self, replay: Replay) -> None:
+        self.replay = replay
+        self.position = 0
+        self.injecting = False
+
+    def inject(self, tick: int, key_handler) -> None:
+        # Feeds every event recorded for this tick back through the game's key handler
+        import pyasge
+
+        events = self.replay.events
+        self.injecting = True
+        try:
+            while self.position < len(events) and events[self.position][0] <= tick:
+                recorded_tick, key, action = events[self.position]
+                self.position += 1
+                key_handler(pyasge.KeyEvent(key, action))
+        finally:
+            self.injecting = False
+
+    def isFinished(self, tick: int) -> bool:
+        return tick >= self.replay.end_tick
+
+
+def playHeadless(replay: Replay, render: bool = False, profile: bool = False) -> dict:
+    # Plays a replay back without a window, as fast as possible
+    from headless import HeadlessGame
+
+    headless = HeadlessGame(replay.game_res[0], replay.game_res[1], replay.sim_rate, render, seed=replay.seed)
+    game = headless.game
+    game.profiler.setEnabled(profile)
+
+    player = ReplayPlayer(replay)
+    game.replay_player = player
+
+    start = time.perf_counter()
+    while not headless.exited and not player.isFinished(game.sim_tick):
+        headless.step()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "ticks": game.sim_tick,
+        "ticks_per_second": game.sim_tick / elapsed if elapsed > 0 else float("inf"),
+        "score": game.data.score,
+        "state": game.current_game_state.name,
+        "game": game,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play back a recorded session")
+    parser.add_argument("replay", help="replay file recorded with 'tutorial_game.py --record'")
+    parser.add_argument("--window", action="store_true", help="watch it in a window instead of running headless")
+    parser.add_argument("--render", action="store_true", help="call render() while playing headless")
+    parser.add_argument("--repeat", type=int, default=1, help="play it this many times, e.g. for profiling")
+    parser.add_argument("--profile", metavar="PATH", help="save per-phase frame timings of the last run")
+    args = parser.parse_args()
+
+    replay = Replay.load(args.replay)
+    print("Replay: seed " + str(replay.seed) + ", " + str(replay.end_tick) + " ticks at " +
+          str(replay.sim_rate) + " Hz, " + str(len(replay.events)) + " key events")
+
+    if args.window:
+        import tutorial_game
+        tutorial_game.main(["--replay", args.replay])
+        return
+
+    for i in range(args.repeat):
+        result = playHeadless(replay, args.render, args.profile is not None)
+        print("Run " + str(i + 1) + ": " + str(result["ticks"]) + " ticks at " + str(round(result["ticks_per_second"]))
+              + " ticks per second, final score " + str(result["score"]) + " (" + result["state"] + ")")
+
+        if args.profile and i == args.repeat - 1:
+            result["game"].profiler.dump(args.profile)
+
+
+if __name__ == "__main__":
+    main()
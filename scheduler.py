@@ -0,0 +1,129 @@
+import time
+
+
+class System:
+    # One part of the game that the scheduler runs, with how often it runs and what it has cost so far
+
+    def __init__(self, name: str, callback, rate: float = None) -> None:
+        self.name = name
+        self.callback = callback
+        self.rate = rate
+        self.cap = None
+        self.run_rate = rate
+        self.elapsed = 0.0
+
+        self.calls = 0
+        self.total = 0.0
+        self.worst = 0.0
+
+    def updateRunRate(self) -> None:
+        # The rate it actually runs at, its own rate held down to the cap if there is one
+        if self.cap is None or (self.rate is not None and self.rate <= self.cap):
+            self.run_rate = self.rate
+        else:
+            self.run_rate = self.cap
+
+    def meanCost(self) -> float:
+        # Average time of one call in ms
+        return self.total / self.calls * 1000.0 if self.calls else 0.0
+
+
+class Scheduler:
+    """ Runs each system of the game at its own rate
+
+    Systems are run in the order they were added. A system without a rate
+    runs on every tick, any other runs once at least 1 / rate seconds have
+    passed since it last did, and is given all of that time as its delta
+    time, so timers and movement stay right at any rate. Rates are counted
+    in simulated time rather than wall time, so a seeded game still plays
+    out the same way. A cap (see setCap) holds a system below its rate for
+    a while without forgetting it. Every call is timed, see summary().
+    """
+
+    def __init__(self) -> None:
+        self.systems = []
+        self.by_name = {}
+
+    def add(self, name: str, callback, rate: float = None) -> System:
+        system = System(name, callback, rate)
+        self.systems.append(system)
+        self.by_name[name] = system
+        return system
+
+    def get(self, name: str) -> System:
+        if name not in self.by_name:
+            raise ValueError("unknown system " + name + ", expected one of " + ", ".join(self.by_name))
+
+        return self.by_name[name]
+
+    def setRate(self, name: str, rate: float) -> None:
+        # A rate of None (or 0) runs the system on every tick
+        system = self.get(name)
+        system.rate = rate or None
+        system.updateRunRate()
+        system.elapsed = 0.0
+
+    def setRates(self, rates: dict) -> None:
+        for name, rate in rates.items():
+            self.setRate(name, rate)
+
+    def setCap(self, name: str, cap: float) -> None:
+        # Runs the system at most 'cap' times a second until the cap is set back to None, used by the governor
+        # The time since it last ran is kept, so nothing is lost when the rate changes
+        system = self.get(name)
+        system.cap = cap or None
+        system.updateRunRate()
+
+    def tick(self, delta_time: float) -> None:
+        for system in self.systems:
+            if system.run_rate is None:
+                # Anything left over from before a cap was lifted is handed over too
+                elapsed = delta_time + system.elapsed
+                system.elapsed = 0.0
+            else:
+                system.elapsed += delta_time
+                if system.elapsed < 1 / system.run_rate - 1e-9:
+                    continue
+
+                elapsed = system.elapsed
+                system.elapsed = 0.0
+
+            start = time.perf_counter()
+            system.callback(elapsed)
+            cost = time.perf_counter() - start
+
+            system.calls += 1
+            system.total += cost
+            if cost > system.worst:
+                system.worst = cost
+
+    # -----------
+    # -- Reading the costs --
+    # -----------
+
+    def resetStats(self) -> None:
+        for system in self.systems:
+            system.calls = 0
+            system.total = 0.0
+            system.worst = 0.0
+
+    def stats(self) -> dict:
+        return {system.name: {"rate": system.run_rate, "calls": system.calls, "mean_ms": system.meanCost(),
+                              "worst_ms": system.worst * 1000.0, "total_ms": system.total * 1000.0}
+                for system in self.systems}
+
+    def summary(self) -> str:
+        # One line per system: its rate, and the average and worst time of a call in ms
+        lines = []
+        for system in self.systems:
+            rate = "tick" if system.run_rate is None else "{:g}hz".format(system.run_rate)
+            lines.append("{:<12} {:>6} {:6.3f} {:6.3f}".format(system.name, rate, system.meanCost(),
+                                                               system.worst * 1000.0))
+
+        return "\n".join(lines)
+
+
+def parseRate(text: str):
+    # "alien_ai=10" -> ("alien_ai", 10.0), used for the '--system-rate' flags
+    name, _, rate = text.partition("=")
+    return name.strip(), float(rate)
@@ -0,0 +1,272 @@
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from headless import HeadlessGame
+import pyasge
+import tutorial_game
+
+# Where each parameter name lives on a game, e.g. "Ship.max_speed" or "max_score"
+# Tuning values are set on the game's own GameObject.Tuning copies, never on the classes
+PARAM_TARGETS = {
+    "Ship": lambda game: game.player.tuning,
+    "Projectile": lambda game: game.projectiles.projectile,
+    "Alien": lambda game: game.enemies.alien,
+    "AlienProjectile": lambda game: game.enemies.projectile,
+    "data": lambda game: game.data,
+    "game": lambda game: game,
+}
+
+# Parameters given without a prefix
+PARAM_SHORTCUTS = {
+    "max_score": "data.max_score",
+    "max_time": "data.max_time",
+    "asteroid_max_count": "game.asteroid_max_count",
+    "asteroid_split_chunks": "game.asteroid_split_chunks",
+    "asteroid_split_rescale": "game.asteroid_split_rescale",
+    "alien_count": "game.alien_count",
+}
+
+
+def resolveParam(game, name: str):
+    # Returns the object and attribute name a parameter is set on
+    name = PARAM_SHORTCUTS.get(name, name)
+    prefix, _, attribute = name.rpartition(".")
+    if prefix not in PARAM_TARGETS:
+        raise ValueError("unknown parameter " + name + ", expected one of " + ", ".join(PARAM_SHORTCUTS) +
+                         " or " + "/".join(PARAM_TARGETS) + ".<attribute>")
+
+    target = PARAM_TARGETS[prefix](game)
+    if not hasattr(target, attribute):
+        raise ValueError(prefix + " has no attribute " + attribute)
+
+    return target, attribute
+
+
+def applyParams(game, params: dict) -> None:
+    for name, value in params.items():
+        target, attribute = resolveParam(game, name)
+        setattr(target, attribute, value)
+
+    # Restarting the round picks the new values up, e.g. the pool size, the player's health and the time limit
+    game.respawn(True)
+    game.enemies.resetTimers()
+
+
+# -----------
+# -- Policies --
+# -----------
+# A policy is called once per tick and returns (turn, thrust, fire), with turn and thrust in -1/0/1
+# 'memory' is a dictionary kept for the whole game, for policies that need to remember something
+
+def randomPolicy(game, tick: int, rng: random.Random, memory: dict):
+    # Mashes a new random combination of keys every few ticks
+    if tick % 10 == 0:
+        memory["action"] = (rng.randint(-1, 1), rng.randint(-1, 1), rng.random() < 0.5)
+
+    return memory["action"]
+
+
+def aimPolicy(game, tick: int, rng: random.Random, memory: dict):
+    # Turns towards the nearest asteroid and shoots once it is lined up, without moving
+    field = game.asteroids
+    live = field.liveIndices()
+    if len(live) == 0:
+        return 0, 0, False
+
+    player = game.player.sprite
+    centre_x = player.x + player.width * player.scale / 2
+    centre_y = player.y + player.height * player.scale / 2
+    dx = field.x[live] + field.extent_x[live] / 2 - centre_x
+    dy = field.y[live] + field.extent_y[live] / 2 - centre_y
+    nearest = int((dx * dx + dy * dy).argmin())
+
+    target = math.degrees(math.atan2(dy[nearest], dx[nearest]))
+    difference = (target - game.player.current_angle + 180) % 360 - 180
+    turn = 0 if abs(difference) <= game.player.tuning.turn_speed else int(math.copysign(1, difference))
+    return turn, 0, abs(difference) < 10 and tick % 2 == 0
+
+
+POLICIES = {
+    "random": randomPolicy,
+    "aim": aimPolicy,
+}
+
+CONTROL_KEYS = (pyasge.KEYS.KEY_LEFT, pyasge.KEYS.KEY_RIGHT, pyasge.KEYS.KEY_UP, pyasge.KEYS.KEY_DOWN,
+                pyasge.KEYS.KEY_SPACE)
+
+
+def pressKeys(headless: HeadlessGame, held: dict, turn: int, thrust: int, fire: bool) -> None:
+    # Turns a policy's output into key presses and releases, only sending the keys that changed
+    wanted = (turn == -1, turn == 1, thrust == 1, thrust == -1, fire)
+    for key, down in zip(CONTROL_KEYS, wanted):
+        if down != held.get(key, False):
+            headless.sendKey(key, pyasge.KEYS.KEY_PRESSED if down else pyasge.KEYS.KEY_RELEASED)
+            held[key] = down
+
+
+# -----------
+# -- Running games --
+# -----------
+
+def playGame(task: dict) -> dict:
+    # Plays one game to the end in this process, everything it needs comes in 'task'
+    headless = HeadlessGame(seed=task["seed"])
+    game = headless.game
+    headless.startGame(tutorial_game.GameMode[task["mode"]])
+    applyParams(game, task["params"])
+
+    policy = POLICIES[task["policy"]]
+    policy_rng = random.Random(task["seed"])
+    memory = {}
+    held = {}
+
+    start = time.perf_counter()
+    tick = 0
+    score = 0
+    while tick < task["max_ticks"] and game.current_game_state == tutorial_game.GameState.GAMEPLAY \
+            and not headless.exited:
+        # Running out of time restarts the round straight away, which clears the score before it can be read
+        # The time runs out at the start of a step, so the score from before that step is the final one
+        score = game.data.score
+        pressKeys(headless, held, *policy(game, tick, policy_rng, memory))
+        headless.step()
+        tick += 1
+    elapsed = time.perf_counter() - start
+
+    # The game records why the round ended, the clock itself has already been reset by then
+    timed_out = game.current_game_state != tutorial_game.GameState.GAMEPLAY and game.time_over
+    if game.current_game_state == tutorial_game.GameState.WIN_MENU:
+        outcome = "won"
+    elif game.current_game_state == tutorial_game.GameState.LOSE_MENU:
+        outcome = "timed_out" if timed_out else "died"
+    else:
+        outcome = "survived"
+
+    if not timed_out:
+        score = game.data.score
+
+    return {
+        "param_set": task["param_set"],
+        "seed": task["seed"],
+        "outcome": outcome,
+        "score": score,
+        "seconds": tick / game.data.sim_rate,
+        "ticks": tick,
+        "elapsed": elapsed,
+    }
+
+
+def summarise(params: dict, games: list) -> dict:
+    ticks = sum(game["ticks"] for game in games)
+    elapsed = sum(game["elapsed"] for game in games)
+    deaths = [game["seconds"] for game in games if game["outcome"] == "died"]
+
+    return {
+        "params": params,
+        "games": len(games),
+        "win_rate": sum(game["outcome"] == "won" for game in games) / len(games),
+        "death_rate": len(deaths) / len(games),
+        "mean_score": sum(game["score"] for game in games) / len(games),
+        "mean_time_to_death": sum(deaths) / len(deaths) if deaths else None,
+        "ticks_per_second": ticks / elapsed if elapsed > 0 else float("inf"),
+    }
+
+
+def runSweep(param_sets: list, games: int, seed: int, policy: str, mode: str, max_ticks: int,
+             workers: int = None) -> dict:
+    # Every game is an independent task with its own seed, so workers never share any state
+    tasks = []
+    for i, params in enumerate(param_sets):
+        for j in range(games):
+            tasks.append({"param_set": i, "params": params, "seed": seed + j, "policy": policy, "mode": mode,
+                          "max_ticks": max_ticks})
+
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Larger chunks cut down on pickling overhead once there are many short games
+        results = list(executor.map(playGame, tasks, chunksize=max(1, len(tasks) // (workers * 8))))
+    elapsed = time.perf_counter() - start
+
+    by_set = [[] for i in param_sets]
+    for result in results:
+        by_set[result["param_set"]].append(result)
+
+    return {
+        "policy": policy,
+        "mode": mode,
+        "games_per_set": games,
+        "seed": seed,
+        "workers": workers,
+        "wall_seconds": elapsed,
+        "total_ticks_per_second": sum(result["ticks"] for result in results) / elapsed if elapsed > 0 else 0,
+        "sets": [summarise(params, by_set[i]) for i, params in enumerate(param_sets)],
+    }
+
+
+def parseParam(text: str):
+    # "Ship.max_speed=5,6.5,8" -> ("Ship.max_speed", [5, 6.5, 8])
+    name, _, values = text.partition("=")
+    if not values:
+        raise argparse.ArgumentTypeError("expected NAME=VALUE[,VALUE...], got " + text)
+
+    parsed = []
+    for value in values.split(","):
+        try:
+            parsed.append(int(value))
+        except ValueError:
+            parsed.append(float(value))
+
+    return name.strip(), parsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play many seeded headless games over a grid of tuning values")
+    parser.add_argument("--param", action="append", type=parseParam, default=[], metavar="NAME=V1,V2,...",
+                        help="tuning value to sweep, e.g. max_score=1500,2000 or Ship.health=3,5 "
+                             "(can be given more than once, every combination is played)")
+    parser.add_argument("--games", type=int, default=32, help="games per combination of values")
+    parser.add_argument("--seed", type=int, default=1, help="seed of the first game, the rest count up from it")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="aim")
+    parser.add_argument("--mode", choices=["timed", "endless"], default="timed")
+    parser.add_argument("--max-ticks", type=int, default=60 * 300, help="give up on a game after this many ticks")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+    parser.add_argument("--output", default="sweep.json", help="where to write the JSON report")
+    args = parser.parse_args()
+
+    # Check the names up front rather than in every worker
+    headless = HeadlessGame()
+    for name, values in args.param:
+        try:
+            resolveParam(headless.game, name)
+        except ValueError as error:
+            parser.error(str(error))
+
+    names = [name for name, values in args.param]
+    param_sets = [dict(zip(names, values)) for values in itertools.product(*(values for name, values in args.param))]
+
+    report = runSweep(param_sets, args.games, args.seed, args.policy, args.mode.upper(), args.max_ticks,
+                      args.workers)
+
+    print("{:<40} {:>6} {:>6} {:>8} {:>8} {:>10}".format("params", "win", "death", "score", "death s", "ticks/s"))
+    for result in report["sets"]:
+        params = ", ".join(name + "=" + str(value) for name, value in result["params"].items()) or "defaults"
+        death_time = result["mean_time_to_death"]
+        print("{:<40} {:>6.0%} {:>6.0%} {:>8.0f} {:>8} {:>10.0f}".format(
+            params, result["win_rate"], result["death_rate"], result["mean_score"],
+            "-" if death_time is None else "{:.1f}".format(death_time), result["ticks_per_second"]))
+    print(str(report["workers"]) + " workers, " + "{:.0f}".format(report["total_ticks_per_second"]) +
+          " ticks per second in total")
+
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
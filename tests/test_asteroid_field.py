@@ -0,0 +1,130 @@
+import random
+
+import numpy as np
+
+from asteroid_field import STATE_LARGE, STATE_MEDIUM, STATE_SMALL, AsteroidField
+from headless import HeadlessGame
+from texture_cache import KENNEY_DIR
+
+TEXTURE_FILES = [KENNEY_DIR + "meteor_detailedLarge.png", KENNEY_DIR + "meteor_large.png"]
+
+
+def makeField(capacity: int = 8) -> AsteroidField:
+    # A field of its own, using a headless game's renderer for the textures
+    textures = HeadlessGame(seed=1).game.data.textures
+    return AsteroidField(TEXTURE_FILES, textures, capacity, random.Random(1))
+
+
+def placeAsteroid(field: AsteroidField, x: float, y: float) -> int:
+    index = field.acquire()
+    field.setTexture(index, 0)
+    field.setScale(index, 1.0)
+    field.setPosition(index, x, y)
+    return index
+
+
+def test_acquire_hands_out_live_large_rows_until_full():
+    field = makeField(3)
+    indices = [field.acquire() for _ in range(3)]
+    assert indices == [0, 1, 2]
+    assert field.acquire() == -1
+
+    assert field.live_count == len(field) == 3
+    assert field.alive[:3].all()
+    assert (field.state[:3] == STATE_LARGE).all()
+    assert not any(row.is_destroyed for row in field.rows[:3])
+
+
+def test_release_puts_the_row_back_on_the_free_list():
+    field = makeField(3)
+    a, b, c = (placeAsteroid(field, 100.0 * i, 100.0) for i in range(3))
+    field.release(b)
+    field.release(b)
+
+    assert field.live_count == 2
+    assert not field.alive[b] and field.rows[b].is_destroyed
+    assert field.liveIndices().tolist() == [a, c]
+
+    # The freed row is reused before the pool reports being full
+    assert field.acquire() == b
+    assert not field.rows[b].is_destroyed
+    assert field.acquire() == -1
+
+
+def test_clear_resets_every_row_like_release():
+    field = makeField(4)
+    indices = [placeAsteroid(field, 100.0 * i, 100.0) for i in range(3)]
+    field.release(indices[0])
+    field.clear()
+
+    assert field.allDestroyed()
+    assert field.count == 0 and len(field.free) == 0
+    assert not field.alive.any()
+    assert all(field.rows[index].is_destroyed for index in indices)
+    assert field.syncRow(indices[1]).is_destroyed
+
+    assert field.acquire() == 0
+    assert field.live_count == 1 and not field.rows[0].is_destroyed
+
+
+def test_split_spawns_smaller_pieces_where_the_asteroid_was():
+    field = makeField(8)
+    index = placeAsteroid(field, 300.0, 200.0)
+    field.setScale(index, 2.0)
+
+    assert field.split(index, 2, 0.5) == 2
+    pieces = [piece for piece in field.liveIndices().tolist() if piece != index]
+    assert len(pieces) == 2
+    for piece in pieces:
+        assert field.state[piece] == STATE_MEDIUM
+        assert (field.x[piece], field.y[piece]) == (300.0, 200.0)
+        assert (field.prev_x[piece], field.prev_y[piece]) == (300.0, 200.0)
+        assert 2.0 * 0.5 * field.min_scale <= field.scale[piece] <= 2.0 * 0.5 * field.max_scale
+        assert field.extent_x[piece] == field.width[piece] * field.scale[piece]
+
+
+def test_split_stops_at_small_asteroids_and_a_full_pool():
+    field = makeField(2)
+    index = placeAsteroid(field, 0.0, 0.0)
+    assert field.split(index, 3, 0.5) == 1
+    assert field.acquire() == -1
+
+    field.state[index] = STATE_SMALL
+    field.release(1)
+    assert field.split(index, 2, 0.5) == 0
+    assert field.live_count == 1
+
+
+def test_compact_packs_live_rows_to_the_front():
+    field = makeField(8)
+    for i in range(6):
+        placeAsteroid(field, 10.0 * i, 0.0)
+    for index in (0, 2, 3):
+        field.release(index)
+
+    field.compact()
+    assert field.count == field.live_count == 3
+    assert field.alive[:3].all() and not field.alive[3:].any()
+    assert field.x[:3].tolist() == [10.0, 40.0, 50.0]
+    assert field.free == []
+    assert [row.is_destroyed for row in field.rows[:3]] == [False, False, False]
+
+    # New rows go after the packed ones
+    assert field.acquire() == 3
+
+
+def test_maybe_compact_waits_for_half_the_rows_to_be_dead():
+    field = makeField(8)
+    for i in range(8):
+        placeAsteroid(field, 10.0 * i, 0.0)
+    for index in range(4):
+        field.release(index)
+
+    assert not field.maybeCompact(min_rows=4)
+    assert field.count == 8
+
+    field.release(4)
+    assert not field.maybeCompact(min_rows=16)
+    assert field.maybeCompact(min_rows=4)
+    assert field.count == field.live_count == 3
+    assert np.array_equal(field.x[:3], [50.0, 60.0, 70.0])
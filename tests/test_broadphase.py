@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from broadphase import SpatialHash
+
+
+def randomBoxes(rng, count: int, size: float):
+    # Boxes scattered over (and a little past the edges of) a 1600x900 screen
+    x = rng.uniform(-100, 1600, count)
+    y = rng.uniform(-100, 900, count)
+    return x, y, rng.uniform(1, size, count), rng.uniform(1, size, count)
+
+
+def bruteForcePairs(boxes, queries) -> set:
+    # Every (query, entry) pair whose boxes touch, found by testing all of them
+    x, y, width, height = boxes
+    query_x, query_y, query_width, query_height = (values[:, None] for values in queries)
+    hits = (query_x + query_width >= x) & (x + width >= query_x) \
+        & (query_y + query_height >= y) & (y + height >= query_y)
+    return set(zip(*(values.tolist() for values in np.nonzero(hits))))
+
+
+@pytest.mark.parametrize("count", [0, 5, 64, 65, 2000])
+def test_query_pairs_finds_every_touching_pair(count):
+    # Both the direct path (up to the limit) and the grid (past it) must return every pair that touches,
+    # the grid may return a few extra candidates on top
+    rng = np.random.default_rng(count)
+    boxes = randomBoxes(rng, count, 120)
+    queries = randomBoxes(rng, 300, 300)
+    ids = np.arange(count) * 3 + 7
+
+    spatial_hash = SpatialHash()
+    spatial_hash.rebuild(*boxes, ids)
+    assert spatial_hash.direct == (count <= spatial_hash.direct_limit)
+
+    query_indices, entry_ids = spatial_hash.queryPairs(*queries)
+    pairs = list(zip(query_indices.tolist(), ((entry_ids - 7) // 3).tolist()))
+    assert len(pairs) == len(set(pairs))
+    assert bruteForcePairs(boxes, queries) <= set(pairs)
+    if spatial_hash.direct:
+        assert set(pairs) == bruteForcePairs(boxes, queries)
+
+
+def test_grid_and_direct_paths_agree_after_the_narrowphase():
+    rng = np.random.default_rng(3)
+    boxes = randomBoxes(rng, 50, 80)
+    queries = randomBoxes(rng, 100, 40)
+    expected = bruteForcePairs(boxes, queries)
+
+    for limit in (0, 50):
+        spatial_hash = SpatialHash(direct_limit=limit)
+        spatial_hash.rebuild(*boxes, np.arange(50))
+        query_indices, entry_ids = spatial_hash.queryPairs(*queries)
+        found = set(zip(query_indices.tolist(), entry_ids.tolist()))
+        assert found & expected == expected
+
+
+def test_query_returns_ids_in_ascending_order():
+    rng = np.random.default_rng(4)
+    boxes = randomBoxes(rng, 500, 100)
+    spatial_hash = SpatialHash()
+    spatial_hash.rebuild(*boxes, np.arange(500)[::-1].copy())
+
+    candidates = spatial_hash.query(400, 300, 600, 400)
+    assert len(candidates) > 0
+    assert (np.diff(candidates) > 0).all()
+
+
+def test_empty_hash_returns_no_pairs():
+    spatial_hash = SpatialHash()
+    spatial_hash.rebuild(np.zeros(0), np.zeros(0), np.zeros(0), np.zeros(0), np.zeros(0, dtype=np.int64))
+    query_indices, entry_ids = spatial_hash.queryPairs(np.array([0.0]), np.array([0.0]), np.array([10.0]),
+                                                       np.array([10.0]))
+    assert len(query_indices) == 0 and len(entry_ids) == 0
+    assert len(spatial_hash.query(0, 0, 10, 10)) == 0
@@ -0,0 +1,144 @@
+import numpy as np
+
+from asteroid_field import STATE_SMALL
+from collision_mask import (bodiesTouch, buildHull, convexHull, hullRadii, hullsOverlap, padHull, placeHulls,
+                            sweptBoxes)
+from headless import HeadlessGame
+
+SQUARE = np.array([[0.0, 0.0], [10.0, 0.0], [10.0, 10.0], [0.0, 10.0]])
+TRIANGLE = np.array([[0.0, 0.0], [10.0, 0.0], [0.0, 10.0]])
+
+
+def placed(hull, x: float, y: float, rotation: float = 0.0) -> np.ndarray:
+    # One hull of a 10x10 texture placed at (x, y), as a single pair for hullsOverlap
+    return placeHulls(padHull(hull), x, y, 10, 10, 1.0, rotation)[None]
+
+
+def signedArea(hull: np.ndarray) -> float:
+    return 0.5 * float(np.sum(hull[:, 0] * np.roll(hull[:, 1], -1) - np.roll(hull[:, 0], -1) * hull[:, 1]))
+
+
+def test_convex_hull_drops_inner_and_collinear_points():
+    rng = np.random.default_rng(1)
+    inner = rng.uniform(1, 9, (50, 2))
+    edges = np.array([[5.0, 0.0], [10.0, 5.0], [0.0, 10.0]])
+    hull = convexHull(np.concatenate((SQUARE, inner, edges, SQUARE)))
+
+    assert len(hull) == 4
+    assert {tuple(point) for point in hull.tolist()} == {tuple(point) for point in SQUARE.tolist()}
+    # Counter-clockwise with y pointing up, which gives a positive signed area
+    assert signedArea(hull) > 0
+
+
+def test_build_hull_covers_the_solid_pixels():
+    alpha = np.zeros((8, 12), dtype=np.uint8)
+    alpha[2:6, 3:9] = 255
+    hull = buildHull(alpha)
+    assert hull[:, 0].min() == 3 and hull[:, 0].max() == 9
+    assert hull[:, 1].min() == 2 and hull[:, 1].max() == 6
+
+    # Nothing solid falls back to the whole texture
+    assert buildHull(np.zeros((4, 6), dtype=np.uint8)).tolist() == [[0, 0], [6, 0], [6, 4], [0, 4]]
+
+
+def test_hulls_overlap_only_when_no_axis_separates_them():
+    assert hullsOverlap(placed(SQUARE, 0, 0), placed(SQUARE, 5, 5))[0]
+    assert hullsOverlap(placed(SQUARE, 0, 0), placed(SQUARE, 10, 0))[0]
+    assert not hullsOverlap(placed(SQUARE, 0, 0), placed(SQUARE, 10.5, 0))[0]
+
+    # The boxes overlap here, but the triangle's long edge separates it from the square's corner
+    assert not hullsOverlap(placed(TRIANGLE, 0, 0), placed(SQUARE, 6, 6))[0]
+    assert hullsOverlap(placed(TRIANGLE, 0, 0), placed(SQUARE, 4, 4))[0]
+
+
+def test_hulls_overlap_checks_every_pair_at_once():
+    hulls_1 = np.concatenate([placed(SQUARE, 0, 0)] * 3)
+    hulls_2 = np.concatenate([placed(SQUARE, 5, 5), placed(SQUARE, 20, 0), placed(SQUARE, 12, 0, np.pi / 4)])
+    assert hullsOverlap(hulls_1, hulls_2).tolist() == [True, False, True]
+
+
+def test_bodies_touch_matches_the_separating_axis_test():
+    # The triangle's long edge runs through the centre of its texture, so no circle around the centre fits inside
+    inner, outer = hullRadii(TRIANGLE, 10, 10)
+    assert inner == 0.0
+    triangle = (padHull(TRIANGLE), 0.0, 0.0, 10, 10, 1.0, 0.0, inner, outer)
+
+    inner, outer = hullRadii(SQUARE, 10, 10)
+    assert (inner, outer) == (5.0, np.sqrt(50))
+    x = np.array([4.0, 6.0, 20.0])
+    squares = (padHull(SQUARE), x, x, 10, 10, 1.0, 0.0, inner, outer)
+
+    expected = hullsOverlap(np.concatenate([placed(TRIANGLE, 0, 0)] * 3),
+                            np.concatenate([placed(SQUARE, value, value) for value in x]))
+    assert bodiesTouch(triangle, squares).tolist() == expected.tolist() == [True, False, False]
+
+
+def test_swept_boxes_without_movement_match_is_inside():
+    rng = np.random.default_rng(2)
+    x, y = rng.uniform(0, 100, (2, 200))
+    box_x, box_y = rng.uniform(0, 100, (2, 200))
+    hits, when = sweptBoxes(x, y, 0.0, 0.0, 10.0, 10.0, box_x, box_y, 20.0, 20.0, 0.2)
+
+    inside = (x + 10.0 - 0.2 >= box_x + 0.2) & (box_x + 20.0 - 0.2 >= x + 0.2) \
+        & (y + 10.0 - 0.2 >= box_y + 0.2) & (box_y + 20.0 - 0.2 >= y + 0.2)
+    assert hits.tolist() == inside.tolist()
+    assert (when[hits] == 0.0).all()
+
+
+def test_swept_boxes_catch_a_box_passed_over_within_the_step():
+    # A 4 pixel box moving 100 pixels jumps right over a 10 pixel box that sits halfway along its path
+    hits, when = sweptBoxes(0.0, 3.0, 100.0, 0.0, 4.0, 4.0, 50.0, 0.0, 10.0, 10.0, 0.0)
+    assert hits
+
+    # The hulls are compared where the centres pass closest, 53 of the 100 pixels along
+    assert np.isclose(when, 0.53)
+
+    # Neither end of the step overlaps it
+    assert not sweptBoxes(0.0, 3.0, 0.0, 0.0, 4.0, 4.0, 50.0, 0.0, 10.0, 10.0, 0.0)[0]
+    assert not sweptBoxes(100.0, 3.0, 0.0, 0.0, 4.0, 4.0, 50.0, 0.0, 10.0, 10.0, 0.0)[0]
+
+    # Passing above it, stopping short of it, or moving away from it misses
+    assert not sweptBoxes(0.0, -20.0, 100.0, 0.0, 4.0, 4.0, 50.0, 0.0, 10.0, 10.0, 0.0)[0]
+    assert not sweptBoxes(0.0, 3.0, 40.0, 0.0, 4.0, 4.0, 50.0, 0.0, 10.0, 10.0, 0.0)[0]
+    assert not sweptBoxes(0.0, 3.0, -100.0, 0.0, 4.0, 4.0, 50.0, 0.0, 10.0, 10.0, 0.0)[0]
+
+
+def test_swept_boxes_diagonal_paths_only_hit_what_they_cross():
+    # Moving from (0, 0) to (100, 100), the box at (45, 45) is on the path and the one at (80, 10) isn't
+    hits, when = sweptBoxes(0.0, 0.0, 100.0, 100.0, 2.0, 2.0, np.array([45.0, 80.0]), np.array([45.0, 10.0]), 10.0,
+                            10.0, 0.0)
+    assert hits.tolist() == [True, False]
+    assert 0.43 <= when[0] <= 0.55
+
+
+def test_projectiles_do_not_tunnel_through_small_asteroids_at_30_hz():
+    headless = HeadlessGame(seed=1)
+    game = headless.game
+    headless.startGame()
+    game.enemies.setCount(0)
+
+    field = game.asteroids
+    field.clear()
+    index = field.acquire()
+    field.setTexture(index, 0)
+    field.setScale(index, 0.25)
+    field.setPosition(index, 800.0, 400.0)
+    field.state[index] = STATE_SMALL
+    field.dir_x[index] = field.dir_y[index] = field.spin[index] = field.rotation[index] = 0.0
+    field.buildBroadphase(game.broadphase)
+
+    # At 30 steps a second, a projectile this fast moves well over the asteroid's width every step
+    delta_time = 1 / 30
+    projectiles = game.projectiles
+    projectiles.projectile.move_speed = 60.0
+    shot = projectiles.fire(800.0 - projectiles.width - 10.0,
+                            400.0 + field.extent_y[index] / 2 - projectiles.height / 2, 1.0, 0.0)
+    dx = projectiles.sweep(np.array([shot]), delta_time)[0][0]
+    assert dx > field.extent_x[index] + projectiles.width + 10.0
+
+    game.data.score = 0
+    game.simulateProjectiles(delta_time)
+
+    assert game.data.score == field.state_scores[STATE_SMALL]
+    assert not projectiles.is_shot[shot]
+    assert field.allDestroyed()
@@ -0,0 +1,97 @@
+from governor import FrameGovernor, QualityLevel
+
+BUDGET = 0.010
+HEAVY = BUDGET * 1.5
+LIGHT = BUDGET * 0.3
+MIDDLING = BUDGET * 0.75
+
+
+def makeGovernor(restore_after: int = 5, max_restore_after: int = 50):
+    # Three levels and a short window, with every level change recorded
+    levels = [QualityLevel("full"), QualityLevel("reduced", {"spin": 30}), QualityLevel("minimal", {"spin": 10})]
+    applied = []
+    governor = FrameGovernor(levels, applied.append, BUDGET, window=10, restore_after=restore_after,
+                             max_restore_after=max_restore_after)
+    governor.setEnabled(True)
+    return governor, applied
+
+
+def feed(governor: FrameGovernor, frame_time: float, frames: int) -> None:
+    for _ in range(frames):
+        governor.record(frame_time)
+
+
+def test_steps_down_one_level_per_full_window_of_slow_frames():
+    governor, applied = makeGovernor()
+    feed(governor, HEAVY, 9)
+    assert governor.index == 0 and applied == []
+
+    feed(governor, HEAVY, 1)
+    assert governor.level.name == "reduced"
+    assert [level.name for level in applied] == ["reduced"]
+
+    # The next window starts over, and there is nothing below the last level
+    feed(governor, HEAVY, 9)
+    assert governor.index == 1
+    feed(governor, HEAVY, 31)
+    assert governor.level.name == "minimal"
+    assert [level.name for level in applied] == ["reduced", "minimal"]
+
+
+def test_a_few_missed_frames_are_enough_to_step_down():
+    governor, _ = makeGovernor()
+    feed(governor, LIGHT, 8)
+    feed(governor, HEAVY * 2, 2)
+    assert governor.index == 1
+
+
+def test_steps_back_up_only_after_a_run_of_fast_frames():
+    governor, applied = makeGovernor(restore_after=5)
+    feed(governor, HEAVY, 10)
+
+    # The first full window is the first check, then it takes 5 checks in a row with plenty of headroom
+    feed(governor, LIGHT, 13)
+    assert governor.index == 1
+    feed(governor, LIGHT, 1)
+    assert governor.index == 0
+    assert [level.name for level in applied] == ["reduced", "full"]
+
+
+def test_frames_close_to_the_budget_hold_the_level():
+    governor, _ = makeGovernor(restore_after=5)
+    feed(governor, HEAVY, 10)
+
+    # Neither slow enough to step down nor fast enough to count towards stepping up
+    feed(governor, MIDDLING, 100)
+    assert governor.index == 1
+    assert governor.headroom == 0
+
+
+def test_stepping_straight_back_down_doubles_the_wait_before_the_next_step_up():
+    governor, _ = makeGovernor(restore_after=20, max_restore_after=50)
+    feed(governor, HEAVY, 10)
+    feed(governor, LIGHT, 29)
+    assert governor.index == 0
+
+    # Slow again as soon as it stepped up, so it was too soon
+    feed(governor, HEAVY, 10)
+    assert governor.index == 1 and governor.restore_wait == 40
+    feed(governor, LIGHT, 9 + 39)
+    assert governor.index == 1
+    feed(governor, LIGHT, 1)
+    assert governor.index == 0
+
+    feed(governor, HEAVY, 10)
+    assert governor.restore_wait == 50
+
+
+def test_disabling_goes_back_to_full_quality_and_stops_timing():
+    governor, applied = makeGovernor()
+    feed(governor, HEAVY, 10)
+    governor.setEnabled(False)
+    assert governor.index == 0 and applied[-1].name == "full"
+
+    total = governor.total_frames
+    governor.beginFrame()
+    governor.endFrame()
+    assert governor.total_frames == total
@@ -0,0 +1,74 @@
+from asteroid_field import STATE_LARGE, STATE_MEDIUM
+from headless import HeadlessGame
+
+
+def placeAsteroid(field, x: float, y: float) -> int:
+    # A still, large asteroid at (x, y)
+    index = field.acquire()
+    field.setTexture(index, 0)
+    field.setScale(index, 2.0)
+    field.setPosition(index, x, y)
+    field.dir_x[index] = 0.0
+    field.dir_y[index] = 0.0
+    field.rotation[index] = 0.0
+    field.spin[index] = 0.0
+    return index
+
+
+def fireAt(game, index: int) -> int:
+    # A projectile sitting on the centre of an asteroid, moving right
+    field = game.asteroids
+    projectiles = game.projectiles
+    x = field.x[index] + field.extent_x[index] / 2 - projectiles.width / 2
+    y = field.y[index] + field.extent_y[index] / 2 - projectiles.height / 2
+    return projectiles.fire(x, y, 1.0, 0.0)
+
+
+def test_projectiles_hitting_the_same_asteroid_in_one_step_break_it_once():
+    # Breaking B reuses the row A was just released from, so the third projectile's hit on A is out of date
+    # and mustn't break B's piece that now sits in that row
+    headless = HeadlessGame(seed=1)
+    game = headless.game
+    headless.startGame()
+    game.enemies.setCount(0)
+    game.projectiles.reserve(3)
+
+    field = game.asteroids
+    field.clear()
+    a = placeAsteroid(field, 300, 300)
+    b = placeAsteroid(field, 1100, 600)
+    field.buildBroadphase(game.broadphase)
+
+    shots = [fireAt(game, a), fireAt(game, b), fireAt(game, a)]
+    game.data.score = 0
+    game.simulateProjectiles(game.sim_timestep)
+
+    assert game.data.score == 2 * int(field.state_scores[STATE_LARGE])
+    assert field.live_count == 2 * game.asteroid_split_chunks
+    live = field.liveIndices()
+    assert (field.state[live] == STATE_MEDIUM).all()
+
+    # The third projectile didn't hit anything still there, so it's still in the air
+    assert game.projectiles.is_shot[shots[2]]
+    assert not game.projectiles.is_shot[shots[0]] and not game.projectiles.is_shot[shots[1]]
+
+
+def test_turning_rapid_fire_off_limits_the_player_to_the_normal_number_of_projectiles():
+    headless = HeadlessGame(seed=1)
+    game = headless.game
+    headless.startGame()
+
+    game.setRapidFire(True)
+    for _ in range(10):
+        game.spawnProjectile()
+    assert len(game.projectiles) == 10
+
+    # The pool keeps its rapid-fire size, but no more shots go out until enough of them are gone
+    game.setRapidFire(False)
+    game.spawnProjectile()
+    assert len(game.projectiles) == 10
+
+    game.projectiles.clear()
+    for _ in range(5):
+        game.spawnProjectile()
+    assert len(game.projectiles) == game.max_projectiles == 3
@@ -0,0 +1,105 @@
+import pytest
+
+from scheduler import Scheduler, parseRate
+
+STEP = 1 / 60
+
+
+def recordingScheduler(rates: dict):
+    # A scheduler whose systems just record the delta time of every call
+    scheduler = Scheduler()
+    calls = {}
+    for name, rate in rates.items():
+        calls[name] = []
+        scheduler.add(name, calls[name].append, rate)
+
+    return scheduler, calls
+
+
+def test_systems_run_at_their_own_rate_with_all_the_time_since_their_last_run():
+    scheduler, calls = recordingScheduler({"physics": None, "ai": 15, "spin": 30})
+    for _ in range(60):
+        scheduler.tick(STEP)
+
+    assert len(calls["physics"]) == 60
+    assert len(calls["ai"]) == 15
+    assert len(calls["spin"]) == 30
+    for name in calls:
+        assert sum(calls[name]) == pytest.approx(1.0)
+        assert set(round(delta, 9) for delta in calls[name]) == {round(1 / (scheduler.get(name).rate or 60), 9)}
+
+
+def test_systems_run_in_the_order_they_were_added():
+    scheduler = Scheduler()
+    order = []
+    for name in ("input", "physics", "render"):
+        scheduler.add(name, lambda delta_time, name=name: order.append(name))
+
+    scheduler.tick(STEP)
+    assert order == ["input", "physics", "render"]
+
+
+def test_set_rate_starts_the_system_over():
+    scheduler, calls = recordingScheduler({"ai": 10})
+    for _ in range(4):
+        scheduler.tick(STEP)
+    scheduler.setRate("ai", 0)
+    assert scheduler.get("ai").run_rate is None
+
+    scheduler.tick(STEP)
+    assert calls["ai"] == [STEP]
+
+    scheduler.setRates({"ai": 20})
+    for _ in range(3):
+        scheduler.tick(STEP)
+    assert len(calls["ai"]) == 2
+
+
+def test_unknown_systems_are_named_in_the_error():
+    scheduler, _ = recordingScheduler({"physics": None, "ai": 15})
+    with pytest.raises(ValueError, match="unknown system aliens, expected one of physics, ai"):
+        scheduler.setRate("aliens", 10)
+
+
+def test_every_call_is_timed():
+    scheduler, _ = recordingScheduler({"physics": None, "ai": 30})
+    for _ in range(4):
+        scheduler.tick(STEP)
+
+    stats = scheduler.stats()
+    assert stats["physics"]["calls"] == 4 and stats["ai"]["calls"] == 2
+    assert stats["ai"]["rate"] == 30
+    assert stats["physics"]["worst_ms"] >= stats["physics"]["mean_ms"] >= 0.0
+    assert scheduler.summary().splitlines()[1].split()[:2] == ["ai", "30hz"]
+
+    scheduler.resetStats()
+    assert scheduler.stats()["physics"]["calls"] == 0
+
+
+def test_parse_rate():
+    assert parseRate("alien_ai = 10") == ("alien_ai", 10.0)
+
+
+def test_a_cap_holds_a_system_below_its_rate_until_lifted():
+    scheduler, calls = recordingScheduler({"spin": None})
+    scheduler.setCap("spin", 20)
+    for _ in range(7):
+        scheduler.tick(STEP)
+    assert calls["spin"] == pytest.approx([3 * STEP, 3 * STEP])
+
+    # The tick left over from while it was capped is handed over with the next one
+    scheduler.setCap("spin", None)
+    scheduler.tick(STEP)
+    assert calls["spin"][-1] == pytest.approx(2 * STEP)
+    assert scheduler.get("spin").run_rate is None
+
+
+def test_a_cap_never_speeds_a_system_up_and_outlives_rate_changes():
+    scheduler, _ = recordingScheduler({"ai": 15})
+    scheduler.setCap("ai", 30)
+    assert scheduler.get("ai").run_rate == 15
+
+    scheduler.setRate("ai", 60)
+    assert scheduler.get("ai").run_rate == 30
+    scheduler.setCap("ai", 0)
+    assert scheduler.get("ai").run_rate == 60
@@ -0,0 +1,97 @@
+import pyasge
+
+from ui import ALIGN_CENTRE, ALIGN_LEFT, ALIGN_RIGHT, Label, UILayer
+
+
+class CountingFormatter:
+    # A formatter that counts how often the label rebuilt its string
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def __call__(self, value) -> str:
+        self.calls += 1
+        return "Score: " + str(value)
+
+
+def makeLabel(value=0, align: int = ALIGN_LEFT, x_pos: float = 100.0):
+    made = []
+    formatter = CountingFormatter()
+
+    def makeText() -> pyasge.Text:
+        made.append(pyasge.Text(pyasge.Font("font.ttf", 20)))
+        return made[-1]
+
+    return Label(makeText, value, x_pos, 50.0, formatter=formatter, align=align), made, formatter
+
+
+def test_text_is_only_made_when_first_needed():
+    label, made, formatter = makeLabel()
+    label.set(5)
+    assert made == [] and formatter.calls == 0
+
+    text = label.text
+    assert made == [text]
+    assert text.string == "Score: 5" and text.y == 50.0
+    assert label.text is text and formatter.calls == 1
+
+
+def test_unchanged_values_do_not_rebuild_the_text():
+    label, made, formatter = makeLabel()
+    assert label.refresh()
+
+    label.set(0)
+    label.setColour(pyasge.COLOURS.WHITE)
+    assert not label.dirty
+    assert not label.refresh()
+    assert formatter.calls == 1
+
+
+def test_changes_are_applied_once_on_refresh():
+    label, made, formatter = makeLabel()
+    label.refresh()
+
+    for value in (1, 2, 3):
+        label.set(value)
+    label.setColour(pyasge.COLOURS.RED)
+    assert label.dirty
+    assert label.text.string == "Score: 0"
+
+    assert label.refresh()
+    assert label.text.string == "Score: 3" and label.text.colour == pyasge.COLOURS.RED
+    assert formatter.calls == 2
+    assert len(made) == 1
+
+
+def test_alignment_follows_the_new_width():
+    label, _, _ = makeLabel(align=ALIGN_RIGHT, x_pos=500.0)
+    label.refresh()
+    assert label.text.x + label.text.width == 500.0
+
+    label.set(12345)
+    label.refresh()
+    assert label.text.x + label.text.width == 500.0
+
+    label, _, _ = makeLabel(align=ALIGN_CENTRE, x_pos=500.0)
+    label.refresh()
+    assert label.text.x + label.text.width / 2 == 500.0
+
+
+def test_layer_only_refreshes_labels_on_the_screens_shown():
+    layer = UILayer()
+    score, _, _ = makeLabel()
+    timer, _, timer_formatter = makeLabel()
+    layer.add(["game", "pause"], score)
+    layer.add(["pause"], timer)
+
+    layer.refresh(["game"])
+    assert layer.refreshes == 1
+    assert not score.dirty and timer.dirty and timer_formatter.calls == 0
+
+    layer.refresh(["game"])
+    assert layer.refreshes == 1
+
+    score.set(10)
+    layer.refreshAll()
+    assert layer.refreshes == 3
+    assert not score.dirty and not timer.dirty
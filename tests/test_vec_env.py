@@ -0,0 +1,59 @@
+import numpy as np
+
+from vec_env import STATE_SMALL, VecAsteroidsEnv, encodeAction
+
+IDLE = encodeAction(0, 0, False)
+
+
+def quietEnv(sim_rate: float) -> VecAsteroidsEnv:
+    # One game with the ship parked in a corner, the alien held off screen and one still, small asteroid
+    env = VecAsteroidsEnv(1, seed=3, sim_rate=sim_rate, asteroid_count=1)
+    env.ship_x[:] = env.ship_sprite_x[:] = 20.0
+    env.ship_y[:] = env.ship_sprite_y[:] = 20.0
+    env.alien_spawn_timer[:] = 1e9
+
+    env.asteroid_alive[:] = False
+    env.asteroid_alive[0, 0] = True
+    env.asteroid_state[0, 0] = STATE_SMALL
+    env.asteroid_dir_x[0, 0] = env.asteroid_dir_y[0, 0] = 0.0
+    env.asteroid_spin[0, 0] = 0.0
+    env.asteroid_scale[0, 0] = 20.0 / env.asteroid_width[0, 0]
+    return env
+
+
+def fire(env: VecAsteroidsEnv, x: float, y: float) -> None:
+    env.projectile_shot[0, 0] = True
+    env.projectile_x[0, 0] = x
+    env.projectile_y[0, 0] = y
+    env.projectile_dir_x[0, 0] = 1.0
+    env.projectile_dir_y[0, 0] = 0.0
+
+
+def test_projectile_hits_an_asteroid_it_passes_within_one_step():
+    # At 10 steps a second a projectile moves further in a step than the asteroid is wide,
+    # so it is only ever before or past it at the end of a step
+    env = quietEnv(10)
+    travel = env.projectile.move_speed * env.delta_time * 60
+    asteroid_width = env.asteroid_width[0, 0] * env.asteroid_scale[0, 0]
+    assert travel > asteroid_width + env.projectile_size[0]
+
+    asteroid_height = env.asteroid_height[0, 0] * env.asteroid_scale[0, 0]
+    env.asteroid_x[0, 0] = 600.0
+    env.asteroid_y[0, 0] = 400.0
+    fire(env, 600.0 - env.projectile_size[0] - 5.0, 400.0 + asteroid_height / 2 - env.projectile_size[1] / 2)
+
+    _, rewards, dones, _ = env.step(np.array([IDLE]))
+    assert rewards[0] == env.asteroid_scores[STATE_SMALL]
+    assert not env.projectile_shot[0, 0]
+    assert not dones[0]
+
+
+def test_projectile_misses_an_asteroid_off_its_path():
+    env = quietEnv(10)
+    env.asteroid_x[0, 0] = 600.0
+    env.asteroid_y[0, 0] = 400.0
+    fire(env, 560.0, 300.0)
+
+    _, rewards, _, _ = env.step(np.array([IDLE]))
+    assert rewards[0] == 0
+    assert env.projectile_shot[0, 0]
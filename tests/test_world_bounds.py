@@ -0,0 +1,109 @@
+import numpy as np
+import pyasge
+
+from headless import HeadlessGame
+from world_bounds import WorldBounds
+
+
+def makeSprite(x: float, y: float, width: float, height: float) -> pyasge.Sprite:
+    sprite = pyasge.Sprite()
+    sprite.x = x
+    sprite.y = y
+    sprite.width = width
+    sprite.height = height
+    return sprite
+
+
+def ghostSet(ghosts) -> set:
+    indices, offsets_x, offsets_y = ghosts
+    return set(zip(indices.tolist(), offsets_x.tolist(), offsets_y.tolist()))
+
+
+def test_wrap_keeps_positions_on_screen_in_place():
+    bounds = WorldBounds(1600, 900)
+    pool_x = np.array([-10.0, 1600.0, 1750.0, 5.0])
+    pool_y = np.array([-900.0, 899.5, 1000.0, -0.5])
+
+    # Only the first three rows are in use, the last one must be left alone
+    bounds.wrap(pool_x[:3], pool_y[:3])
+    assert pool_x.tolist() == [1590.0, 0.0, 150.0, 5.0]
+    assert pool_y.tolist() == [0.0, 899.5, 100.0, -0.5]
+
+
+def test_interpolate_does_not_sweep_across_the_screen_after_wrapping():
+    bounds = WorldBounds(1600, 900)
+    x, y = bounds.interpolate(np.array([5.0, 110.0]), np.array([50.0, 50.0]), np.array([1595.0, 100.0]),
+                              np.array([50.0, 50.0]), 0.5)
+    assert x.tolist() == [5.0, 105.0]
+    assert y.tolist() == [50.0, 50.0]
+
+
+def test_overhang_is_how_far_boxes_stick_out_past_the_far_edges():
+    bounds = WorldBounds(1600, 900)
+    assert bounds.overhang([], [], 0, 0) == (0.0, 0.0)
+    assert bounds.overhang([100.0, 1550.0], [880.0, 10.0], np.array([50.0, 80.0]), np.array([40.0, 40.0])) \
+        == (30.0, 20.0)
+    assert bounds.overhang([100.0], [100.0], 50.0, 50.0) == (0.0, 0.0)
+
+
+def test_ghosts_copy_boxes_straddling_an_edge():
+    bounds = WorldBounds(1600, 900)
+    x = np.array([1580.0, 100.0, 1590.0, 500.0])
+    y = np.array([100.0, 880.0, 890.0, 500.0])
+    ghosts = ghostSet(bounds.ghosts(x, y, 40.0, 40.0))
+
+    # Right edge, bottom edge, and the corner box which is copied left, up and diagonally
+    assert ghosts == {(0, -1600.0, 0.0), (1, 0.0, -900.0),
+                      (2, -1600.0, 0.0), (2, 0.0, -900.0), (2, -1600.0, -900.0)}
+
+
+def test_ghosts_reach_copies_boxes_near_the_near_edges():
+    bounds = WorldBounds(1600, 900)
+    x = np.array([10.0, 500.0])
+    y = np.array([500.0, 5.0])
+    assert len(bounds.ghosts(x, y, 20.0, 20.0)[0]) == 0
+
+    ghosts = ghostSet(bounds.ghosts(x, y, 20.0, 20.0, reach_x=30.0, reach_y=30.0))
+    assert ghosts == {(0, 1600.0, 0.0), (1, 0.0, 900.0)}
+
+
+def test_sprite_offsets_match_ghosts():
+    bounds = WorldBounds(1600, 900)
+    sprite = makeSprite(1590.0, 3.0, 20.0, 20.0)
+    offsets = bounds.spriteOffsets(sprite, 0.0, 10.0)
+    assert offsets[0] == (0.0, 0.0)
+
+    expected = {(offset_x, offset_y) for _, offset_x, offset_y in ghostSet(bounds.ghosts([1590.0], [3.0], 20.0, 20.0,
+                                                                                         0.0, 10.0))}
+    assert set(offsets[1:]) == expected
+
+
+def test_field_overhang_follows_the_asteroids():
+    headless = HeadlessGame(seed=1)
+    game = headless.game
+    headless.startGame()
+    field = game.asteroids
+    bounds = game.bounds
+    field.clear()
+    assert field.overhang(bounds) == (0.0, 0.0)
+
+    index = field.acquire()
+    field.setTexture(index, 0)
+    field.setScale(index, 1.0)
+    field.setPosition(index, bounds.width - 10.0, 100.0)
+    assert field.overhang(bounds) == (field.extent_x[index] - 10.0, 0.0)
+
+    # Moving, wrapping and releasing all change the answer
+    field.dir_x[index] = 1.0
+    field.dir_y[index] = 0.0
+    field.advance(1.0)
+    assert field.overhang(bounds)[0] > field.extent_x[index] - 10.0
+
+    field.setPosition(index, bounds.width + 5.0, 100.0)
+    field.wrap(bounds)
+    assert field.overhang(bounds) == (0.0, 0.0)
+
+    field.setPosition(index, bounds.width - 10.0, bounds.height - 10.0)
+    assert field.overhang(bounds) == (field.extent_x[index] - 10.0, field.extent_y[index] - 10.0)
+    field.release(index)
+    assert field.overhang(bounds) == (0.0, 0.0)
@@ -0,0 +1,155 @@
+import json
+import os
+
+import pyasge
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+KENNEY_DIR = "/data/images/kenney_simple-space/PNG/Retina/"
+
+# Every texture the game uses, loaded up front so spawning things mid-game never touches the disk
+PRELOAD_FILES = [
+    "/data/images/custom/spaceBackground.png",
+    KENNEY_DIR + "meteor_detailedLarge.png",
+    KENNEY_DIR + "meteor_large.png",
+    KENNEY_DIR + "meteor_squareDetailedLarge.png",
+    KENNEY_DIR + "meteor_squareLarge.png",
+    KENNEY_DIR + "ship_G.png",
+    KENNEY_DIR + "star_small.png",
+    KENNEY_DIR + "star_tiny.png",
+    KENNEY_DIR + "enemy_E.png",
+]
+
+# The sprites packed into the texture atlas by atlas_packer.py, everything but the full-screen background
+ATLAS_FILES = [path for path in PRELOAD_FILES if path.startswith(KENNEY_DIR)]
+ATLAS_IMAGE = "/data/images/atlas/atlas.png"
+ATLAS_MANIFEST = "/data/images/atlas/atlas.json"
+ATLAS_VERSION = 1
+
+
+def normalisePath(path: str) -> str:
+    # "/data/x.png" and "data/x.png" both point at the same file in ASGE's file system
+    return os.path.normpath(path.lstrip("/")).replace("\\", "/")
+
+
+class TextureCache:
+    """ Process-wide cache of textures, keyed by file path
+
+    Textures are created through the renderer the first time a path is
+    asked for, and every later request hands out the same texture so
+    sprites share it instead of each loading their own copy. Hit and miss
+    counts are kept to check that gameplay is not loading anything new.
+
+    Once an atlas is loaded, the textures packed into it are all served
+    by the one atlas texture, and sprites attached to them are pointed at
+    their part of it. Anything missing from the atlas, or changed since
+    it was packed, is still loaded from its own file.
+    """
+
+    def __init__(self) -> None:
+        self.renderer = None
+        self.textures = {}
+        self.hits = 0
+        self.misses = 0
+
+        # Path of each packed texture -> [x, y, width, height] in the atlas image
+        self.atlas_image = None
+        self.atlas_rects = {}
+
+    def setRenderer(self, renderer) -> None:
+        # Textures belong to the renderer that created them, so switching renderer starts the cache over
+        if renderer is not self.renderer:
+            self.renderer = renderer
+            self.textures.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def loadAtlas(self, manifest_path: str = ATLAS_MANIFEST) -> bool:
+        # Reads the manifest written by atlas_packer.py, the image itself is loaded with the other textures
+        try:
+            with open(os.path.join(ROOT_DIR, normalisePath(manifest_path))) as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            return False
+
+        if manifest.get("version") != ATLAS_VERSION:
+            return False
+
+        self.atlas_image = manifest["image"]
+        self.atlas_rects = {}
+        for key, sprite in manifest["sprites"].items():
+            try:
+                stat = os.stat(os.path.join(ROOT_DIR, key))
+            except OSError:
+                continue
+
+            # A source image that changed since packing is loaded on its own until the atlas is rebuilt
+            if stat.st_size == sprite["size"] and stat.st_mtime_ns == sprite["mtime_ns"]:
+                self.atlas_rects[key] = sprite["rect"]
+
+        return True
+
+    def get(self, path: str):
+        key = normalisePath(path)
+        if key in self.atlas_rects:
+            key = self.atlas_image
+
+        texture = self.textures.get(key)
+        if texture is not None:
+            self.hits += 1
+            return texture
+
+        self.misses += 1
+        texture = self.renderer.createCachedTexture(key)
+        if texture is not None:
+            self.textures[key] = texture
+
+        return texture
+
+    def sourceFiles(self, paths: list) -> list:
+        # The files that loading 'paths' actually reads, where everything in the atlas is the one atlas image
+        files = []
+        for path in paths:
+            key = normalisePath(path)
+            if key in self.atlas_rects:
+                key = self.atlas_image
+            if key not in files:
+                files.append(key)
+
+        return files
+
+    def preload(self, paths: list) -> None:
+        for path in self.sourceFiles(paths):
+            if path not in self.textures:
+                self.get(path)
+
+    def attach(self, sprite: pyasge.Sprite, path: str) -> bool:
+        # Drop-in replacement for 'sprite.loadTexture(path)' that shares the cached texture
+        texture = self.get(path)
+        if texture is None or not sprite.attach(texture):
+            return False
+
+        rect = self.atlas_rects.get(normalisePath(path))
+        if rect is not None:
+            # attach() sizes the sprite to the whole atlas, so shrink it back down to its own part
+            sprite.src_rect = list(rect)
+            sprite.width = rect[2]
+            sprite.height = rect[3]
+
+        return True
+
+    def size(self, path: str) -> tuple:
+        # Width and height of the image at 'path', whether it was packed into the atlas or not
+        rect = self.atlas_rects.get(normalisePath(path))
+        if rect is not None:
+            return rect[2], rect[3]
+
+        texture = self.get(path)
+        return texture.width, texture.height
+
+    def stats(self) -> dict:
+        return {"textures": len(self.textures), "hits": self.hits, "misses": self.misses,
+                "atlas_sprites": len(self.atlas_rects)}
+
+
+TEXTURES = TextureCache()
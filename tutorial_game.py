@@ -1,9 +1,28 @@
+import argparse
+import atexit
+import logging
 import random
 import math
 import enum
 import pyasge
 import GameObject
+from asteroid_field import AsteroidField, STATES
+from asteroid_lod import AsteroidLOD
+from broadphase import SpatialHash
+from collision_mask import MASKS, shiftBody, spriteBody
+from enemies import EnemyManager
+from projectile_pool import ProjectilePool
+from render_queue import RenderQueue
+from replay import Replay, ReplayPlayer, ReplayRecorder
+from scheduler import Scheduler, parseRate
+from asset_loader import AssetLoader
+from frame_profiler import FrameProfiler, STARTUP, PHASE_TIMERS, PHASE_PLAYER, PHASE_ASTEROIDS, PHASE_PROJECTILES, \
+    PHASE_ALIEN, PHASE_UI, PHASE_RENDER
 from gamedata import GameData
+from governor import FrameGovernor, QualityLevel
+from texture_cache import TEXTURES, PRELOAD_FILES, ATLAS_FILES
+from ui import Label, UILayer, ALIGN_LEFT, ALIGN_RIGHT, ALIGN_CENTRE
+from world_bounds import WorldBounds, GhostSprites
 
 
 def isInside(sprite_1: pyasge.Sprite, sprite_2: pyasge.Sprite, margin: float) -> bool:
@@ -31,6 +50,12 @@ def isInsideText(object_sprite: pyasge.Sprite, text_sprite: pyasge.Text) -> bool
     pass
 
 
+GAME_FONT = "/data/fonts/KGHAPPY.ttf"
+
+# Only drawn during gameplay, so it's loaded when the first game starts rather than before the main menu
+BACKGROUND_FILE = "/data/images/custom/spaceBackground.png"
+
+
 class GameState(enum.Enum):
     MAIN_MENU = 0,
     GAMEPLAY = 1,
@@ -40,15 +65,72 @@ class GameState(enum.Enum):
 
 class GameMode(enum.Enum):
     ENDLESS = 0,
-    TIMED = 1
+    TIMED = 1,
+    STRESS = 2
+
+
+class Screen(enum.Enum):
+    # Groups of UI labels that are shown together, see 'visibleScreens'
+    MENU = 0,
+    HUD = 1,
+    TIMER = 2,
+    PAUSE = 3,
+    WIN = 4,
+    LOSE = 5,
+    STRESS = 6
+
+
+# The score, timer and asteroid counter, which are refreshed by the 'hud' system rather than every frame
+HUD_SCREENS = (Screen.HUD, Screen.TIMER, Screen.STRESS)
+
+# How many times a second each system runs by default, None runs it on every simulation step (see 'initSystems')
+# Lower rates save time under heavy load, at the cost of the system reacting later
+SYSTEM_RATES = {
+    "timers": None,
+    "flash": 20,
+    "player": None,
+    "spin": None,
+    "asteroids": None,
+    "projectiles": None,
+    "alien": None,
+    "alien_ai": 15,
+    "hud": 4,
+}
+
+# The steps the frame governor ('--no-governor' turns it off) sheds work in when frames take too long, each one
+# cutting back further than the last: fewer spin and flash updates, slower HUD text, fewer asteroids splitting at
+# once and no background
+QUALITY_LEVELS = (
+    QualityLevel("full"),
+    QualityLevel("reduced", {"spin": 30, "flash": 10, "hud": 2}),
+    QualityLevel("low", {"spin": 15, "flash": 10, "hud": 1}, max_splits=8, decorations=False),
+    QualityLevel("minimal", {"spin": 5, "flash": 5, "hud": 1}, max_splits=2, decorations=False),
+)
+
+# Rapid-fire mode ('--rapid-fire'): holding space fires this many shots a second, fanned out across the spread
+# (in degrees), from a pool big enough to keep all of them in the air
+RAPID_FIRE_RATE = 300
+RAPID_FIRE_SPREAD = 30.0
+RAPID_FIRE_PROJECTILES = 512
+
+# Stress mode ('Too Many Asteroids' taken literally): an endless game with this many asteroids in every wave,
+# drawn with the level of detail from asteroid_lod.py
+STRESS_ASTEROID_COUNT = 10000
+
+
+def formatTime(seconds: int) -> str:
+    return "Time: {}:{:02d}".format(*divmod(seconds, 60))
 
 
 class MyASGEGame(pyasge.ASGEGame):
     # The main gameplay class
 
-    def __init__(self, settings: pyasge.GameSettings):
+    def __init__(self, settings: pyasge.GameSettings, seed: int = None):
         # Initialises the whole game
         # This includes the game settings, and global shared data
+        # Passing the same 'seed' (and the same key presses, see replay.py) always plays out the same game
+        # Only the main menu is built here, every other screen is built the first time it's shown
+        STARTUP.mark("imports")
 
         pyasge.ASGEGame.__init__(self, settings)
         self.renderer.setClearColour(pyasge.COLOURS.BLACK)
@@ -60,6 +142,33 @@ class MyASGEGame(pyasge.ASGEGame):
         self.data.renderer = self.renderer
         self.data.game_res = [settings.window_width, settings.window_height]
 
+        # All gameplay randomness comes from this generator, so a session can be replayed from its seed
+        self.data.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.data.rng = random.Random(self.data.seed)
+
+        STARTUP.mark("window")
+
+        # Every texture is loaded once here, and shared by all the sprites that use it
+        # Sprites packed by atlas_packer.py all share the atlas texture, the rest are loaded from their own files
+        self.data.textures = TEXTURES
+        self.data.textures.setRenderer(self.renderer)
+        self.data.textures.loadAtlas()
+
+        # Collision hulls come from the textures' alpha channels, and are only worked out once per texture
+        self.data.masks = MASKS
+
+        # Background threads read the files and build any missing collision hulls,
+        # while this thread creates the textures (which has to happen on the thread that owns the renderer)
+        loader = AssetLoader()
+        loader.prefetch(self.data.textures.sourceFiles(PRELOAD_FILES) + [GAME_FONT])
+        for path in ATLAS_FILES:
+            loader.submit(self.data.masks.get, path)
+
+        self.data.textures.preload([path for path in PRELOAD_FILES if path != BACKGROUND_FILE])
+        STARTUP.mark("textures")
+        loader.shutdown()
+        STARTUP.mark("collision hulls")
+
         # register the key and mouse click handlers for this class
         self.key_id = self.data.inputs.addCallback(pyasge.EventType.E_KEY, self.keyHandler)
         self.mouse_id = self.data.inputs.addCallback(pyasge.EventType.E_MOUSE_CLICK, self.clickHandler)
@@ -69,51 +178,94 @@ class MyASGEGame(pyasge.ASGEGame):
         # -----------
         self.current_game_state = GameState.MAIN_MENU
         self.current_game_mode = GameMode.ENDLESS
+        # Whether the last round ended because the time ran out rather than the player dying,
+        # set whenever a round ends since the round is restarted straight away when the time runs out
+        self.time_over = False
 
         # Initialising player ship
         self.player = GameObject.Ship()
         self.initPlayer()
 
         # Initialising the asteroids
-        self.asteroids = []
         self.asteroid_max_count = 3
 
         self.asteroid_spawn_margin = 250
         self.asteroid_split_chunks = 2
         self.asteroid_split_rescale = 0.35
 
+        self.asteroids = AsteroidField(["/data/images/kenney_simple-space/PNG/Retina/meteor_detailedLarge.png",
+                                        "/data/images/kenney_simple-space/PNG/Retina/meteor_large.png",
+                                        "/data/images/kenney_simple-space/PNG/Retina/meteor_squareDetailedLarge.png",
+                                        "/data/images/kenney_simple-space/PNG/Retina/meteor_squareLarge.png"],
+                                       self.data.textures, self.asteroidPoolCapacity(), self.data.rng,
+                                       self.data.masks)
+
         for i in range(self.asteroid_max_count):
-            self.asteroids.append(GameObject.Asteroid())
-            self.initAsteroid(self.asteroids[i])
+            self.initAsteroid(self.asteroids.acquire())
+
+        # Stress mode swaps in a much bigger wave and draws it with level of detail, see 'applyGameMode'
+        self.stress_asteroid_count = STRESS_ASTEROID_COUNT
+        self.normal_asteroid_count = self.asteroid_max_count
+        self.asteroid_lod = AsteroidLOD(self.data.textures, self.asteroids.texture_files)
+
+        # Collision grid for the asteroids, rebuilt every tick once they have moved
+        self.broadphase = SpatialHash()
 
         # Initialising the player's projectiles
-        self.projectiles = []
         self.max_projectiles = 3
+        self.projectiles = ProjectilePool("data/images/kenney_simple-space/PNG/Retina/star_small.png",
+                                          self.data.textures, self.max_projectiles, self.data.masks)
+
+        # Rapid fire keeps shooting while space is held, see 'setRapidFire'
+        self.rapid_fire = False
+        self.fire_held = False
+        self.fire_timer = 0.0
+
+        # Initialising the aliens and their projectiles
+        self.alien_count = 1
 
-        for i in range(self.max_projectiles):
-            self.projectiles.append(GameObject.Projectile())
-            self.initProjectile(self.projectiles[i])
+        self.enemies = EnemyManager("data/images/kenney_simple-space/PNG/Retina/enemy_E.png",
+                                    "data/images/kenney_simple-space/PNG/Retina/star_tiny.png",
+                                    self.data.textures, self.data.game_res, self.alien_count, self.data.rng,
+                                    self.data.masks)
 
-        # Initialising the alien and its projectiles
-        self.alien = GameObject.Alien()
-        self.initAlien()
+        # The screen wraps around like a torus, everything that crosses an edge is drawn again on the other side
+        self.bounds = WorldBounds(*self.data.game_res)
+        self.player_ghosts = GhostSprites(self.data.textures, "data/images/kenney_simple-space/PNG/Retina/ship_G.png")
 
-        self.alien_projectile = GameObject.AlienProjectile()
-        self.initAlienProjectile()
+        # Keeps any collision hulls that had to be built from scratch for next time
+        self.data.masks.save()
+        STARTUP.mark("game objects")
 
         self.pause_option = 0
         self.data.time = self.data.max_time
 
+        # Fixed-rate simulation, see 'update'
+        self.sim_timestep = 1 / self.data.sim_rate
+        self.max_steps_per_frame = 8
+        self.accumulator = 0.0
+        self.render_alpha = 1.0
+        self.interpolated = []
+
+        # Number of simulation steps so far, recorded key presses are tagged with it (see replay.py)
+        self.sim_tick = 0
+        self.recorder = None
+        self.replay_player = None
+
         # -----------
         # -- UI objects --
         # -----------
-        self.background = pyasge.Sprite()
-        self.initBackground()
+        self.background = None
+        self.render_queue = RenderQueue(self.data.game_res)
+
+        # Every piece of UI text is a label, which is only rebuilt when the value it shows changes
+        self.ui = UILayer()
 
         # Main menu UI
         self.menu_title = None
         self.menu_endless_mode = None
         self.menu_timed_mode = None
+        self.menu_stress_mode = None
         self.menu_retry = None
         self.menu_back_to_title = None
         self.menu_quit = None
@@ -121,15 +273,14 @@ class MyASGEGame(pyasge.ASGEGame):
         self.initMenu()
 
         # Gameplay screen UI
+        # Labels for the other screens only make their text and load their fonts once they are shown
         self.scoreboard = None
-        self.scoreboard_x_pos = 0
         self.initScoreboard()
         self.timer = None
         self.initTimer()
+        self.asteroid_counter = None
+        self.initAsteroidCounter()
         self.health_icons = []
-        for i in range(self.player.health):
-            self.health_icons.append(GameObject.GameObject())
-            self.initHealthIcon(self.health_icons[i], i)
 
         # Pause screen UI
         self.pause_text = None
@@ -140,12 +291,37 @@ class MyASGEGame(pyasge.ASGEGame):
         # Lose screen UI
         self.lose_text = None
         self.lose_score_text = None
-        self.initLoseScreen(True)
+        self.initLoseScreen()
 
         # Win screen UI
         self.win_text = None
         self.win_score_text = None
         self.initWinScreen()
+        self.ui.refresh([Screen.MENU])
+
+        # Frame timing, off unless turned on with F3 or the '--profile' flag
+        self.profiler = FrameProfiler()
+        self.profiler_overlay = None
+        self.show_profiler_overlay = False
+
+        # Gameplay systems, each running at its own rate
+        self.scheduler = Scheduler()
+        self.initSystems()
+
+        # Work shed to keep frames within the frame limit's budget, off unless turned on by main()
+        # It changes how a game plays out, so it has to stay off for replays
+        self.governor = FrameGovernor(QUALITY_LEVELS, self.applyQuality, 1 / (settings.fps_limit or 60))
+        self.splits_left = None
+        STARTUP.mark("main menu")
+        self.first_frame = True
+
+    def addLabel(self, screens, font_size, value, x_pos, y_pos, colour=pyasge.COLOURS.WHITE, formatter=str,
+                 align=ALIGN_LEFT) -> Label:
+        # Makes a label and adds it to the given screens, its text is filled in on the next UI refresh
+        def makeText():
+            return pyasge.Text(self.data.loadFont(GAME_FONT, font_size))
+
+        return self.ui.add(screens, Label(makeText, value, x_pos, y_pos, colour, formatter, align))
 
     def setUpText(self, text_object, text_string, x_pos, y_pos, colour=pyasge.COLOURS.WHITE):
         text_object.string = text_string
@@ -158,114 +334,129 @@ class MyASGEGame(pyasge.ASGEGame):
     # -----------
 
     def initBackground(self) -> bool:
-        if self.background.loadTexture("/data/images/custom/spaceBackground.png"):
+        self.background = pyasge.Sprite()
+        if self.data.textures.attach(self.background, BACKGROUND_FILE):
             self.background.z_order = -15
             return True
 
     def initMenu(self) -> bool:
         # Initialising the title text
-        self.data.fonts["MainFont"] = self.data.renderer.loadFont("/data/fonts/KGHAPPY.ttf", 80)
-        self.menu_title = pyasge.Text(self.data.fonts["MainFont"])
-        self.setUpText(self.menu_title, "Too Many Asteroids", 310, 200, pyasge.COLOURS.CADETBLUE)
-
-        self.data.fonts["SubFont"] = self.data.renderer.loadFont("/data/fonts/KGHAPPY.ttf", 48)
-        self.menu_endless_mode = pyasge.Text(self.data.fonts["SubFont"])
-        self.menu_timed_mode = pyasge.Text(self.data.fonts["SubFont"])
-        self.menu_retry = pyasge.Text(self.data.fonts["SubFont"])
-        self.menu_back_to_title = pyasge.Text(self.data.fonts["SubFont"])
-        self.menu_quit = pyasge.Text(self.data.fonts["SubFont"])
-
-        self.setUpText(self.menu_endless_mode, "Endless Mode", 250, 500)
-        self.setUpText(self.menu_timed_mode, "Timed Mode", 1000, 500)
-        self.setUpText(self.menu_retry, "Retry", 250, 600)
-        self.setUpText(self.menu_back_to_title, "Back to Title", 1000, 600)
-        self.setUpText(self.menu_quit, "Quit", 725, 850)
+        self.menu_title = self.addLabel([Screen.MENU], 80, "Too Many Asteroids", 310, 200, pyasge.COLOURS.CADETBLUE)
+
+        self.menu_endless_mode = self.addLabel([Screen.MENU], 48, "Endless Mode", 250, 500)
+        self.menu_timed_mode = self.addLabel([Screen.MENU], 48, "Timed Mode", 1000, 500)
+        self.menu_stress_mode = self.addLabel([Screen.MENU], 48, "Stress Mode", 620, 680)
+        self.menu_retry = self.addLabel([Screen.WIN, Screen.LOSE], 48, "Retry", 250, 600)
+        self.menu_back_to_title = self.addLabel([Screen.WIN, Screen.LOSE], 48, "Back to Title", 1000, 600)
+        self.menu_quit = self.addLabel([Screen.MENU], 48, "Quit", 725, 850)
 
         return True
 
     def initScoreboard(self) -> bool:
-        # Initialising the text that will show the score
-        self.data.fonts["ScoreFont"] = self.data.renderer.loadFont("/data/fonts/KGHAPPY.ttf", 60)
-        self.scoreboard = pyasge.Text(self.data.fonts["ScoreFont"])
-        self.scoreboard_x_pos = 1510
-        self.setUpText(self.scoreboard, "0", self.scoreboard_x_pos, 110)
+        # Initialising the text that will show the score, right-aligned so it grows to the left
+        self.scoreboard = self.addLabel([Screen.HUD], 60, 0, 1510, 110, align=ALIGN_RIGHT)
 
         return True
 
     def initTimer(self) -> bool:
-        # Initialising the timer display text
-        self.data.fonts["TimerFont"] = self.data.renderer.loadFont("/data/fonts/KGHAPPY.ttf", 40)
-        self.timer = pyasge.Text(self.data.fonts["TimerFont"])
-        self.setUpText(self.timer, "Time: 0:00", 70, 90)
+        # Initialising the timer display text, which only changes once per displayed second
+        self.timer = self.addLabel([Screen.TIMER], 40, 0, 70, 90, formatter=formatTime)
 
         return True
 
-    def initPauseScreen(self) -> bool:
-        self.data.fonts["PauseText"] = self.data.renderer.loadFont("/data/fonts/KGHAPPY.ttf", 60)
-        self.data.fonts["PauseButtonText"] = self.data.renderer.loadFont("/data/fonts/KGHAPPY.ttf", 45)
+    def initAsteroidCounter(self) -> bool:
+        # How many asteroids are left in stress mode, shown where the timer would be
+        self.asteroid_counter = self.addLabel([Screen.STRESS], 40, 0, 70, 90, formatter="Asteroids: {}".format)
 
-        self.pause_text = pyasge.Text(self.data.fonts["PauseText"])
-        self.pause_continue_text = pyasge.Text(self.data.fonts["PauseButtonText"])
-        self.pause_quit_text = pyasge.Text(self.data.fonts["PauseButtonText"])
+        return True
 
-        self.setUpText(self.pause_text, "Game Paused", 550, 240)
-        self.setUpText(self.pause_continue_text, "Continue", 680, 500)
-        self.setUpText(self.pause_quit_text, "Back to Title", 630, 580, pyasge.COLOURS.DARKGREY)
+    def initPauseScreen(self) -> bool:
+        self.pause_text = self.addLabel([Screen.PAUSE], 60, "Game Paused", 550, 240)
+        self.pause_continue_text = self.addLabel([Screen.PAUSE], 45, "Continue", 680, 500)
+        self.pause_quit_text = self.addLabel([Screen.PAUSE], 45, "Back to Title", 630, 580, pyasge.COLOURS.DARKGREY)
 
         return True
 
-    def initLoseScreen(self, is_time_over) -> bool:
+    def highlightPauseOption(self) -> None:
+        self.pause_continue_text.setColour(pyasge.COLOURS.WHITE if self.pause_option == 0 else pyasge.COLOURS.DARKGREY)
+        self.pause_quit_text.setColour(pyasge.COLOURS.WHITE if self.pause_option == 1 else pyasge.COLOURS.DARKGREY)
+
+    def initLoseScreen(self) -> bool:
         # Initialising the game-over screen text when you die
-        self.data.fonts["LoseText"] = self.data.renderer.loadFont("/data/fonts/KGHAPPY.ttf", 46)
-        self.lose_text = pyasge.Text(self.data.fonts["LoseText"])
-        self.setUpText(self.lose_text,
-                       ("Game Over! You have run out of health.", "Game Over! You have run out of time.")[is_time_over],
-                       250, 380, pyasge.COLOURS.RED)
-
-        self.data.fonts["ScoreText"] = self.data.renderer.loadFont("/data/fonts/KGHAPPY.ttf", 46)
-        self.lose_score_text = pyasge.Text(self.data.fonts["ScoreText"])
-        self.setUpText(self.lose_score_text,
-                       "Your final score is " + str(self.data.score) + "!",
-                       500, 460)
+        # The labels are only made once, 'showLoseScreen' gives them their values at the end of a game
+        self.lose_text = self.addLabel([Screen.LOSE], 46, True, 250, 380, pyasge.COLOURS.RED,
+                                       lambda is_time_over: ("Game Over! You have run out of health.",
+                                                             "Game Over! You have run out of time.")[is_time_over])
+        self.lose_score_text = self.addLabel([Screen.LOSE], 46, 0, 500, 460,
+                                             formatter="Your final score is {}!".format)
 
         return True
 
+    def showLoseScreen(self, is_time_over) -> None:
+        self.time_over = is_time_over
+        self.lose_text.set(is_time_over)
+        self.lose_score_text.set(self.data.score)
+
     def initWinScreen(self) -> bool:
         # Initialising the game-over screen text when you win
-        self.data.fonts["WinText"] = self.data.renderer.loadFont("/data/fonts/KGHAPPY.ttf", 60)
-        self.win_text = pyasge.Text(self.data.fonts["WinText"])
-        self.setUpText(self.win_text, "You win!", 645, 300, pyasge.COLOURS.GREEN)
+        self.win_text = self.addLabel([Screen.WIN], 60, "You win!", 645, 300, pyasge.COLOURS.GREEN)
+        self.win_score_text = self.addLabel([Screen.WIN], 46, 0, self.data.game_res[0] / 2, 390,
+                                            formatter="Your final score is {}.".format, align=ALIGN_CENTRE)
+
+        return True
+
+    def showWinScreen(self) -> None:
+        # Rounds are only won when the time runs out
+        self.time_over = True
+        self.win_score_text.set(self.data.score)
 
-        self.data.fonts["ScoreText"] = self.data.renderer.loadFont("/data/fonts/KGHAPPY.ttf", 46)
-        self.win_score_text = pyasge.Text(self.data.fonts["ScoreText"])
-        self.setUpText(self.win_score_text,
-                       "Your final score is " + str(self.data.score) + ".",
-                       455, 390)
-        self.win_score_text.x = (self.data.game_res[0] / 2) - (self.win_score_text.width / 2)
+    def initProfilerOverlay(self) -> bool:
+        # Rolling average and worst time (in ms) of each part of the frame, drawn in the corner of the screen
+        self.profiler_overlay = pyasge.Text(self.data.loadFont(GAME_FONT, 20))
+        self.setUpText(self.profiler_overlay, "", 20, 200, pyasge.COLOURS.YELLOW)
 
         return True
 
+    def initSystems(self) -> None:
+        # Systems run in this order on every simulation step that they are due
+        self.scheduler.add("timers", self.updateTimers, SYSTEM_RATES["timers"])
+        self.scheduler.add("flash", self.updateFlash, SYSTEM_RATES["flash"])
+        self.scheduler.add("player", self.simulatePlayer, SYSTEM_RATES["player"])
+        self.scheduler.add("spin", self.spinAsteroids, SYSTEM_RATES["spin"])
+        self.scheduler.add("asteroids", self.simulateAsteroids, SYSTEM_RATES["asteroids"])
+        self.scheduler.add("projectiles", self.simulateProjectiles, SYSTEM_RATES["projectiles"])
+        self.scheduler.add("alien", self.simulateAlien, SYSTEM_RATES["alien"])
+        self.scheduler.add("alien_ai", self.updateAlienAI, SYSTEM_RATES["alien_ai"])
+        self.scheduler.add("hud", self.updateHud, SYSTEM_RATES["hud"])
+
     def initPlayer(self) -> bool:
         # This code initialises the spaceship code, similar to how the fish were loaded in,
         # and positions it at the centre of the screen
-        if self.player.sprite.loadTexture("data/images/kenney_simple-space/PNG/Retina/ship_G.png"):
+        if self.data.textures.attach(self.player.sprite, "data/images/kenney_simple-space/PNG/Retina/ship_G.png"):
             self.player.sprite.x = (self.data.game_res[0] / 2) - (self.player.sprite.width / 2)
             self.player.sprite.y = (self.data.game_res[1] / 2) - (self.player.sprite.height / 2)
             self.player.sprite.scale = 0.5
 
             # This code will ensure that player ship collisions remain consistent, you can leave it how it is
-            self.player.collisionSprite.loadTexture("data/images/kenney_simple-space/PNG/Retina/ship_G.png")
+            self.data.textures.attach(self.player.collisionSprite,
+                                      "data/images/kenney_simple-space/PNG/Retina/ship_G.png")
             self.player.collisionSprite.x = self.player.sprite.x
             self.player.collisionSprite.y = self.player.sprite.y
             self.player.collisionSprite.scale = self.player.sprite.scale
+            self.player.hull = self.data.masks.get("data/images/kenney_simple-space/PNG/Retina/ship_G.png")
 
             return True
 
         return False
 
+    def initHealthIcons(self) -> None:
+        for i in range(self.player.tuning.health):
+            self.health_icons.append(GameObject.GameObject())
+            self.initHealthIcon(self.health_icons[i], i)
+
     def initHealthIcon(self, health_icon, position) -> bool:
         # Initialising the health display graphics
-        if health_icon.sprite.loadTexture("data/images/kenney_simple-space/PNG/Retina/ship_G.png"):
+        if self.data.textures.attach(health_icon.sprite, "data/images/kenney_simple-space/PNG/Retina/ship_G.png"):
             health_icon.sprite.scale = 0.5
 
             health_icon.sprite.y = 150
@@ -275,83 +466,44 @@ class MyASGEGame(pyasge.ASGEGame):
 
         return False
 
-    def initAsteroid(self, asteroid) -> bool:
-        # Randomised textures for the asteroids
-        self.texture_file = ""
-        texture_index = random.randint(0, 3)
-        match texture_index:
-            case 0:
-                self.texture_file = "/data/images/kenney_simple-space/PNG/Retina/meteor_detailedLarge.png"
-                pass
-            case 1:
-                self.texture_file = "/data/images/kenney_simple-space/PNG/Retina/meteor_large.png"
-                pass
-            case 2:
-                self.texture_file = "/data/images/kenney_simple-space/PNG/Retina/meteor_squareDetailedLarge.png"
-                pass
-            case 3:
-                self.texture_file = "/data/images/kenney_simple-space/PNG/Retina/meteor_squareLarge.png"
-                pass
-            case _:
-                self.texture_file = "/data/images/kenney_simple-space/PNG/Retina/meteor_large.png"
-                pass
-
-        if asteroid.sprite.loadTexture(self.texture_file):
-            asteroid.sprite.z_order = -10
-            asteroid.spinning_sprite.loadTexture(self.texture_file)
-
-            # Set a position for the asteroids, while ensuring it never overlaps with the player's sprite
-            asteroid.sprite.x = self.player.sprite.x
-            while (self.player.sprite.x - self.asteroid_spawn_margin) <= asteroid.sprite.x <= (
-                    self.player.sprite.x + self.asteroid_spawn_margin):
-                asteroid.sprite.x = random.uniform(0, self.data.game_res[0]) + (asteroid.sprite.width / 2)
-
-            asteroid.sprite.y = self.player.sprite.y
-            while (self.player.sprite.y - self.asteroid_spawn_margin) <= asteroid.sprite.y <= (
-                    self.player.sprite.y + self.asteroid_spawn_margin):
-                asteroid.sprite.y = random.uniform(0, self.data.game_res[1]) + (asteroid.sprite.height / 2)
-
-            # Randomised sprite rotation for visual effect
-            asteroid.spinning_sprite.rotation = random.uniform(0.0, 1.0)
-            asteroid.spin = random.uniform(-asteroid.max_spin_speed, asteroid.max_spin_speed)
-
-            # Give the asteroid a randomised direction and size (scale)
-            asteroid.move_direction = [random.uniform(1, -1), random.uniform(1, -1)]
-            asteroid.sprite.scale = random.uniform(asteroid.min_scale, asteroid.max_scale)
-            asteroid.spinning_sprite.scale = asteroid.sprite.scale
-
-            asteroid.Move()
-            return True
-        return False
-
-    def initProjectile(self, projectile) -> bool:
-        if projectile.sprite.loadTexture("data/images/kenney_simple-space/PNG/Retina/star_small.png"):
-            projectile.sprite.opacity = 0
-
-            return True
-
-        return False
-
-    def initAlien(self):
-        if self.alien.sprite.loadTexture("data/images/kenney_simple-space/PNG/Retina/enemy_E.png"):
-            self.alien.sprite.z_order = -10
-
-            self.alien.is_active = False
-            self.alien.ResetTimer()
-
-            self.spawnAlien()
-
-            return True
-
-        return False
-
-    def initAlienProjectile(self) -> bool:
-        if self.alien_projectile.sprite.loadTexture("data/images/kenney_simple-space/PNG/Retina/star_tiny.png"):
-            self.alien_projectile.sprite.opacity = 0
-
-            return True
-
-        return False
+    def asteroidPoolCapacity(self) -> int:
+        # Enough rows for every asteroid in a wave to be broken all the way down to the smallest size
+        return self.asteroid_max_count * sum(self.asteroid_split_chunks ** i for i in range(len(STATES)))
+
+    def initAsteroid(self, index: int) -> bool:
+        if index < 0:
+            return False
+
+        # Randomised textures for the asteroids, the sprites themselves are only loaded once it is drawn
+        field = self.asteroids
+        rng = self.data.rng
+        field.setTexture(index, rng.randint(0, len(field.texture_files) - 1))
+
+        # Set a position for the asteroids, while ensuring it never overlaps with the player's sprite
+        x = self.player.sprite.x
+        while (self.player.sprite.x - self.asteroid_spawn_margin) <= x <= (
+                self.player.sprite.x + self.asteroid_spawn_margin):
+            x = rng.uniform(0, self.data.game_res[0]) + (field.width[index] / 2)
+
+        y = self.player.sprite.y
+        while (self.player.sprite.y - self.asteroid_spawn_margin) <= y <= (
+                self.player.sprite.y + self.asteroid_spawn_margin):
+            y = rng.uniform(0, self.data.game_res[1]) + (field.height[index] / 2)
+
+        # Randomised sprite rotation for visual effect
+        field.rotation[index] = rng.uniform(0.0, 1.0)
+        field.spin[index] = rng.uniform(-field.max_spin_speed, field.max_spin_speed)
+
+        # Give the asteroid a randomised direction and size (scale)
+        field.dir_x[index] = rng.uniform(1, -1)
+        field.dir_y[index] = rng.uniform(1, -1)
+        field.setScale(index, rng.uniform(field.min_scale, field.max_scale))
+
+        # Equivalent of the first 'Move' call
+        field.setPosition(index,
+                          x + field.dir_x[index] * field.speed[index],
+                          y + field.dir_y[index] * field.speed[index])
+        return True
 
     # -----------
     # -- Player input processing --
@@ -363,8 +515,17 @@ class MyASGEGame(pyasge.ASGEGame):
     def resetKeys(self):
         self.player.hor_input = 0
         self.player.ver_input = 0
+        self.fire_held = False
 
     def keyHandler(self, event: pyasge.KeyEvent) -> None:
+        # While a replay is playing, the keyboard can only close the game or toggle the frame timing overlay
+        if self.replay_player is not None and not self.replay_player.injecting:
+            if event.key != pyasge.KEYS.KEY_ESCAPE and event.key != pyasge.KEYS.KEY_F3:
+                return
+
+        if self.recorder is not None:
+            self.recorder.record(self.sim_tick, event.key, event.action)
+
         # Act only if a button has been pressed
         if event.action == pyasge.KEYS.KEY_PRESSED:
 
@@ -372,10 +533,18 @@ class MyASGEGame(pyasge.ASGEGame):
             if event.key == pyasge.KEYS.KEY_ESCAPE:
                 exit()
 
+            # Toggles the frame timing overlay, which also starts timing frames if it wasn't already
+            if event.key == pyasge.KEYS.KEY_F3:
+                self.show_profiler_overlay = not self.show_profiler_overlay
+                if self.show_profiler_overlay:
+                    self.profiler.setEnabled(True)
+
             if self.data.is_game_running:
                 # Main gameplay logic for when we are not paused or looking at a menu
                 if event.key == pyasge.KEYS.KEY_SPACE:
                     self.spawnProjectile()
+                    self.fire_held = True
+                    self.fire_timer = 0.0
 
                 # Player turning movement
                 if event.key == pyasge.KEYS.KEY_LEFT:
@@ -394,8 +563,7 @@ class MyASGEGame(pyasge.ASGEGame):
                     if self.current_game_state == GameState.GAMEPLAY:
                         self.resetKeys()
                         self.pause_option = 0
-                        self.pause_continue_text.colour = pyasge.COLOURS.WHITE
-                        self.pause_quit_text.colour = pyasge.COLOURS.DARKGREY
+                        self.highlightPauseOption()
 
                         self.data.is_game_running = False
             else:
@@ -411,12 +579,10 @@ class MyASGEGame(pyasge.ASGEGame):
                 # Pause menu navigation
                 if event.key == pyasge.KEYS.KEY_UP:
                     self.pause_option = 0
-                    self.pause_continue_text.colour = pyasge.COLOURS.WHITE
-                    self.pause_quit_text.colour = pyasge.COLOURS.DARKGREY
+                    self.highlightPauseOption()
                 if event.key == pyasge.KEYS.KEY_DOWN:
                     self.pause_option = 1
-                    self.pause_continue_text.colour = pyasge.COLOURS.DARKGREY
-                    self.pause_quit_text.colour = pyasge.COLOURS.WHITE
+                    self.highlightPauseOption()
 
             pass
 
@@ -424,6 +590,9 @@ class MyASGEGame(pyasge.ASGEGame):
         if event.action == pyasge.KEYS.KEY_RELEASED:
             if self.data.is_game_running:
                 # Check if the player was pausing the game, to eliminate all previous inputs that might've been pressed
+                if event.key == pyasge.KEYS.KEY_SPACE:
+                    self.fire_held = False
+
                 # Player turning movement
                 if event.key == pyasge.KEYS.KEY_LEFT:
                     self.player.hor_input += 1
@@ -443,50 +612,36 @@ class MyASGEGame(pyasge.ASGEGame):
     # -----------
 
     def startGame(self):
+        self.applyGameMode()
         self.player.collisionSprite.x = self.data.game_res[0] / 2 - self.player.sprite.width / 2
         self.player.collisionSprite.y = self.data.game_res[1] / 2 - self.player.sprite.height / 2
         self.current_game_state = GameState.GAMEPLAY
 
-    def breakAsteroid(self, asteroid: GameObject.Asteroid):
-        if asteroid.current_state != GameObject.AsteroidState.SMALL:
-            for i in range(self.asteroid_split_chunks):
-                new_asteroid = GameObject.Asteroid()
-                self.asteroids.append(new_asteroid)
-                self.initAsteroid(new_asteroid)
-
-                # Spawn a new asteroid, and place it on the same position as the previous one
-                new_asteroid.sprite.x = asteroid.sprite.x
-                new_asteroid.spinning_sprite.x = new_asteroid.sprite.x
-                new_asteroid.sprite.y = asteroid.sprite.y
-                new_asteroid.spinning_sprite.y = new_asteroid.sprite.y
-
-                # Set up the asteroid with a randomised size like in 'initAsteroid'
-                new_asteroid.sprite.scale = (asteroid.sprite.scale * self.asteroid_split_rescale) * random.uniform(
-                    new_asteroid.min_scale,
-                    new_asteroid.max_scale)
-                new_asteroid.spinning_sprite.scale = new_asteroid.sprite.scale
-
-                new_asteroid.ResetState(asteroid)
-
-        asteroid.is_destroyed = True
-        pass
-
-    def screenWrap(self, game_object: pyasge.Sprite):
-        # Target object's position is checked every frame
-        # If it exceeds the screen, wrap the position back around
-
-        # TO DO --- REWRITE USING WORLD BOUNDS MAYBE ---
-
-        if game_object.x > self.data.game_res[0] + (game_object.width * game_object.scale):
-            game_object.x = -game_object.width * game_object.scale + 0.1
-        if game_object.x < -game_object.width * game_object.scale:
-            game_object.x = self.data.game_res[0] + (game_object.width * game_object.scale) + 0.1
-
-        if game_object.y > self.data.game_res[1] + (game_object.height * game_object.scale):
-            game_object.y = -game_object.height * game_object.scale + 0.1
-        if game_object.y < -game_object.height * game_object.scale:
-            game_object.y = self.data.game_res[1] + (game_object.height * game_object.scale) + 0.1
-
+    def applyGameMode(self) -> None:
+        # Switches to the stress mode wave and level of detail when stress mode starts, and back when it's over
+        # Other modes keep whatever asteroid count they were given
+        stress = self.current_game_mode == GameMode.STRESS
+        if stress == (self.asteroids.lod is not None):
+            return
+
+        if stress:
+            self.normal_asteroid_count = self.asteroid_max_count
+            self.asteroid_max_count = self.stress_asteroid_count
+            self.asteroids.lod = self.asteroid_lod
+        else:
+            self.asteroid_max_count = self.normal_asteroid_count
+            self.asteroids.lod = None
+
+        self.respawn(False)
+
+    def breakAsteroid(self, index: int):
+        # The pieces are spawned straight from the pool, on the same position as the original asteroid
+        # Past the governor's limit for this step, asteroids are destroyed without splitting
+        if self.splits_left is None or self.splits_left > 0:
+            self.asteroids.split(index, self.asteroid_split_chunks, self.asteroid_split_rescale)
+            if self.splits_left is not None:
+                self.splits_left -= 1
+        self.asteroids.release(index)
         pass
 
     def playerHurt(self, other_object) -> None:
@@ -494,119 +649,63 @@ class MyASGEGame(pyasge.ASGEGame):
             if self.player.current_health > 1:
                 self.player.Hurt(other_object)
             else:
-                self.initLoseScreen(False)
+                self.showLoseScreen(False)
                 self.current_game_state = GameState.LOSE_MENU
 
         pass
 
-    def spawnProjectile(self) -> None:
-        # Find a projectile in the 'projectiles' array which is not being used right now
-        for i in range(self.max_projectiles):
-            if not self.projectiles[i].is_shot:
-                # Set up the new object and ready it for movement
-                new_projectile = self.projectiles[i]
-
-                new_projectile.sprite.opacity = 1
-                new_projectile.sprite.x = self.player.sprite.x
-                new_projectile.sprite.y = self.player.sprite.y
-                new_projectile.move_direction[0] = math.cos(math.radians(self.player.current_angle))
-                new_projectile.move_direction[1] = math.sin(math.radians(self.player.current_angle))
-
-                new_projectile.is_shot = True
-                break
-            else:
-                continue
-
-        pass
-
-    def projectileScreenDelete(self, projectile: GameObject.Projectile()) -> None:
-        # -- UNUSED --
-        # Check if a projectile is off-screen or not
-        # If it exceeds the screen resolution, delete the projectile
-        if projectile.is_shot:
-            if projectile.sprite.x < (0 - projectile.sprite.width) or projectile.sprite.x > (
-                    self.data.game_res[0] + projectile.sprite.width) \
-                    or projectile.sprite.y < (0 - projectile.sprite.height) or projectile.sprite.y > (
-                    self.data.game_res[1] + projectile.sprite.height):
-                projectile.is_shot = False
-                projectile.sprite.opacity = 0
-
-                pass
-        pass
-
-    def spawnAlien(self) -> None:
-        self.alien.is_active = False
-        self.alien.escape_attempted = False
-
-        # Spawns the current alien on the left/right side of the screen before allowing it to move
-        spawn_side = random.randint(0, 1)
-
-        # Configuring spawn position and move direction
-        if spawn_side == 1:
-            self.alien.sprite.x = self.data.game_res[0] + self.alien.sprite.width
-        else:
-            self.alien.sprite.x = -self.alien.sprite.width
-
-        self.alien.sprite.y = random.randint(self.alien.spawn_margin, self.data.game_res[1]
-                                             - self.alien.spawn_margin
-                                             - self.alien.sprite.height)
+    def spawnProjectile(self, angle_offset: float = 0.0) -> None:
+        # Takes a free projectile from the pool (if there is one) and fires it the way the player is facing
+        # The pool never shrinks, so turning rapid fire off is held to the normal limit here
+        if len(self.projectiles) >= self.max_projectiles:
+            return
 
-        self.alien.move_direction[0] = -((spawn_side * 2) - 1)
-        self.alien.move_direction[1] = 0
+        angle = math.radians(self.player.current_angle + angle_offset)
+        self.projectiles.fire(self.player.sprite.x, self.player.sprite.y, math.cos(angle), math.sin(angle))
 
         pass
 
-    def spawnAlienProjectile(self) -> None:
-        self.alien.projectile_timer = self.alien.projectile_timer_time
+    def rapidFire(self, delta_time: float) -> None:
+        # While space is held in rapid-fire mode, shots due this step are fanned out evenly across the spread
+        self.fire_timer += delta_time * RAPID_FIRE_RATE
+        shots = int(self.fire_timer)
+        self.fire_timer -= shots
+        for i in range(shots):
+            self.spawnProjectile(RAPID_FIRE_SPREAD * ((i + 0.5) / shots - 0.5))
 
-        # Set up the projectile and its position/angle
-        projectile = self.alien_projectile
-
-        projectile.sprite.opacity = 1
-        projectile.sprite.x = self.alien.sprite.x
-        projectile.sprite.y = self.alien.sprite.y
-
-        new_angle = math.degrees(
-            math.atan2(self.player.sprite.y - projectile.sprite.y, self.player.sprite.x - projectile.sprite.x))
-        projectile.move_direction[0] = math.cos(math.radians(new_angle))
-        projectile.move_direction[1] = math.sin(math.radians(new_angle))
-
-        projectile.is_shot = True
-
-        pass
+    def setRapidFire(self, enabled: bool) -> None:
+        self.rapid_fire = enabled
+        self.max_projectiles = RAPID_FIRE_PROJECTILES if enabled else 3
+        self.projectiles.reserve(self.max_projectiles)
 
     def updateScore(self, score):
+        # Several hits in one frame only rebuild the scoreboard once, when the UI is refreshed in 'update'
         self.data.score += score
-        self.scoreboard.string = str(self.data.score)
+        self.scoreboard.set(self.data.score)
 
         pass
 
     def respawn(self, full_restart: bool):
         self.asteroids.clear()
+        self.asteroids.reserve(self.asteroidPoolCapacity())
 
         for i in range(self.asteroid_max_count):
-            self.asteroids.append(GameObject.Asteroid())
-            self.initAsteroid(self.asteroids[i])
+            self.initAsteroid(self.asteroids.acquire())
 
         if full_restart:
-            # Reset player position and speed
-            self.player.opacity = 0
-            self.player.current_health = self.player.health
+            # Reset player health
+            self.player.current_health = self.player.tuning.health
 
             # Remove all on-screen instances of projectiles, aliens, and alien projectiles
-            for i in range(self.max_projectiles):
-                if self.projectiles[i].is_shot:
-                    self.projectiles[i].is_shot = False
-                    self.projectiles[i].sprite.opacity = 0
+            self.projectiles.clear()
 
-            self.spawnAlien()
-            if self.alien_projectile.is_shot:
-                self.alien_projectile.is_shot = False
-                self.alien_projectile.sprite.opacity = 0
+            self.enemies.setCount(self.alien_count)
+            self.enemies.spawn()
+            self.enemies.clearProjectiles()
 
             self.data.time = self.data.max_time
             self.data.score = 0
-            self.scoreboard.string = str(self.data.score)
+            self.scoreboard.set(self.data.score)
         pass
 
     # -----------
@@ -614,183 +713,326 @@ class MyASGEGame(pyasge.ASGEGame):
     # -----------
 
     def update(self, game_time: pyasge.GameTime) -> None:
+        # Gameplay runs in fixed steps of 'sim_timestep', however long the frame took
+        # Whatever time is left over is used to interpolate between the last two steps when rendering
+        self.profiler.begin()
+        self.governor.beginFrame()
+
+        self.accumulator += game_time.frame_time
+        steps = 0
+        while self.accumulator >= self.sim_timestep - 1e-9:
+            if steps == self.max_steps_per_frame:
+                # Too far behind to catch up (e.g. after a hitch), so drop the time rather than spiral
+                self.accumulator = 0.0
+                break
 
-        if self.data.is_game_running:
-            # -- Object movements --
-            # Player movements
-            if self.player.ver_input != 0:
-                if self.player.ver_input == 1:
-                    self.player.Accel()
-                if self.player.ver_input == -1:
-                    self.player.Decel()
-            else:
-                # If the player's speed is close enough to zero, stop applying acceleration/deceleration
-                if not (-self.player.acceleration < self.player.current_speed < self.player.acceleration):
-                    self.player.current_speed -= \
-                        self.player.acceleration * math.copysign(1, self.player.current_speed)
-                else:
-                    self.player.current_speed = 0
-
-            self.player.Move()
-            self.screenWrap(self.player.collisionSprite)
-            self.player.Turn(self.player.hor_input)
-
-            # Check if there are still any asteroids to move around
-            # If not, respawn all of them
-            if all(element.is_destroyed is True for element in self.asteroids):
-                self.respawn(False)
-            else:
-                for asteroid in self.asteroids:
-                    # Asteroid collisions and movements
-                    if self.current_game_state == GameState.GAMEPLAY:
-                        if not asteroid.is_destroyed:
-                            self.screenWrap(asteroid.sprite)
-                            asteroid.Move()
-                            asteroid.Spin()
-
-                            if isInside(self.player.sprite, asteroid.sprite, 0):
-                                self.playerHurt(asteroid)
-                                self.breakAsteroid(asteroid)
-
-                            if isInside(self.player.sprite, self.alien.sprite, 0):
-                                self.playerHurt(asteroid)
-
-                    # Projectile collisions
-                    for projectile in self.projectiles:
-                        if projectile.is_shot:
-
-                            # Menu interactions
-                            if self.current_game_state == GameState.MAIN_MENU:
-                                if isInsideText(projectile.sprite, self.menu_endless_mode):
-                                    projectile.Collision()
-                                    self.current_game_mode = GameMode.ENDLESS
-                                    self.startGame()
-
-                                if isInsideText(projectile.sprite, self.menu_timed_mode):
-                                    projectile.Collision()
-                                    self.current_game_mode = GameMode.TIMED
-                                    self.startGame()
-
-                                if isInsideText(projectile.sprite, self.menu_quit):
-                                    exit(0)
-
-                            elif self.current_game_state == GameState.WIN_MENU \
-                                    or self.current_game_state == GameState.LOSE_MENU:
-                                if isInsideText(projectile.sprite, self.menu_retry):
-                                    projectile.Collision()
-                                    self.current_game_state = GameState.GAMEPLAY
-                                    self.respawn(True)
-
-                                if isInsideText(projectile.sprite, self.menu_back_to_title):
-                                    projectile.Collision()
-                                    self.current_game_state = GameState.MAIN_MENU
-                                    self.respawn(True)
-
-                            # Gameplay interactions
-                            elif self.current_game_state == GameState.GAMEPLAY:
-                                if isInside(asteroid.sprite, projectile.sprite, 0.2):
-                                    if not asteroid.is_destroyed:
-                                        self.updateScore(asteroid.current_score)
-
-                                        projectile.Collision()
-                                        self.breakAsteroid(asteroid)
-
-                                if isInside(self.alien.sprite, projectile.sprite, 0.2):
-                                    self.updateScore(self.alien.death_score)
-
-                                    projectile.Collision()
-                                    self.spawnAlien()
-                                    self.alien.ResetTimer()
-
-            for projectile in self.projectiles:
-                if projectile.is_shot:
-                    projectile.Move(game_time.fixed_timestep)
-                    self.screenWrap(projectile.sprite)
-
-            # Alien logic
-            if self.current_game_state is GameState.GAMEPLAY:
-                if self.alien.is_active is True:
-                    self.alien.Move()
-
-                    # Checking the distance between it and the player object
-                    if not self.alien.escape_attempted:
-                        p = [self.alien.sprite.x, self.alien.sprite.y]
-                        q = [self.player.sprite.x, self.player.sprite.y]
-                        distance = math.dist(p, q)
-                        if distance <= self.alien.player_distance_check:
-                            self.alien.ChangeDirection(self.player)
-
-                    # Respawning checks
-                    if self.alien.sprite.x >= self.data.game_res[0] + (self.alien.sprite.width * 2) \
-                            or self.alien.sprite.x <= (-self.alien.sprite.width * 2):
-                        self.spawnAlien()
-                        self.alien.ResetTimer()
-
-                    if self.alien.sprite.y >= self.data.game_res[1] + (self.alien.sprite.height * 2) \
-                            or self.alien.sprite.y <= (-self.alien.sprite.height * 2):
-                        self.spawnAlien()
-                        self.alien.ResetTimer()
-
-                # Projectile logic
-                if self.alien_projectile.is_shot:
-                    self.alien_projectile.Move(game_time.fixed_timestep)
-                    self.screenWrap(self.alien_projectile.sprite)
-
-                    if isInside(self.player.sprite, self.alien_projectile.sprite, 0.2):
-                        self.alien_projectile.Collision()
-                        self.playerHurt(self.alien_projectile)
-
-            # -- UI updates --
-            self.scoreboard.x = self.scoreboard_x_pos - self.scoreboard.width
+            self.simulate(self.sim_timestep)
+            self.accumulator -= self.sim_timestep
+            steps += 1
+
+        self.render_alpha = min(max(self.accumulator / self.sim_timestep, 0.0), 1.0)
+
+        # -- UI updates --
+        # Menu text only changes on key presses and state changes, so it's brought up to date straight away
+        self.ui.refresh([screen for screen in self.visibleScreens() if screen not in HUD_SCREENS])
+        self.profiler.mark(PHASE_UI)
 
     pass
 
+    def setSimRate(self, sim_rate: float) -> None:
+        self.data.sim_rate = sim_rate
+        self.sim_timestep = 1 / sim_rate
+        self.accumulator = 0.0
+
+    def applyQuality(self, level: QualityLevel) -> None:
+        # Called by the governor whenever it changes level, the split limit and decorations are read as they're used
+        for name in SYSTEM_RATES:
+            self.scheduler.setCap(name, level.rate_caps.get(name))
+
+    def simulate(self, delta_time: float) -> None:
+        # One fixed step of gameplay, every speed is scaled by 'delta_time' so the rate can be changed freely
+        if self.replay_player is not None:
+            # Recorded key presses go in at the start of the step they were made before
+            self.replay_player.inject(self.sim_tick, self.keyHandler)
+            if self.replay_player.isFinished(self.sim_tick):
+                # The replay is over, so control goes back to the player
+                self.replay_player = None
+
+        # Every system runs at its own rate, see 'initSystems'
+        self.splits_left = self.governor.level.max_splits
+        self.savePositions()
+        self.scheduler.tick(delta_time)
+
+        self.sim_tick += 1
+        pass
+
+    def simulatePlayer(self, delta_time: float) -> None:
+        if not self.data.is_game_running:
+            return
+
+        # Player movements
+        if self.player.ver_input != 0:
+            if self.player.ver_input == 1:
+                self.player.Accel(delta_time)
+            if self.player.ver_input == -1:
+                self.player.Decel(delta_time)
+        else:
+            # If the player's speed is close enough to zero, stop applying acceleration/deceleration
+            friction = self.player.tuning.acceleration * delta_time * GameObject.REFERENCE_RATE
+            if not (-friction < self.player.current_speed < friction):
+                self.player.current_speed -= friction * math.copysign(1, self.player.current_speed)
+            else:
+                self.player.current_speed = 0
+
+        self.player.Move(delta_time)
+        self.bounds.wrapSprite(self.player.collisionSprite)
+        self.player.Turn(self.player.hor_input, delta_time)
+
+        if self.rapid_fire and self.fire_held:
+            self.rapidFire(delta_time)
+        self.profiler.mark(PHASE_PLAYER)
+
+    def simulateAsteroids(self, delta_time: float) -> None:
+        if not self.data.is_game_running:
+            return
+
+        # Check if there are still any asteroids to move around
+        # If not, respawn all of them
+        if self.asteroids.allDestroyed():
+            # The projectiles are checked against the grid next, so it has to hold the new asteroids
+            self.respawn(False)
+            self.asteroids.buildBroadphase(self.broadphase)
+        elif self.current_game_state == GameState.GAMEPLAY:
+            # Asteroid collisions and movements, applied to the whole field at once
+            self.asteroids.advance(delta_time)
+            self.asteroids.wrap(self.bounds)
+            self.asteroids.maybeCompact()
+            self.asteroids.buildBroadphase(self.broadphase)
+
+            # Only asteroids in grid cells near the player are given the full 'isInside' test,
+            # and only the ones that pass it have their collision hulls checked
+            # Near an edge, the player is also tested as a ghost on the other side against asteroids straddling it
+            sprite = self.player.sprite
+            player_body = spriteBody(sprite, self.player.hull)
+            for offset_x, offset_y in self.bounds.spriteOffsets(sprite, *self.asteroids.overhang(self.bounds)):
+                candidates = self.broadphase.query(sprite.x + offset_x, sprite.y + offset_y,
+                                                   sprite.width * sprite.scale, sprite.height * sprite.scale)
+                hits = self.asteroids.overlapping(sprite, 0, candidates, offset_x, offset_y)
+                for index in self.asteroids.touching(hits, shiftBody(player_body, offset_x, offset_y)):
+                    self.playerHurt(self.asteroids.syncRow(index))
+                    self.breakAsteroid(index)
+
+            for index in self.enemies.touching(self.enemies.overlapping(self.player.sprite, 0), player_body):
+                self.playerHurt(self.enemies.syncRow(index))
+
+        self.profiler.mark(PHASE_ASTEROIDS)
+
+    def spinAsteroids(self, delta_time: float) -> None:
+        # Only changes how the asteroids look, so the governor can run it less often under load
+        # The collision hulls are rotated with the sprites, so it runs before the asteroids are tested
+        if self.data.is_game_running and self.current_game_state == GameState.GAMEPLAY:
+            self.asteroids.spinAll(delta_time)
+
+        self.profiler.mark(PHASE_ASTEROIDS)
+
+    def simulateProjectiles(self, delta_time: float) -> None:
+        if not self.data.is_game_running:
+            return
+
+        # Menu interactions, only a few projectiles are ever in the air on a menu
+        if self.current_game_state == GameState.MAIN_MENU:
+            for index in self.projectiles.liveIndices().tolist():
+                if not self.projectiles.is_shot[index]:
+                    continue
+
+                projectile = self.projectiles.syncRow(index)
+                if isInsideText(projectile.sprite, self.menu_endless_mode.text):
+                    self.projectiles.release(index)
+                    self.current_game_mode = GameMode.ENDLESS
+                    self.startGame()
+
+                if isInsideText(projectile.sprite, self.menu_timed_mode.text):
+                    self.projectiles.release(index)
+                    self.current_game_mode = GameMode.TIMED
+                    self.startGame()
+
+                if isInsideText(projectile.sprite, self.menu_stress_mode.text):
+                    self.projectiles.release(index)
+                    self.current_game_mode = GameMode.STRESS
+                    self.startGame()
+
+                if isInsideText(projectile.sprite, self.menu_quit.text):
+                    exit(0)
+
+        elif self.current_game_state == GameState.WIN_MENU or self.current_game_state == GameState.LOSE_MENU:
+            for index in self.projectiles.liveIndices().tolist():
+                if not self.projectiles.is_shot[index]:
+                    continue
+
+                projectile = self.projectiles.syncRow(index)
+                if isInsideText(projectile.sprite, self.menu_retry.text):
+                    self.projectiles.release(index)
+                    self.current_game_state = GameState.GAMEPLAY
+                    self.respawn(True)
+
+                if isInsideText(projectile.sprite, self.menu_back_to_title.text):
+                    self.projectiles.release(index)
+                    self.current_game_state = GameState.MAIN_MENU
+                    self.respawn(True)
+
+        # Gameplay interactions, every projectile in the air is tested at once
+        # Only the pairs that touch come back, and each projectile breaks the first asteroid it hit
+        elif self.current_game_state == GameState.GAMEPLAY and len(self.projectiles) > 0:
+            alien_hits = self.projectiles.alienHits(self.enemies, 0.2, delta_time)
+            projectile_hits, asteroid_hits = self.projectiles.asteroidHits(self.asteroids, self.broadphase, 0.2,
+                                                                           delta_time, self.bounds)
+            scored = set()
+            broken = set()
+            for index, asteroid in zip(projectile_hits.tolist(), asteroid_hits.tolist()):
+                # Asteroids broken by an earlier projectile this step are gone, and their rows may already hold
+                # the pieces of another asteroid split since, which these hits were never tested against
+                if index in scored or asteroid in broken or not self.asteroids.alive[asteroid]:
+                    continue
+
+                scored.add(index)
+                broken.add(asteroid)
+                self.updateScore(self.asteroids.score(asteroid))
+                self.projectiles.release(index)
+                self.breakAsteroid(asteroid)
+
+            respawned = set()
+            for index, alien in zip(*(hits.tolist() for hits in alien_hits)):
+                if alien in respawned:
+                    continue
+
+                respawned.add(alien)
+                self.updateScore(self.enemies.alien.death_score)
+                self.projectiles.release(index)
+                self.enemies.respawn([alien])
+
+        self.projectiles.advance(delta_time, self.bounds)
+        self.profiler.mark(PHASE_PROJECTILES)
+
+    def simulateAlien(self, delta_time: float) -> None:
+        if not self.data.is_game_running:
+            return
+
+        # Alien logic, every alien and alien projectile is moved (and respawned or wrapped) at once
+        if self.current_game_state is GameState.GAMEPLAY:
+            self.enemies.advance(delta_time, self.bounds)
+
+            body = spriteBody(self.player.sprite, self.player.hull)
+            for index in self.enemies.projectileHits(self.player.sprite, body, 0.2, self.bounds):
+                self.enemies.releaseProjectile(index)
+                self.playerHurt(self.enemies.syncProjectile(index))
+        self.profiler.mark(PHASE_ALIEN)
+
+    def updateAlienAI(self, delta_time: float) -> None:
+        # Turns each alien away the first time it gets close to the player, checked less often than it moves
+        if not self.data.is_game_running or self.current_game_state is not GameState.GAMEPLAY:
+            return
+
+        self.enemies.steer(self.player.sprite)
+
+        self.profiler.mark(PHASE_ALIEN)
+
+    def updateFlash(self, delta_time: float) -> None:
+        # Flashes the player while they are invincible after getting hurt
+        if self.current_game_state == GameState.GAMEPLAY and self.data.is_game_running:
+            if self.player.current_timer >= 0:
+                self.player.current_flash_timer -= delta_time
+                self.player.InvincibilityFlash()
+
+    def updateHud(self, delta_time: float) -> None:
+        # The score, timer and asteroid counter text, the other screens are refreshed every frame in 'update'
+        if self.current_game_mode == GameMode.STRESS:
+            self.asteroid_counter.set(len(self.asteroids))
+        self.ui.refresh(HUD_SCREENS)
+        self.profiler.mark(PHASE_UI)
+
     def fixed_update(self, game_time: pyasge.GameTime) -> None:
+        # Gameplay runs on its own fixed timestep from 'update', so the engine's fixed tick isn't used
+        pass
+
+    def updateTimers(self, delta_time: float) -> None:
         if self.current_game_state == GameState.GAMEPLAY:
             if self.data.is_game_running:
                 # Gameplay timer when the player gets hurt and temporarily becomes invincible
                 if self.player.current_timer >= 0:
-                    self.player.current_timer -= game_time.fixed_timestep
-                    self.player.current_flash_timer -= game_time.fixed_timestep
-                    self.player.InvincibilityFlash()
-
-                # Timer for alien AI
-                if self.alien.is_timer_active:
-                    if self.alien.spawn_timer >= 0:
-                        self.alien.spawn_timer -= game_time.fixed_timestep
-                    else:
-                        self.alien.is_active = True
-
-                if not self.alien_projectile.is_shot and self.alien.is_active:
-                    if self.alien.projectile_timer >= 0:
-                        self.alien.projectile_timer -= game_time.fixed_timestep
-                    else:
-                        self.spawnAlienProjectile()
+                    self.player.current_timer -= delta_time
+
+                # Spawn and fire timers for every alien, the ones that are ready shoot at the player
+                self.enemies.updateTimers(delta_time, self.player.sprite)
 
                 # UI timer for showing the player how much time they have left
                 if self.current_game_mode == GameMode.TIMED:
-                    self.data.time -= game_time.fixed_timestep
-                    minutes, seconds = divmod(self.data.time, 60)
-                    self.timer.string = "Time: " + str(math.floor(minutes)) + ":" + \
-                                        ("0" if len(str(math.floor(seconds))) == 1 else "") + str(math.floor(seconds))
+                    self.data.time -= delta_time
+                    self.timer.set(math.floor(self.data.time))
 
                     if self.data.time <= 0:
                         # Checking for win conditions
                         if self.data.score >= self.data.max_score:
-                            self.initWinScreen()
+                            self.showWinScreen()
                             self.current_game_state = GameState.WIN_MENU
                         else:
-                            self.initLoseScreen(True)
+                            self.showLoseScreen(True)
                             self.current_game_state = GameState.LOSE_MENU
 
                         self.respawn(True)
 
+        self.profiler.mark(PHASE_TIMERS)
         pass
 
+    def savePositions(self) -> None:
+        # Remembers where everything was at the start of a step, to interpolate from when rendering
+        self.player.SavePosition()
+        self.enemies.savePositions()
+        self.projectiles.savePositions()
+
+    def interpolatePositions(self, alpha: float) -> None:
+        # Moves the sprites part of the way between their last two simulated positions
+        # 'restorePositions' has to be called once they have been drawn
+        self.interpolated = [self.player]
+        for game_object in self.interpolated:
+            game_object.Interpolate(alpha, self.data.game_res)
+
+    def restorePositions(self) -> None:
+        for game_object in self.interpolated:
+            game_object.RestorePosition()
+        self.interpolated = []
+
     # -----------
     # -- Rendering --
     # -----------
 
+    def visibleScreens(self) -> tuple:
+        # The groups of UI labels shown in the current game state
+        match self.current_game_state:
+            case GameState.MAIN_MENU:
+                return Screen.MENU,
+            case GameState.GAMEPLAY:
+                screens = {GameMode.TIMED: (Screen.HUD, Screen.TIMER),
+                           GameMode.STRESS: (Screen.HUD, Screen.STRESS)}.get(self.current_game_mode, (Screen.HUD,))
+                return screens if self.data.is_game_running else screens + (Screen.PAUSE,)
+            case GameState.WIN_MENU:
+                return Screen.WIN,
+            case GameState.LOSE_MENU:
+                return Screen.LOSE,
+
+    def queuePlayerGhosts(self, queue: RenderQueue) -> None:
+        # Draws the ship again on the other side of any edge it is straddling
+        sprite = self.player.sprite
+        offsets = self.bounds.spriteOffsets(sprite)[1:]
+        if not offsets:
+            return
+
+        ghosts = self.player_ghosts.place([sprite.x + offset_x for offset_x, offset_y in offsets],
+                                          [sprite.y + offset_y for offset_x, offset_y in offsets],
+                                          sprite.scale, sprite.rotation)
+        for ghost in ghosts:
+            ghost.opacity = sprite.opacity
+            queue.add(ghost)
+
     def render(self, game_time: pyasge.GameTime) -> None:
         """
         This is the variable time-step function. Use to update
@@ -798,80 +1040,153 @@ class MyASGEGame(pyasge.ASGEGame):
         ``frame_time`` is essential to ensure consistent performance.
         @param game_time: The tick and frame deltas.
         """
+        self.profiler.begin()
+        self.interpolatePositions(self.render_alpha)
 
-        self.data.renderer.render(self.player.sprite)
-        for i in range(self.max_projectiles):
-            self.data.renderer.render(self.projectiles[i].sprite)
-
-        match self.current_game_state:
-            case GameState.MAIN_MENU:
-                self.data.renderer.render(self.menu_title)
-                self.data.renderer.render(self.menu_endless_mode)
-                self.data.renderer.render(self.menu_timed_mode)
-                self.data.renderer.render(self.menu_quit)
-
-                pass
-            case GameState.GAMEPLAY:
-                if self.data.is_game_running:
-                    # Rendering the main gameplay objects
-                    for asteroid in self.asteroids:
-                        if not asteroid.is_destroyed:
-                            self.data.renderer.render(asteroid.spinning_sprite)
-
-                    self.data.renderer.render(self.alien.sprite)
-                    self.data.renderer.render(self.alien_projectile.sprite)
-
-                else:
-                    # Pause screen UI text
-                    self.data.renderer.render(self.pause_text)
-                    self.data.renderer.render(self.pause_continue_text)
-                    self.data.renderer.render(self.pause_quit_text)
-
-                self.data.renderer.render(self.background)
-
-                # Rendering the rest of the UI assets
-                self.data.renderer.render(self.scoreboard)
-                if self.current_game_mode == GameMode.TIMED:
-                    self.data.renderer.render(self.timer)
-                for i in range(self.player.current_health):
-                    self.data.renderer.render(self.health_icons[i].sprite)
-
-                pass
-            case GameState.WIN_MENU:
-                self.data.renderer.render(self.win_text)
-                self.data.renderer.render(self.win_score_text)
-                self.data.renderer.render(self.menu_retry)
-                self.data.renderer.render(self.menu_back_to_title)
-
-                pass
-            case GameState.LOSE_MENU:
-                self.data.renderer.render(self.lose_text)
-                self.data.renderer.render(self.lose_score_text)
-                self.data.renderer.render(self.menu_retry)
-                self.data.renderer.render(self.menu_back_to_title)
+        # Everything is queued up first, then sorted so that draws sharing a texture go one after another
+        queue = self.render_queue
+        queue.add(self.player.sprite)
+        self.queuePlayerGhosts(queue)
+        sprites = self.projectiles.syncVisible(self.bounds, self.render_alpha)
+        if sprites:
+            queue.addBatch(self.projectiles.texture, sprites, sprites[0].z_order)
 
-                pass
+        if self.current_game_state == GameState.GAMEPLAY:
+            if self.data.is_game_running:
+                # Rendering the main gameplay objects
+                # The asteroid field only syncs and returns the asteroids that are on screen
+                # In stress mode, the level of detail is worked out from how far each asteroid is from the player
+                if self.asteroids.lod is not None:
+                    self.asteroids.lod.setFocus(self.player.sprite)
+                for texture, sprites in self.asteroids.syncVisible(self.bounds, self.render_alpha):
+                    queue.addBatch(texture, sprites, sprites[0].z_order)
+
+                for texture, sprites in self.enemies.syncVisible(self.bounds, self.render_alpha):
+                    queue.addBatch(texture, sprites, sprites[0].z_order)
+
+            # The background and health icons are only made once the first game is shown
+            if self.background is None:
+                self.initBackground()
+                self.initHealthIcons()
+
+            if self.governor.level.decorations:
+                queue.add(self.background)
+            for i in range(self.player.current_health):
+                queue.add(self.health_icons[i].sprite)
+
+        # UI text for the current screen, already brought up to date in 'update'
+        for screen in self.visibleScreens():
+            for label in self.ui.labels(screen):
+                queue.add(label.text)
+
+        # The overlay text only needs rebuilding a couple of times a second
+        if self.show_profiler_overlay:
+            if self.profiler_overlay is None:
+                self.initProfilerOverlay()
+            if self.profiler.frames % 30 == 0:
+                draws = "draws {draw_calls}  switches {texture_switches}  culled {culled}".format(**queue.stats())
+                self.profiler_overlay.string = self.profiler.summary() + "\n" + draws + "\n" + \
+                    self.scheduler.summary()
+                lod = self.asteroids.lod
+                if lod is not None:
+                    self.profiler_overlay.string += "\nlod drawn {}  synced {}  impostors {} ({} asteroids)".format(
+                        lod.drawn, lod.synced, lod.impostors, lod.clustered)
+                if self.governor.enabled:
+                    self.profiler_overlay.string += "\nquality " + self.governor.level.name
+            queue.add(self.profiler_overlay)
+
+        queue.flush(self.data.renderer)
+        self.restorePositions()
+
+        self.profiler.mark(PHASE_RENDER)
+        self.profiler.endFrame()
+        self.governor.endFrame()
+
+        if self.first_frame:
+            self.first_frame = False
+            STARTUP.mark("first frame")
+            if STARTUP.enabled:
+                print("Startup time:\n" + STARTUP.report())
 
     pass
 
 
-def main():
+def main(argv: list = None):
     """
     Creates the game and runs it
     For ASGE Games to run they need settings. These settings
     allow changes to the way the game is presented, its
     simulation speed and also its dimensions. For this project
-    the FPS and fixed updates are capped at 60hz and Vsync is
-    set to adaptive.
+    the FPS is capped at 60hz by default and Vsync is set to
+    adaptive. Gameplay is simulated at its own fixed rate
+    ('--sim-rate', 60hz by default) independently of the FPS.
+    Passing '--profile frames.csv' (or .json) times every frame
+    and writes the timings out when the game closes.
+    '--record PATH' saves the session's seed and key presses to
+    a replay file, which '--replay PATH' plays back.
+    '--system-rate alien_ai=10' changes how often a system runs,
+    '--startup-times' prints how long it took to get to the first frame,
+    and '--rapid-fire' keeps shooting for as long as space is held.
+    Unless '--no-governor' is passed (or a replay is recorded or played),
+    work is shed in steps whenever frames start to run over the frame
+    limit's budget, and every change of quality is logged.
     """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profile", metavar="PATH", help="time each frame and save the timings to a CSV/JSON file")
+    parser.add_argument("--sim-rate", type=float, default=60, help="gameplay simulation rate in Hz")
+    parser.add_argument("--fps", type=int, default=60, help="frame rate limit")
+    parser.add_argument("--seed", type=int, help="seed for all gameplay randomness")
+    parser.add_argument("--record", metavar="PATH", help="record the session to a replay file")
+    parser.add_argument("--replay", metavar="PATH", help="play back a replay file")
+    parser.add_argument("--startup-times", action="store_true", help="print how long each part of startup took")
+    parser.add_argument("--system-rate", action="append", type=parseRate, default=[], metavar="SYSTEM=HZ",
+                        help="run a system (" + ", ".join(SYSTEM_RATES) + ") at a different rate, 0 for every step")
+    parser.add_argument("--rapid-fire", action="store_true", help="hold space to fire hundreds of projectiles")
+    parser.add_argument("--no-governor", action="store_true", help="never shed work to keep up the frame rate")
+    args = parser.parse_args(argv)
+
+    for name, rate in args.system_rate:
+        if name not in SYSTEM_RATES:
+            parser.error("unknown system " + name + ", expected one of " + ", ".join(SYSTEM_RATES))
+    if args.system_rate and (args.record or args.replay):
+        # Replays only store the seed and key presses, so they rely on every system running at its default rate
+        parser.error("--system-rate changes how a game plays out, so it can't be used with --record or --replay")
+    if args.rapid_fire and (args.record or args.replay):
+        parser.error("--rapid-fire changes how a game plays out, so it can't be used with --record or --replay")
+
+    STARTUP.enabled = args.startup_times
+    logging.basicConfig(level=logging.INFO, format="%(name)s: %(message)s")
+    replay = Replay.load(args.replay) if args.replay else None
+
     settings = pyasge.GameSettings()
-    settings.window_width = 1600
-    settings.window_height = 900
+    settings.window_width = replay.game_res[0] if replay else 1600
+    settings.window_height = replay.game_res[1] if replay else 900
     settings.fixed_ts = 60
-    settings.fps_limit = 60
+    settings.fps_limit = args.fps
     settings.window_mode = pyasge.WindowMode.WINDOWED
     settings.vsync = pyasge.Vsync.ADAPTIVE
-    game = MyASGEGame(settings)
+
+    if replay:
+        game = MyASGEGame(settings, replay.seed)
+        game.setSimRate(replay.sim_rate)
+        game.replay_player = ReplayPlayer(replay)
+    else:
+        game = MyASGEGame(settings, args.seed)
+        game.setSimRate(args.sim_rate)
+
+    game.scheduler.setRates(dict(args.system_rate))
+    game.setRapidFire(args.rapid_fire)
+    # The governor reacts to how long frames take on this machine, so a recorded game wouldn't play back the same
+    game.governor.setEnabled(not (args.no_governor or args.record or args.replay))
+
+    if args.record:
+        game.recorder = ReplayRecorder(game.data.seed, game.data.sim_rate, game.data.game_res)
+        atexit.register(lambda: game.recorder.save(args.record, game.sim_tick))
+
+    if args.profile:
+        game.profiler.setEnabled(True)
+        atexit.register(game.profiler.dump, args.profile)
+
     game.run()
 
 
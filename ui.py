@@ -0,0 +1,98 @@
+import pyasge
+
+# How a label's text is placed relative to its anchor's x position
+ALIGN_LEFT = 0
+ALIGN_RIGHT = 1
+ALIGN_CENTRE = 2
+
+
+class Label:
+    """ A pyasge.Text that is only rebuilt when the value it shows changes
+
+    A label holds a value rather than a string, and 'formatter' turns the
+    value into the text on screen. Setting the same value (or colour)
+    again does nothing, and changes are only applied when the label is
+    refreshed, so a value that changes several times in a frame is only
+    formatted and laid out once. The pyasge.Text itself (and its font) is
+    only made by 'make_text' the first time the label is refreshed or its
+    text is asked for, so screens nobody has opened yet cost nothing.
+    """
+
+    def __init__(self, make_text, value, x_pos: float, y_pos: float, colour=pyasge.COLOURS.WHITE,
+                 formatter=str, align: int = ALIGN_LEFT) -> None:
+        self.make_text = make_text
+        self.text_object = None
+        self.anchor_x = x_pos
+        self.anchor_y = y_pos
+        self.align = align
+        self.formatter = formatter
+        self.value = value
+        self.colour = colour
+        self.dirty = True
+
+    def set(self, value) -> None:
+        if value != self.value:
+            self.value = value
+            self.dirty = True
+
+    def setColour(self, colour) -> None:
+        if colour != self.colour:
+            self.colour = colour
+            self.dirty = True
+
+    @property
+    def text(self) -> pyasge.Text:
+        if self.text_object is None:
+            self.refresh()
+
+        return self.text_object
+
+    def refresh(self) -> bool:
+        # Rebuilds the string and lines the text up with its anchor, returns whether anything had changed
+        if self.text_object is None:
+            self.text_object = self.make_text()
+            self.text_object.y = self.anchor_y
+            self.dirty = True
+
+        if not self.dirty:
+            return False
+
+        text = self.text_object
+        text.string = self.formatter(self.value)
+        text.colour = self.colour
+        if self.align == ALIGN_RIGHT:
+            text.x = self.anchor_x - text.width
+        elif self.align == ALIGN_CENTRE:
+            text.x = self.anchor_x - text.width / 2
+        else:
+            text.x = self.anchor_x
+
+        self.dirty = False
+        return True
+
+
+class UILayer:
+    # Keeps every label, grouped by the screens they are shown on (a label can be on more than one)
+
+    def __init__(self) -> None:
+        self.screens = {}
+        self.refreshes = 0
+
+    def add(self, screens, label: Label) -> Label:
+        for screen in screens:
+            self.screens.setdefault(screen, []).append(label)
+
+        return label
+
+    def labels(self, screen) -> list:
+        return self.screens.get(screen, [])
+
+    def refresh(self, screens) -> None:
+        # Only the screens being shown are brought up to date, labels elsewhere stay dirty until they are shown
+        for screen in screens:
+            for label in self.labels(screen):
+                if label.refresh():
+                    self.refreshes += 1
+
+    def refreshAll(self) -> None:
+        self.refresh(self.screens)
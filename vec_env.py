@@ -0,0 +1,806 @@
+import argparse
+import time
+
+import numpy as np
+
+import headless_pyasge
+
+# The tuning values are read from the game's own classes, which need pyasge to import
+headless_pyasge.install()
+
+import GameObject
+from collision_mask import MASKS, bodiesTouch, sweptBoxes
+from gamedata import GameData
+from texture_cache import KENNEY_DIR
+
+ASTEROID_FILES = [KENNEY_DIR + "meteor_detailedLarge.png",
+                  KENNEY_DIR + "meteor_large.png",
+                  KENNEY_DIR + "meteor_squareDetailedLarge.png",
+                  KENNEY_DIR + "meteor_squareLarge.png"]
+
+STATE_LARGE = 0
+STATE_MEDIUM = 1
+STATE_SMALL = 2
+
+# Actions are every combination of turning (left/none/right), thrust (back/none/forward) and firing
+TURN_CHOICES = 3
+THRUST_CHOICES = 3
+FIRE_CHOICES = 2
+NUM_ACTIONS = TURN_CHOICES * THRUST_CHOICES * FIRE_CHOICES
+
+
+def decodeActions(actions: np.ndarray):
+    # Splits action numbers into turn (-1/0/1), thrust (-1/0/1) and fire (True/False)
+    actions = np.asarray(actions, dtype=np.int64)
+    turn = actions % TURN_CHOICES - 1
+    thrust = (actions // TURN_CHOICES) % THRUST_CHOICES - 1
+    fire = actions // (TURN_CHOICES * THRUST_CHOICES) == 1
+    return turn, thrust, fire
+
+
+def encodeAction(turn: int, thrust: int, fire: bool) -> int:
+    return (turn + 1) + (thrust + 1) * TURN_CHOICES + int(fire) * TURN_CHOICES * THRUST_CHOICES
+
+
+def isInside(x_1, y_1, width_1, height_1, x_2, y_2, width_2, height_2, margin: float):
+    # Broadcasting version of tutorial_game.isInside, widths and heights are already scaled
+    collision_x = (x_1 + width_1 - margin >= x_2 + margin) & (x_2 + width_2 - margin >= x_1 + margin)
+    collision_y = (y_1 + height_1 - margin >= y_2 + margin) & (y_2 + height_2 - margin >= y_1 + margin)
+    return collision_x & collision_y
+
+
+def wrap(position: np.ndarray, limit: float) -> np.ndarray:
+    # Broadcasting version of WorldBounds.wrap along one axis
+    return np.mod(position, limit)
+
+
+class VecAsteroidsEnv:
+    """ N independent games of Asteroids stepped in lockstep
+
+    Every piece of game state (the ship, each game's asteroid pool, the
+    projectiles, the alien and its projectile) is stored as one NumPy
+    array with a row per game, so a step costs the same handful of array
+    operations whether there are ten games or ten thousand. The rules
+    follow MyASGEGame.simulate in endless mode (or timed mode with
+    'timed=True'), starting straight in gameplay with no menus, including
+    the swept projectile tests and the collision hull checks after every
+    bounding box hit. It plays like the game rather than replaying it:
+    there is one alien with one projectile, nothing collides across the
+    screen edges (the game's ghost copies), and random numbers come from
+    its own generator, so the same seed doesn't give the same game as
+    MyASGEGame. Purely visual state like the invincibility flash is left
+    out.
+
+    step() takes one action per game (see decodeActions) and returns the
+    observations, the score gained that step as the reward, and whether
+    each game ended. Games that end are reset straight away, and their
+    final score is reported in the info dictionary.
+    """
+
+    def __init__(self, num_envs: int, seed: int = None, sim_rate: float = 60, game_res=(1600, 900),
+                 timed: bool = False, asteroid_count: int = 3, asteroid_split_chunks: int = 2,
+                 asteroid_split_rescale: float = 0.35, asteroid_spawn_margin: float = 250,
+                 max_projectiles: int = 3, observed_asteroids: int = 8, alien_ai_rate: float = 15) -> None:
+        self.num_envs = num_envs
+        self.rng = np.random.default_rng(seed)
+        self.delta_time = 1 / sim_rate
+        self.game_res = list(game_res)
+        self.timed = timed
+
+        self.asteroid_count = asteroid_count
+        self.split_chunks = asteroid_split_chunks
+        self.split_rescale = asteroid_split_rescale
+        self.spawn_margin = asteroid_spawn_margin
+        self.max_projectiles = max_projectiles
+        self.observed_asteroids = observed_asteroids
+
+        # The alien only looks for the player this many times a second, like the game's 'alien_ai' system
+        self.alien_ai_rate = alien_ai_rate
+        self.alien_ai_elapsed = 0.0
+
+        # Same pool size as MyASGEGame.asteroidPoolCapacity
+        self.capacity = asteroid_count * sum(asteroid_split_chunks ** i for i in range(3))
+
+        # -----------
+        # -- Tuning values, taken from the game's classes --
+        # -----------
+        data = GameData()
+        self.max_score = data.max_score
+        self.max_time = data.max_time
+
+        self.ship = GameObject.Ship()
+        self.asteroid = GameObject.Asteroid()
+        self.projectile = GameObject.Projectile()
+        self.alien = GameObject.Alien()
+        self.alien_projectile = GameObject.AlienProjectile()
+
+        self.asteroid_scores = np.array([self.asteroid.large_state_score,
+                                         self.asteroid.medium_state_score,
+                                         self.asteroid.small_state_score], dtype=np.int64)
+        self.asteroid_sizes = np.array([headless_pyasge.readImageSize(path) for path in ASTEROID_FILES],
+                                       dtype=np.float64)
+
+        # The player's sprite is drawn at half size, see MyASGEGame.initPlayer
+        ship_width, ship_height = headless_pyasge.readImageSize(KENNEY_DIR + "ship_G.png")
+        self.ship_scale = 0.5
+        self.ship_width = ship_width
+        self.ship_height = ship_height
+        self.ship_size = (ship_width * self.ship_scale, ship_height * self.ship_scale)
+        self.alien_size = headless_pyasge.readImageSize(KENNEY_DIR + "enemy_E.png")
+        self.projectile_size = headless_pyasge.readImageSize(KENNEY_DIR + "star_small.png")
+        self.alien_projectile_size = headless_pyasge.readImageSize(KENNEY_DIR + "star_tiny.png")
+
+        asteroid_hulls = [MASKS.get(path) for path in ASTEROID_FILES]
+        self.asteroid_hulls = np.stack([hull.points for hull in asteroid_hulls])
+        self.asteroid_inner = np.array([hull.inner for hull in asteroid_hulls])
+        self.asteroid_outer = np.array([hull.outer for hull in asteroid_hulls])
+        self.ship_hull = MASKS.get(KENNEY_DIR + "ship_G.png")
+        self.alien_hull = MASKS.get(KENNEY_DIR + "enemy_E.png")
+        self.projectile_hull = MASKS.get(KENNEY_DIR + "star_small.png")
+        self.alien_projectile_hull = MASKS.get(KENNEY_DIR + "star_tiny.png")
+        MASKS.save()
+
+        # -----------
+        # -- Batched game state, one row per game --
+        # -----------
+        n = num_envs
+        self.score = np.zeros(n, dtype=np.int64)
+        self.time = np.zeros(n)
+        self.steps = np.zeros(n, dtype=np.int64)
+
+        # The ship moves its collision sprite, and the sprite used for collisions follows one step behind it
+        # on screen wraps, exactly like Ship.Move and the WorldBounds.wrapSprite call after it
+        self.ship_x = np.zeros(n)
+        self.ship_y = np.zeros(n)
+        self.ship_sprite_x = np.zeros(n)
+        self.ship_sprite_y = np.zeros(n)
+        self.ship_dir_x = np.zeros(n)
+        self.ship_dir_y = np.zeros(n)
+        self.ship_speed = np.zeros(n)
+        self.ship_angle = np.zeros(n)
+        self.ship_health = np.zeros(n, dtype=np.int64)
+        self.ship_timer = np.zeros(n)
+        self.ship_rotation = np.zeros(n)
+        self.was_firing = np.zeros(n, dtype=bool)
+
+        shape = (n, self.capacity)
+        self.asteroid_x = np.zeros(shape)
+        self.asteroid_y = np.zeros(shape)
+        self.asteroid_dir_x = np.zeros(shape)
+        self.asteroid_dir_y = np.zeros(shape)
+        self.asteroid_width = np.zeros(shape)
+        self.asteroid_height = np.zeros(shape)
+        self.asteroid_scale = np.zeros(shape)
+        self.asteroid_state = np.zeros(shape, dtype=np.int8)
+        self.asteroid_alive = np.zeros(shape, dtype=bool)
+        self.asteroid_texture = np.zeros(shape, dtype=np.int8)
+        self.asteroid_rotation = np.zeros(shape)
+        self.asteroid_spin = np.zeros(shape)
+
+        shape = (n, max_projectiles)
+        self.projectile_x = np.zeros(shape)
+        self.projectile_y = np.zeros(shape)
+        self.projectile_dir_x = np.zeros(shape)
+        self.projectile_dir_y = np.zeros(shape)
+        self.projectile_life = np.zeros(shape)
+        self.projectile_shot = np.zeros(shape, dtype=bool)
+
+        # The alien's spawn timer is always running once the game has started, so there is no flag for it
+        self.alien_x = np.zeros(n)
+        self.alien_y = np.zeros(n)
+        self.alien_dir_x = np.zeros(n)
+        self.alien_dir_y = np.zeros(n)
+        self.alien_active = np.zeros(n, dtype=bool)
+        self.alien_escaped = np.zeros(n, dtype=bool)
+        self.alien_spawn_timer = np.zeros(n)
+        self.alien_projectile_timer = np.zeros(n)
+
+        self.alien_projectile_x = np.zeros(n)
+        self.alien_projectile_y = np.zeros(n)
+        self.alien_projectile_dir_x = np.zeros(n)
+        self.alien_projectile_dir_y = np.zeros(n)
+        self.alien_projectile_life = np.zeros(n)
+        self.alien_projectile_shot = np.zeros(n, dtype=bool)
+
+        self.observation_size = 7 + 3 + 3 + max_projectiles * 3 + observed_asteroids * 4
+
+        self.resetEnvs(np.ones(n, dtype=bool))
+
+    # -----------
+    # -- Gym-style interface --
+    # -----------
+
+    def reset(self, seed: int = None) -> np.ndarray:
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+
+        self.resetEnvs(np.ones(self.num_envs, dtype=bool))
+        return self.observe()
+
+    def step(self, actions: np.ndarray):
+        # Runs one simulation step of every game, returns (observations, rewards, dones, info)
+        turn, thrust, fire = decodeActions(actions)
+        dt = self.delta_time
+        step = dt * GameObject.REFERENCE_RATE
+        width, height = self.game_res
+
+        playing = np.ones(self.num_envs, dtype=bool)
+        died = np.zeros(self.num_envs, dtype=bool)
+        score_before = self.score.copy()
+
+        # Space only fires when it is pressed, so holding the fire action down only shoots once
+        self.spawnProjectiles(fire & ~self.was_firing)
+        self.was_firing = fire
+
+        # -- Timers --
+        self.ship_timer = np.where(self.ship_timer >= 0, self.ship_timer - dt, self.ship_timer)
+
+        counting = self.alien_spawn_timer >= 0
+        self.alien_spawn_timer[counting] -= dt
+        self.alien_active |= ~counting
+
+        aiming = ~self.alien_projectile_shot & self.alien_active
+        counting = aiming & (self.alien_projectile_timer >= 0)
+        self.alien_projectile_timer[counting] -= dt
+        self.spawnAlienProjectiles(aiming & ~counting)
+
+        timed_out = np.zeros(self.num_envs, dtype=bool)
+        if self.timed:
+            self.time -= dt
+            timed_out = self.time <= 0
+            playing &= ~timed_out
+
+        # -- Player --
+        forward = thrust == 1
+        backward = thrust == -1
+        accelerate = forward & (self.ship_speed < self.ship.max_speed)
+        decelerate = backward & (self.ship_speed > -self.ship.max_speed)
+        self.ship_speed[accelerate] += self.ship.acceleration * step
+        self.ship_speed[decelerate] -= self.ship.acceleration * step
+
+        steering = thrust != 0
+        radians = np.radians(self.ship_angle[steering])
+        self.ship_dir_x[steering] = np.cos(radians)
+        self.ship_dir_y[steering] = np.sin(radians)
+
+        # If the player's speed is close enough to zero, stop applying acceleration/deceleration
+        friction = self.ship.acceleration * step
+        coasting = ~steering
+        stopping = coasting & (np.abs(self.ship_speed) < friction)
+        slowing = coasting & ~stopping
+        self.ship_speed[slowing] -= friction * np.sign(self.ship_speed[slowing])
+        self.ship_speed[stopping] = 0
+
+        self.ship_x += self.ship_dir_x * self.ship_speed * step
+        self.ship_y += self.ship_dir_y * self.ship_speed * step
+        self.ship_sprite_x[:] = self.ship_x
+        self.ship_rotation = np.radians(self.ship_angle + 90)
+        self.ship_sprite_y[:] = self.ship_y
+        self.ship_x = wrap(self.ship_x, width)
+        self.ship_y = wrap(self.ship_y, height)
+        self.ship_angle += self.ship.turn_speed * turn * step
+
+        # -- Asteroids --
+        # A wave that has been cleared respawns, and nothing else happens to the asteroids that step
+        respawning = playing & ~self.asteroid_alive.any(axis=1)
+        self.spawnWaves(respawning)
+        active = playing & ~respawning
+
+        extent_x = self.asteroid_width * self.asteroid_scale
+        extent_y = self.asteroid_height * self.asteroid_scale
+        moving = self.asteroid_alive & active[:, None]
+        speed = self.asteroid.move_speed * step
+        self.asteroid_x += np.where(moving, self.asteroid_dir_x * speed, 0.0)
+        self.asteroid_y += np.where(moving, self.asteroid_dir_y * speed, 0.0)
+        self.asteroid_x = np.where(moving, wrap(self.asteroid_x, width), self.asteroid_x)
+        self.asteroid_y = np.where(moving, wrap(self.asteroid_y, height), self.asteroid_y)
+        self.asteroid_rotation += np.where(moving, self.asteroid_spin * step, 0.0)
+
+        ship_x = self.ship_sprite_x[:, None]
+        ship_y = self.ship_sprite_y[:, None]
+        hits = moving & isInside(ship_x, ship_y, self.ship_size[0], self.ship_size[1],
+                                 self.asteroid_x, self.asteroid_y, extent_x, extent_y, 0)
+        hits = self.touchingAsteroids(hits, self.shipBody())
+        hit_any = hits.any(axis=1)
+        if hit_any.any():
+            first = hits.argmax(axis=1)
+            rows = np.arange(self.num_envs)
+            died |= self.playerHurt(hit_any, self.asteroid_x[rows, first], self.asteroid_y[rows, first])
+            self.breakAsteroids(hits)
+
+        hit_alien = active & isInside(self.ship_sprite_x, self.ship_sprite_y, self.ship_size[0], self.ship_size[1],
+                                      self.alien_x, self.alien_y, self.alien_size[0], self.alien_size[1], 0)
+        hit_alien = self.touching(hit_alien, self.shipBody(), self.alienBody())
+        died |= self.playerHurt(hit_alien, self.alien_x, self.alien_y)
+        playing &= ~died
+
+        # -- Projectile collisions, one projectile slot at a time like the game's loop --
+        # Each projectile is tested along the path it is about to take this step, see ProjectilePool.asteroidHits
+        active &= playing
+        speed = self.projectile.move_speed * step
+        for p in range(self.max_projectiles):
+            shot = self.projectile_shot[:, p] & active
+            if not shot.any():
+                continue
+
+            # Only asteroids overlapping the box the whole path covers get the swept test, like the game's broadphase
+            x = self.projectile_x[:, p]
+            y = self.projectile_y[:, p]
+            dx = self.projectile_dir_x[:, p] * speed
+            dy = self.projectile_dir_y[:, p] * speed
+            extent_x = self.asteroid_width * self.asteroid_scale
+            extent_y = self.asteroid_height * self.asteroid_scale
+            near = self.asteroid_alive & shot[:, None] & isInside(
+                np.minimum(x, x + dx)[:, None], np.minimum(y, y + dy)[:, None],
+                self.projectile_size[0] + np.abs(dx)[:, None], self.projectile_size[1] + np.abs(dy)[:, None],
+                self.asteroid_x, self.asteroid_y, extent_x, extent_y, 0)
+            envs, slots = np.nonzero(near)
+            met, met_when = sweptBoxes(x[envs], y[envs], dx[envs], dy[envs], self.projectile_size[0],
+                                       self.projectile_size[1], self.asteroid_x[envs, slots],
+                                       self.asteroid_y[envs, slots], extent_x[envs, slots], extent_y[envs, slots],
+                                       0.2)
+
+            # Pairs that never meet keep 0, they have no point to compare the hulls at
+            hits = np.zeros_like(near)
+            when = np.zeros(near.shape)
+            hits[envs[met], slots[met]] = True
+            when[envs[met], slots[met]] = met_when[met]
+            hits = self.touchingAsteroids(hits, self.projectileBody(p, dx[:, None] * when, dy[:, None] * when))
+            hit_any = hits.any(axis=1)
+            if hit_any.any():
+                # Only the first asteroid in its path is scored and broken
+                envs = np.flatnonzero(hit_any)
+                first = np.where(hits, when, np.inf)[envs].argmin(axis=1)
+                self.score[envs] += self.asteroid_scores[self.asteroid_state[envs, first]]
+                self.projectile_shot[envs, p] = False
+                self.projectile_life[envs, p] = 0
+
+                broken = np.zeros_like(hits)
+                broken[envs, first] = True
+                self.breakAsteroids(broken)
+
+            hit_alien, when = sweptBoxes(self.projectile_x[:, p], self.projectile_y[:, p], dx, dy,
+                                         self.projectile_size[0], self.projectile_size[1], self.alien_x,
+                                         self.alien_y, self.alien_size[0], self.alien_size[1], 0.2)
+            when = np.where(hit_alien, when, 0.0)
+            hit_alien = self.touching(hit_alien & shot, self.alienBody(),
+                                      self.projectileBody(p, dx * when, dy * when))
+            if hit_alien.any():
+                self.score[hit_alien] += self.alien.death_score
+                self.projectile_shot[hit_alien, p] = False
+                self.projectile_life[hit_alien, p] = 0
+                self.spawnAliens(hit_alien)
+                self.resetAlienTimers(hit_alien)
+
+        # -- Projectile movement --
+        flying = self.projectile_shot & playing[:, None]
+        speed = self.projectile.move_speed * step
+        self.projectile_x += np.where(flying, self.projectile_dir_x * speed, 0.0)
+        self.projectile_y += np.where(flying, self.projectile_dir_y * speed, 0.0)
+        self.projectile_life += np.where(flying, dt, 0.0)
+        expired = flying & (self.projectile_life >= self.projectile.life_span)
+        self.projectile_shot[expired] = False
+        self.projectile_life[expired] = 0
+        self.projectile_x = np.where(flying, wrap(self.projectile_x, width), self.projectile_x)
+        self.projectile_y = np.where(flying, wrap(self.projectile_y, height), self.projectile_y)
+
+        # -- Alien --
+        moving = playing & self.alien_active
+        speed = self.alien.move_speed * step
+        self.alien_x += np.where(moving, self.alien_dir_x * speed, 0.0)
+        self.alien_y += np.where(moving, self.alien_dir_y * speed, 0.0)
+
+        leaving = moving & ((self.alien_x >= width + self.alien_size[0] * 2)
+                            | (self.alien_x <= -self.alien_size[0] * 2)
+                            | (self.alien_y >= height + self.alien_size[1] * 2)
+                            | (self.alien_y <= -self.alien_size[1] * 2))
+        if leaving.any():
+            self.spawnAliens(leaving)
+            self.resetAlienTimers(leaving)
+
+        # The alien's projectile is tested along the path it just moved, like EnemyManager.projectileHits
+        flying = playing & self.alien_projectile_shot
+        speed = self.alien_projectile.move_speed * step
+        dx = np.where(flying, self.alien_projectile_dir_x * speed, 0.0)
+        dy = np.where(flying, self.alien_projectile_dir_y * speed, 0.0)
+        start_x = self.alien_projectile_x.copy()
+        start_y = self.alien_projectile_y.copy()
+        self.alien_projectile_x += dx
+        self.alien_projectile_y += dy
+        self.alien_projectile_life += np.where(flying, dt, 0.0)
+        expired = flying & (self.alien_projectile_life >= self.alien_projectile.life_span)
+        self.alien_projectile_shot[expired] = False
+        self.alien_projectile_life[expired] = 0
+
+        hit, when = sweptBoxes(start_x, start_y, dx, dy, self.alien_projectile_size[0],
+                               self.alien_projectile_size[1], self.ship_sprite_x, self.ship_sprite_y,
+                               self.ship_size[0], self.ship_size[1], 0.2)
+        when = np.where(hit, when, 0.0)
+        hit = self.touching(hit & flying, self.shipBody(),
+                            self.alienProjectileBody(start_x + dx * when, start_y + dy * when))
+        self.alien_projectile_x = np.where(flying, wrap(self.alien_projectile_x, width), self.alien_projectile_x)
+        self.alien_projectile_y = np.where(flying, wrap(self.alien_projectile_y, height), self.alien_projectile_y)
+        if hit.any():
+            self.alien_projectile_shot[hit] = False
+            self.alien_projectile_life[hit] = 0
+            died |= self.playerHurt(hit, self.alien_projectile_x, self.alien_projectile_y)
+
+        # Like EnemyManager.steer, the alien turns away diagonally the first time it gets close to the player
+        self.alien_ai_elapsed += dt
+        if self.alien_ai_elapsed >= 1 / self.alien_ai_rate - 1e-9:
+            self.alien_ai_elapsed = 0.0
+            distance = np.hypot(self.alien_x - self.ship_sprite_x, self.alien_y - self.ship_sprite_y)
+            turning = playing & self.alien_active & ~self.alien_escaped & (distance <= self.alien.player_distance_check)
+            if turning.any():
+                angle = np.round(np.degrees(np.arctan2(self.alien_y[turning] - self.ship_sprite_y[turning],
+                                                       self.ship_sprite_x[turning] - self.alien_x[turning])))
+                angle = np.select([angle <= -90, angle <= 0, angle <= 90], [-135.0, -45.0, 45.0], 135.0)
+                self.alien_dir_x[turning] = np.cos(np.radians(angle))
+                self.alien_dir_y[turning] = np.sin(np.radians(angle))
+                self.alien_escaped |= turning
+
+        # -- Results --
+        self.steps += 1
+        rewards = self.score - score_before
+        dones = died | timed_out
+        info = {
+            "score": self.score.copy(),
+            "won": timed_out & (self.score >= self.max_score),
+            "episode_score": np.where(dones, self.score, 0),
+            "episode_steps": np.where(dones, self.steps, 0),
+        }
+
+        if dones.any():
+            self.resetEnvs(dones)
+
+        return self.observe(), rewards, dones, info
+
+    def observe(self) -> np.ndarray:
+        # Positions are scaled by the screen size, and everything else is relative to the player
+        width, height = self.game_res
+        ship_x = self.ship_sprite_x
+        ship_y = self.ship_sprite_y
+        radians = np.radians(self.ship_angle)
+
+        columns = [
+            ship_x / width,
+            ship_y / height,
+            np.cos(radians),
+            np.sin(radians),
+            self.ship_speed / self.ship.max_speed,
+            self.ship_health / self.ship.health,
+            self.ship_timer > 0,
+
+            self.alien_active,
+            (self.alien_x - ship_x) / width,
+            (self.alien_y - ship_y) / height,
+
+            self.alien_projectile_shot,
+            (self.alien_projectile_x - ship_x) / width,
+            (self.alien_projectile_y - ship_y) / height,
+        ]
+
+        for p in range(self.max_projectiles):
+            columns.append(self.projectile_shot[:, p])
+            columns.append((self.projectile_x[:, p] - ship_x) / width)
+            columns.append((self.projectile_y[:, p] - ship_y) / height)
+
+        observation = np.zeros((self.num_envs, self.observation_size), dtype=np.float32)
+        observation[:, :len(columns)] = np.stack(columns, axis=1)
+
+        # The closest few asteroids, nearest first, with missing ones left as zeros
+        k = self.observed_asteroids
+        dx = (self.asteroid_x - ship_x[:, None]) / width
+        dy = (self.asteroid_y - ship_y[:, None]) / height
+        distance = np.where(self.asteroid_alive, dx * dx + dy * dy, np.inf)
+        nearest = np.argsort(distance, axis=1, kind="stable")[:, :k]
+        rows = np.arange(self.num_envs)[:, None]
+        present = self.asteroid_alive[rows, nearest]
+
+        asteroids = np.stack([
+            present,
+            np.where(present, dx[rows, nearest], 0.0),
+            np.where(present, dy[rows, nearest], 0.0),
+            np.where(present, self.asteroid_width[rows, nearest] * self.asteroid_scale[rows, nearest] / width, 0.0),
+        ], axis=2)
+        observation[:, len(columns):len(columns) + nearest.shape[1] * 4] = asteroids.reshape(self.num_envs, -1)
+        return observation
+
+    # -----------
+    # -- Batched versions of the game's spawning functions --
+    # -----------
+
+    def resetEnvs(self, mask: np.ndarray) -> None:
+        # Puts the selected games back to how MyASGEGame.startGame leaves a freshly created game
+        count = int(mask.sum())
+        if count == 0:
+            return
+
+        self.score[mask] = 0
+        self.time[mask] = self.max_time
+        self.steps[mask] = 0
+
+        self.ship_x[mask] = self.game_res[0] / 2 - self.ship_width / 2
+        self.ship_y[mask] = self.game_res[1] / 2 - self.ship_height / 2
+        self.ship_sprite_x[mask] = self.ship_x[mask]
+        self.ship_sprite_y[mask] = self.ship_y[mask]
+        self.ship_dir_x[mask] = 0
+        self.ship_dir_y[mask] = 0
+        self.ship_speed[mask] = 0
+        self.ship_angle[mask] = 0
+        self.ship_health[mask] = self.ship.health
+        self.ship_timer[mask] = 0
+        self.was_firing[mask] = False
+
+        self.projectile_shot[mask] = False
+        self.projectile_life[mask] = 0
+
+        self.alien_projectile_shot[mask] = False
+        self.alien_projectile_life[mask] = 0
+        self.alien_projectile_timer[mask] = 0
+
+        self.spawnWaves(mask)
+        self.resetAlienTimers(mask)
+        self.spawnAliens(mask)
+
+    def spawnWaves(self, mask: np.ndarray) -> None:
+        # MyASGEGame.respawn(False): replaces the selected games' asteroids with a new wave around the player
+        envs = np.flatnonzero(mask)
+        if len(envs) == 0:
+            return
+
+        self.asteroid_alive[envs] = False
+        count = self.asteroid_count
+        shape = (len(envs), count)
+        rng = self.rng
+
+        texture = rng.integers(0, len(self.asteroid_sizes), shape)
+        asteroid_width = self.asteroid_sizes[texture, 0]
+        asteroid_height = self.asteroid_sizes[texture, 1]
+
+        # Keep drawing positions until none of them are within the spawn margin of the player, like initAsteroid
+        player_x = self.ship_sprite_x[envs, None]
+        player_y = self.ship_sprite_y[envs, None]
+        x = np.repeat(player_x, count, axis=1)
+        y = np.repeat(player_y, count, axis=1)
+        for position, player, limit, size in ((x, player_x, self.game_res[0], asteroid_width),
+                                              (y, player_y, self.game_res[1], asteroid_height)):
+            redraw = np.abs(position - player) <= self.spawn_margin
+            while redraw.any():
+                position[redraw] = rng.uniform(0, limit, int(redraw.sum())) + size[redraw] / 2
+                redraw = np.abs(position - player) <= self.spawn_margin
+
+        dir_x = rng.uniform(-1, 1, shape)
+        dir_y = rng.uniform(-1, 1, shape)
+        scale = rng.uniform(self.asteroid.min_scale, self.asteroid.max_scale, shape)
+
+        # Equivalent of the first 'Move' call
+        rows = envs[:, None]
+        slots = np.arange(count)[None, :]
+        self.asteroid_x[rows, slots] = x + dir_x * self.asteroid.move_speed
+        self.asteroid_y[rows, slots] = y + dir_y * self.asteroid.move_speed
+        self.asteroid_dir_x[rows, slots] = dir_x
+        self.asteroid_dir_y[rows, slots] = dir_y
+        self.asteroid_width[rows, slots] = asteroid_width
+        self.asteroid_height[rows, slots] = asteroid_height
+        self.asteroid_scale[rows, slots] = scale
+        self.asteroid_state[rows, slots] = STATE_LARGE
+        self.asteroid_texture[rows, slots] = texture
+        self.asteroid_rotation[rows, slots] = rng.uniform(0.0, 1.0, shape)
+        self.asteroid_spin[rows, slots] = rng.uniform(-self.asteroid.max_spin_speed, self.asteroid.max_spin_speed,
+                                                      shape)
+        self.asteroid_alive[rows, slots] = True
+
+    def breakAsteroids(self, broken: np.ndarray) -> None:
+        # AsteroidField.split and release for every asteroid in the 'broken' mask, in every game at once
+        parents = broken & self.asteroid_alive & (self.asteroid_state != STATE_SMALL)
+        parent_envs, parent_slots = np.nonzero(parents)
+        if len(parent_envs):
+            chunks = self.split_chunks
+            envs = np.repeat(parent_envs, chunks)
+            sources = np.repeat(parent_slots, chunks)
+            slots = self.allocateSlots(envs)
+
+            placed = slots >= 0
+            envs = envs[placed]
+            sources = sources[placed]
+            slots = slots[placed]
+            count = len(slots)
+            rng = self.rng
+
+            texture = rng.integers(0, len(self.asteroid_sizes), count)
+            self.asteroid_width[envs, slots] = self.asteroid_sizes[texture, 0]
+            self.asteroid_height[envs, slots] = self.asteroid_sizes[texture, 1]
+            self.asteroid_x[envs, slots] = self.asteroid_x[envs, sources]
+            self.asteroid_y[envs, slots] = self.asteroid_y[envs, sources]
+            self.asteroid_dir_x[envs, slots] = rng.uniform(-1, 1, count)
+            self.asteroid_dir_y[envs, slots] = rng.uniform(-1, 1, count)
+            self.asteroid_scale[envs, slots] = self.asteroid_scale[envs, sources] * self.split_rescale \
+                * rng.uniform(self.asteroid.min_scale, self.asteroid.max_scale, count)
+            self.asteroid_state[envs, slots] = self.asteroid_state[envs, sources] + 1
+            self.asteroid_texture[envs, slots] = texture
+            self.asteroid_rotation[envs, slots] = rng.uniform(0.0, 1.0, count)
+            self.asteroid_spin[envs, slots] = rng.uniform(-self.asteroid.max_spin_speed,
+                                                          self.asteroid.max_spin_speed, count)
+            self.asteroid_alive[envs, slots] = True
+
+        self.asteroid_alive[broken] = False
+
+    def allocateSlots(self, envs: np.ndarray) -> np.ndarray:
+        # Finds a free pool slot for every request, 'envs' must be sorted and holds the game of each request
+        # The n-th request for a game gets that game's n-th free slot, or -1 if its pool is full
+        free = ~self.asteroid_alive
+        free_envs, free_slots = np.nonzero(free)
+        free_counts = free.sum(axis=1)
+        free_rank = np.arange(len(free_envs)) - np.repeat(np.cumsum(free_counts) - free_counts, free_counts)
+
+        table = np.full((self.num_envs, self.capacity), -1, dtype=np.int64)
+        table[free_envs, free_rank] = free_slots
+
+        request_counts = np.bincount(envs, minlength=self.num_envs)
+        request_rank = np.arange(len(envs)) - np.repeat(np.cumsum(request_counts) - request_counts, request_counts)
+
+        slots = np.full(len(envs), -1, dtype=np.int64)
+        in_range = request_rank < self.capacity
+        slots[in_range] = table[envs[in_range], request_rank[in_range]]
+        return slots
+
+    def spawnProjectiles(self, mask: np.ndarray) -> None:
+        # MyASGEGame.spawnProjectile: fires the first projectile that isn't already flying
+        available = ~self.projectile_shot
+        envs = np.flatnonzero(mask & available.any(axis=1))
+        if len(envs) == 0:
+            return
+
+        slots = available[envs].argmax(axis=1)
+        radians = np.radians(self.ship_angle[envs])
+        self.projectile_x[envs, slots] = self.ship_sprite_x[envs]
+        self.projectile_y[envs, slots] = self.ship_sprite_y[envs]
+        self.projectile_dir_x[envs, slots] = np.cos(radians)
+        self.projectile_dir_y[envs, slots] = np.sin(radians)
+        self.projectile_shot[envs, slots] = True
+
+    def spawnAliens(self, mask: np.ndarray) -> None:
+        # MyASGEGame.spawnAlien: waits off the left or right side of the screen, facing the other way
+        count = int(mask.sum())
+        if count == 0:
+            return
+
+        side = self.rng.integers(0, 2, count)
+        self.alien_active[mask] = False
+        self.alien_escaped[mask] = False
+        self.alien_x[mask] = np.where(side == 1, self.game_res[0] + self.alien_size[0], -self.alien_size[0])
+        margin = int(self.alien.spawn_margin)
+        self.alien_y[mask] = self.rng.integers(margin, self.game_res[1] - margin - self.alien_size[1], count,
+                                               endpoint=True)
+        self.alien_dir_x[mask] = -(side * 2 - 1)
+        self.alien_dir_y[mask] = 0
+
+    def resetAlienTimers(self, mask: np.ndarray) -> None:
+        count = int(mask.sum())
+        if count:
+            self.alien_spawn_timer[mask] = self.rng.uniform(self.alien.spawn_timer_min, self.alien.spawn_timer_max,
+                                                            count)
+
+    def spawnAlienProjectiles(self, mask: np.ndarray) -> None:
+        # MyASGEGame.spawnAlienProjectile: shoots straight at the player
+        if not mask.any():
+            return
+
+        self.alien_projectile_timer[mask] = self.alien.projectile_timer_time
+        self.alien_projectile_x[mask] = self.alien_x[mask]
+        self.alien_projectile_y[mask] = self.alien_y[mask]
+        angle = np.arctan2(self.ship_sprite_y[mask] - self.alien_y[mask], self.ship_sprite_x[mask] - self.alien_x[mask])
+        self.alien_projectile_dir_x[mask] = np.cos(angle)
+        self.alien_projectile_dir_y[mask] = np.sin(angle)
+        self.alien_projectile_shot[mask] = True
+
+    # -----------
+    # -- Collision hulls --
+    # -----------
+    # A body is what collision_mask.bodiesTouch takes, where any value can be one per game or shared
+
+    @staticmethod
+    def body(hull, x, y, width, height, scale, rotation):
+        return hull.points, x, y, width, height, scale, rotation, hull.inner, hull.outer
+
+    def shipBody(self):
+        return self.body(self.ship_hull, self.ship_sprite_x, self.ship_sprite_y, self.ship_width, self.ship_height,
+                         self.ship_scale, self.ship_rotation)
+
+    def alienBody(self):
+        return self.body(self.alien_hull, self.alien_x, self.alien_y, self.alien_size[0], self.alien_size[1], 1.0, 0.0)
+
+    def projectileBody(self, p: int, offset_x=0.0, offset_y=0.0):
+        # The offsets move it along its path, and can be one per (game, pool slot) pair for touchingAsteroids
+        x = self.projectile_x[:, p]
+        y = self.projectile_y[:, p]
+        if np.ndim(offset_x) == 2:
+            x = x[:, None]
+            y = y[:, None]
+
+        return self.body(self.projectile_hull, x + offset_x, y + offset_y, self.projectile_size[0],
+                         self.projectile_size[1], 1.0, 0.0)
+
+    def alienProjectileBody(self, x, y):
+        return self.body(self.alien_projectile_hull, x, y, self.alien_projectile_size[0],
+                         self.alien_projectile_size[1], 1.0, 0.0)
+
+    def touching(self, mask: np.ndarray, body_1, body_2) -> np.ndarray:
+        # Narrowphase for games where two bodies' bounding boxes overlap, keeps the ones whose hulls overlap too
+        envs = np.flatnonzero(mask)
+        if len(envs) == 0:
+            return mask
+
+        touching = np.zeros_like(mask)
+        touching[envs] = bodiesTouch(*([value[envs] if np.ndim(value) == 1 else value for value in body]
+                                       for body in (body_1, body_2)))
+        return touching
+
+    def touchingAsteroids(self, hits: np.ndarray, body) -> np.ndarray:
+        # Same as touching(), between one body per game and the asteroids in the (games, pool) 'hits' mask
+        envs, slots = np.nonzero(hits)
+        if len(envs) == 0:
+            return hits
+
+        texture = self.asteroid_texture[envs, slots]
+        asteroids = (self.asteroid_hulls[texture], self.asteroid_x[envs, slots], self.asteroid_y[envs, slots],
+                     self.asteroid_width[envs, slots], self.asteroid_height[envs, slots],
+                     self.asteroid_scale[envs, slots], self.asteroid_rotation[envs, slots],
+                     self.asteroid_inner[texture], self.asteroid_outer[texture])
+
+        # Besides its hull points, the body's values can also be one per (game, pool slot) pair
+        points, *values = body
+        body = [points] + [value[envs, slots] if np.ndim(value) == 2 else value[envs] if np.ndim(value) == 1
+                           else value for value in values]
+        touching = np.zeros_like(hits)
+        overlapping = bodiesTouch(body, asteroids)
+        touching[envs[overlapping], slots[overlapping]] = True
+        return touching
+
+    def playerHurt(self, mask: np.ndarray, other_x: np.ndarray, other_y: np.ndarray) -> np.ndarray:
+        # MyASGEGame.playerHurt and Ship.Hurt, returns which games the player just died in
+        vulnerable = mask & (self.ship_timer <= 0)
+        dying = vulnerable & (self.ship_health <= 1)
+        hurt = vulnerable & ~dying
+        if hurt.any():
+            # Knocked back away from whatever hit it
+            self.ship_health[hurt] -= 1
+            self.ship_angle[hurt] = np.degrees(np.arctan2(other_y[hurt] - self.ship_sprite_y[hurt],
+                                                          other_x[hurt] - self.ship_sprite_x[hurt]))
+            self.ship_speed[hurt] = -self.ship.hurt_knockback
+            self.ship_timer[hurt] = self.ship.invincibility_timer
+
+        return dying
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure how fast the vectorised environment steps")
+    parser.add_argument("--envs", type=int, default=4096, help="number of games stepped together")
+    parser.add_argument("--steps", type=int, default=1000, help="number of batched steps")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--timed", action="store_true", help="play timed games instead of endless ones")
+    args = parser.parse_args()
+
+    env = VecAsteroidsEnv(args.envs, args.seed, timed=args.timed)
+    env.reset()
+    rng = np.random.default_rng(args.seed)
+
+    episodes = 0
+    episode_scores = 0
+    start = time.perf_counter()
+    for i in range(args.steps):
+        observations, rewards, dones, info = env.step(rng.integers(0, NUM_ACTIONS, args.envs))
+        episodes += int(dones.sum())
+        episode_scores += int(info["episode_score"].sum())
+    elapsed = time.perf_counter() - start
+
+    env_steps = args.envs * args.steps
+    print("Stepped " + str(args.envs) + " games " + str(args.steps) + " times: " +
+          str(round(env_steps / elapsed)) + " game steps per second")
+    if episodes:
+        print(str(episodes) + " games finished with a mean score of " + str(round(episode_scores / episodes, 1)))
+
+
+if __name__ == "__main__":
+    main()
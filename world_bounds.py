@@ -0,0 +1,152 @@
+import numpy as np
+import pyasge
+
+
+class WorldBounds:
+    """ The screen as a torus, for wrapping and colliding across its edges
+
+    Positions are the top-left corners of sprites and are kept within
+    [0, width) x [0, height), one vectorised modulo for every entity of a
+    kind at once. A sprite that sticks out past the right or bottom edge
+    is said to straddle it, and is also drawn (and can also be hit) as a
+    ghost copy one screen to the left or up, so crossing an edge is
+    seamless. Ghost copies are only ever made for the few sprites that
+    actually straddle an edge, or that are tested against one that does.
+    """
+
+    def __init__(self, width: float, height: float) -> None:
+        self.width = width
+        self.height = height
+
+    # -----------
+    # -- Wrapping --
+    # -----------
+
+    def wrap(self, x: np.ndarray, y: np.ndarray) -> None:
+        # Wraps every position in place, the arrays can be views of a larger pool
+        np.mod(x, self.width, out=x)
+        np.mod(y, self.height, out=y)
+
+    def wrapSprite(self, sprite: pyasge.Sprite) -> None:
+        sprite.x = sprite.x % self.width
+        sprite.y = sprite.y % self.height
+
+    def interpolate(self, x, y, prev_x, prev_y, alpha: float):
+        # Positions between the last two steps for rendering, except for those that jumped across the screen by
+        # wrapping (or respawning) which are drawn where they are now
+        jumped = (np.abs(x - prev_x) > self.width / 2) | (np.abs(y - prev_y) > self.height / 2)
+        return np.where(jumped, x, prev_x + (x - prev_x) * alpha), np.where(jumped, y, prev_y + (y - prev_y) * alpha)
+
+    # -----------
+    # -- Ghost copies --
+    # -----------
+
+    def overhang(self, x, y, extent_x, extent_y) -> tuple:
+        # How far the given boxes stick out past the right and bottom edges at most, 0 where none of them do
+        # This is the 'reach' other boxes are tested against in ghosts()
+        if len(x) == 0:
+            return 0.0, 0.0
+
+        right = float(np.max(np.asarray(x) + extent_x))
+        bottom = float(np.max(np.asarray(y) + extent_y))
+        return max(0.0, right - self.width), max(0.0, bottom - self.height)
+
+    def ghosts(self, x, y, extent_x, extent_y, reach_x: float = 0.0, reach_y: float = 0.0):
+        """ The extra copies of each box that have to be drawn or tested
+
+        A box that straddles the right (or bottom) edge gets a copy one
+        screen to the left (or up). For collisions against boxes that
+        stick out past the edges by up to 'reach_x' and 'reach_y' (see
+        overhang), a box that close to the left (or top) edge also gets a
+        copy one screen to the right (or down), where it meets them.
+        Returns (box index, offset x, offset y) for every copy, on top of
+        the box itself which isn't included.
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        if len(x) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0)
+
+        # Only the edges something is actually near are looked at, and None stands for the box's own position
+        right = x + extent_x
+        bottom = y + extent_y
+        offsets_x = [(0.0, None)]
+        if right.max() > self.width:
+            offsets_x.append((-self.width, right > self.width))
+        if x.min() < reach_x:
+            offsets_x.append((self.width, x < reach_x))
+
+        offsets_y = [(0.0, None)]
+        if bottom.max() > self.height:
+            offsets_y.append((-self.height, bottom > self.height))
+        if y.min() < reach_y:
+            offsets_y.append((self.height, y < reach_y))
+
+        indices = []
+        shifts_x = []
+        shifts_y = []
+        for offset_x, mask_x in offsets_x:
+            for offset_y, mask_y in offsets_y:
+                if mask_x is None and mask_y is None:
+                    continue
+
+                copies = np.flatnonzero(mask_y if mask_x is None else mask_x if mask_y is None else mask_x & mask_y)
+                indices.append(copies)
+                shifts_x.append(np.full(len(copies), offset_x))
+                shifts_y.append(np.full(len(copies), offset_y))
+
+        if not indices:
+            return np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0)
+
+        return np.concatenate(indices), np.concatenate(shifts_x), np.concatenate(shifts_y)
+
+    def spriteOffsets(self, sprite: pyasge.Sprite, reach_x: float = 0.0, reach_y: float = 0.0) -> list:
+        # ghosts() for a single sprite, as every (offset x, offset y) it has to be drawn or tested at
+        # The first one is always (0, 0) for the sprite itself
+        offsets_x = [0.0]
+        if sprite.x + sprite.width * sprite.scale > self.width:
+            offsets_x.append(-self.width)
+        if sprite.x < reach_x:
+            offsets_x.append(self.width)
+
+        offsets_y = [0.0]
+        if sprite.y + sprite.height * sprite.scale > self.height:
+            offsets_y.append(-self.height)
+        if sprite.y < reach_y:
+            offsets_y.append(self.height)
+
+        return [(offset_x, offset_y) for offset_x in offsets_x for offset_y in offsets_y]
+
+
+class GhostSprites:
+    """ Spare sprites for drawing the ghost copies of one texture
+
+    Sprites are only created the first time that many ghosts are needed
+    and are reused every frame after that.
+    """
+
+    def __init__(self, textures, texture_file: str, z_order: int = 0) -> None:
+        self.textures = textures
+        self.texture_file = texture_file
+        self.z_order = z_order
+        self.sprites = []
+
+    def place(self, x: list, y: list, scale=1.0, rotation=0.0) -> list:
+        # Positions the first len(x) spare sprites, 'scale' and 'rotation' are either lists or shared by all of them
+        count = len(x)
+        while len(self.sprites) < count:
+            sprite = pyasge.Sprite()
+            self.textures.attach(sprite, self.texture_file)
+            sprite.z_order = self.z_order
+            self.sprites.append(sprite)
+
+        scales = scale if isinstance(scale, list) else [scale] * count
+        rotations = rotation if isinstance(rotation, list) else [rotation] * count
+        sprites = self.sprites[:count]
+        for i, sprite in enumerate(sprites):
+            sprite.x = x[i]
+            sprite.y = y[i]
+            sprite.scale = scales[i]
+            sprite.rotation = rotations[i]
+
+        return sprites